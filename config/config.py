@@ -8,25 +8,92 @@ load_dotenv()
 GOOGLE_SHEETS_CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'credentials.json')
 SPREADSHEET_ID = ""  # Will be set from web interface
 WORKSHEET_NAME = 'Blog Posts'
+SHEET_STATE_PATH = 'temp/sheet_state.json'  # Export validators and row hashes from the last successful run
+SHEET_CHANGED_ROWS_ONLY = True  # Only process rows added or edited since the last successful run
+SHEET_STATE_MAX_ROWS = 50000  # Row hashes remembered per sheet or file; the least recently processed are forgotten
+SHEET_POLL_INTERVAL = 300  # Seconds between polls of the sheet in watch mode (main.py --watch)
+SHEET_POLL_MAX_BACKOFF = 3600  # Longest wait between polls after repeated failures
 
 # WordPress Configuration
 WORDPRESS_URL = ""  # Will be set from web interface
 WORDPRESS_USERNAME = ""  # Will be set from web interface
 WORDPRESS_PASSWORD = ""  # Will be set from web interface
+WORDPRESS_SITES_FILE = os.getenv('WORDPRESS_SITES_FILE', '')  # JSON list of sites to publish every post to (see README)
+WORDPRESS_UPLOAD_CONCURRENCY = 3  # Simultaneous media uploads to one site
+WORDPRESS_UPLOAD_TIMEOUT = 120  # Seconds to wait for WordPress to respond to one media upload attempt
+WORDPRESS_UPLOAD_RETRIES = 3  # Further attempts after a media upload fails to connect, times out or gets a 5xx
+WORDPRESS_INVENTORY_PAGE_SIZE = 100  # Posts or media per page when prefetching a site's inventory (max 100)
+WORDPRESS_INVENTORY_CONCURRENCY = 4  # Inventory pages fetched at once
+WORDPRESS_BATCH_SIZE = 10  # Posts created per REST batch request (max 25); 1 creates each post on its own
+WORDPRESS_ASSIGN_TERMS = True  # Assign each post categories and tags, from the row's own columns or its topic and keywords
 
 # LLM Configuration
 OLLAMA_URL = 'http://localhost:11434'
 MODEL_NAME = 'gemma3:latest'
+LLM_READ_TIMEOUT = 60  # Seconds to wait for a generated article
 
 # Image Configuration
 MAX_IMAGES_PER_POST = 3
 IMAGE_DOWNLOAD_PATH = 'temp/images'
 ALLOWED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp']
 DEFAULT_IMAGE_PATH = 'assets/default_images'  # Fallback directory for default images
+IMAGE_KEEP_FILES = False  # Also write downloaded images to temp/images; they are uploaded from memory either way
+IMAGE_WORKSPACE_MAX_BYTES = 500 * 1024 * 1024  # Disk budget for downloaded images; least recently used are deleted beyond it
+IMAGE_WORKSPACE_STALE_AFTER = 24 * 3600  # Seconds after which leftovers of crashed runs are deleted
+IMAGE_DOWNLOAD_WORKERS = 8  # Concurrent image downloads
+IMAGE_DOWNLOAD_PER_HOST = 2  # Simultaneous connections to a single image host
+IMAGE_DOWNLOAD_TIMEOUT = 15  # Seconds allowed for one image download, including queueing for its host
+IMAGE_MIN_RESOLUTION = (400, 250)  # Smaller images are rejected from their header, before download
+IMAGE_MAX_RESOLUTION = (10000, 10000)
+IMAGE_MAX_BYTES = 10 * 1024 * 1024  # Larger images are abandoned mid-download
+IMAGE_ALLOWED_FORMATS = ['JPEG', 'PNG', 'WEBP', 'GIF']
+IMAGE_PROBE_BYTES = 128 * 1024  # Give up on images whose header is not found within this many bytes
+IMAGE_STORE_INDEX = 'temp/image_store.json'  # Image hashes mapped to local files and uploaded WordPress media
+IMAGE_STORE_MAX_ENTRIES = 20000  # Images kept in the index; the least recently uploaded are forgotten beyond this
+IMAGE_STORE_SAVE_INTERVAL = 10  # Seconds between writes of the index; uploads in between are written together
+IMAGE_MAX_WIDTH = 1600  # Downloaded images wider than this are scaled down
+IMAGE_OUTPUT_FORMAT = 'webp'  # Format images are normalized to: 'webp' or 'jpeg'
+IMAGE_OUTPUT_QUALITY = 80  # Encoder quality for normalized images
+IMAGE_NORMALIZE_WORKERS = 2  # Processes used to resize and re-encode images
+IMAGE_DEDUP_THRESHOLD = 10  # Max differing bits (of 64) for two images to count as near-duplicates
+IMAGE_DEDUP_SITE_HISTORY = False  # Also drop images near-identical to ones recently published on the site
+IMAGE_DEDUP_HISTORY_SIZE = 500  # Image hashes remembered per site
+IMAGE_DEDUP_HISTORY_PATH = 'temp/image_history.json'
+IMAGE_LIBRARY_PATH = DEFAULT_IMAGE_PATH  # Curated local images, searchable by filename and sidecar tags
+IMAGE_LIBRARY_INDEX = 'temp/image_library_index.json'
+IMAGE_LIBRARY_MIN_MATCHES = 2  # Query keywords an image must match to be used
+IMAGE_LIBRARY_REFRESH_INTERVAL = 60  # Seconds between checks of the library directory for changes
+IMAGE_SEARCH_PROVIDERS = ['selenium', 'library']  # Image sources tried in order: 'selenium', 'http', 'library'
+IMAGE_SEARCH_OVERFETCH = 3  # Most URLs searched per wanted image; searching stops once enough images download
+IMAGE_SEARCH_API_KEY = os.getenv('IMAGE_SEARCH_API_KEY', '')  # Google Custom Search key for the 'http' provider
+IMAGE_SEARCH_ENGINE_ID = os.getenv('IMAGE_SEARCH_ENGINE_ID', '')  # Without a key and engine, 'http' parses Bing results
+IMAGE_SEARCH_CACHE_PATH = 'temp/image_search_cache.json'  # Image URLs found per query, reused across rows and runs
+IMAGE_SEARCH_CACHE_TTL = 7 * 24 * 3600  # Seconds search results are reused for
+IMAGE_SEARCH_CACHE_NEGATIVE_TTL = 6 * 3600  # Seconds a search that found nothing is not retried for
+FEATURED_IMAGE_SIZE = (1200, 675)  # Featured image size used by the theme
+IMAGE_SCORE_THUMBNAIL = 96  # Edge length of the thumbnails images are scored on
+IMAGE_SCORE_WEIGHTS = {
+    'resolution': 0.35,
+    'aspect': 0.25,
+    'sharpness': 0.25,
+    'colourfulness': 0.15
+}
+
+# HTTP Configuration
+HTTP_CONNECT_TIMEOUT = 5  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 30  # Seconds to wait for data from the server
+HTTP_RETRIES = 3  # Retries for idempotent requests that fail to connect, time out or get a retryable status
+HTTP_RETRY_BACKOFF = 0.5  # Base seconds for jittered exponential backoff between retries
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+HTTP_POOL_SIZE = 10  # Kept-alive connections per host
+HTTP_MAX_HOSTS = 32  # Hosts kept with open connections; the least recently used beyond this are closed
 
 # Logging Configuration
 LOG_FILE = 'logs/blog_publisher.log'
 LOG_LEVEL = 'INFO'
+LOG_BUFFER_SIZE = 1000  # Log events kept per web interface job, replayed to viewers that connect late
+LOG_HEARTBEAT_INTERVAL = 15  # Seconds between keep-alive comments on an idle log stream
+JOB_HISTORY_SIZE = 20  # Finished web interface jobs whose progress and log events are kept
 
 # Content Configuration
 REQUIRED_ELEMENTS = {
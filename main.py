@@ -1,12 +1,16 @@
 import os
+import time
+import random
 import logging
+import argparse
 from datetime import datetime
 from modules.google_sheets import GoogleSheetsManager
-from modules.content_processor import ContentProcessor
-from modules.wordpress_integration import WordPressIntegration
+from modules.file_source import LocalFileSource, parse_row_range
 from modules.llm_integration import LLMIntegration
 from modules.image_handler import ImageHandler
-from config.config import LOG_FILE, LOG_LEVEL
+from modules.http_client import get_http_client
+from modules.pipeline import FanoutPublisher, load_sites, default_sites, process_row
+from config.config import LOG_FILE, LOG_LEVEL, WORDPRESS_SITES_FILE, SHEET_POLL_INTERVAL, SHEET_POLL_MAX_BACKOFF
 
 def setup_logging():
     """Setup logging configuration"""
@@ -20,28 +24,64 @@ def setup_logging():
         ]
     )
 
-def clean_sheet_data(post):
-    """Clean and format data from Google Sheets"""
-    # Get images and clean them
-    images = post.get('images', '')
-    if images:
-        # Split by comma and clean each URL/path
-        image_list = [img.strip() for img in images.split(',') if img.strip()]
-    else:
-        image_list = []
+def publish_pass(sheets_manager, llm, image_handler, fanout):
+    """Publish the sheet's new and changed rows once, returning the number of rows read"""
+    logger = logging.getLogger(__name__)
 
-    return {
-        'title': post.get('title', '').strip(),
-        'topic': post.get('topic name', '').strip(),
-        'keywords': post.get('keywords', '').strip().strip('"'),
-        'context': post.get('context', '').strip().strip('"'),
-        'status': post.get('status', '').strip().strip('"'),
-        'must_have_elements': post.get('must have elements', '').strip().strip('"'),
-        'images': image_list
-    }
+    # Load what each site already has, or what changed on it since the
+    # last pass, so reruns don't duplicate posts or media
+    fanout.prepare()
 
-def main():
-    """Main function to orchestrate the blog publishing process"""
+    # Stream blog data from Google Sheets
+    blog_data = sheets_manager.stream_blog_data()
+
+    # Process each blog post as soon as its row arrives
+    row_count = 0
+    try:
+        for post in blog_data:
+            row_count += 1
+            process_row(post, sheets_manager, llm, image_handler, fanout)
+    finally:
+        # Publish the posts still queued, then remember the rows done so the
+        # next pass only processes rows added or edited since. Also done
+        # when the pass is interrupted, so posts already generated aren't lost
+        fanout.flush()
+        sheets_manager.save_state(failed_titles=fanout.failed_titles())
+
+    if not row_count:
+        logger.info("No new or changed blog data found in Google Sheets")
+    return row_count
+
+def watch_sheet(sheets_manager, llm, image_handler, fanout, interval=SHEET_POLL_INTERVAL,
+                max_backoff=SHEET_POLL_MAX_BACKOFF):
+    """Poll the sheet every `interval` seconds and publish new and changed rows until interrupted.
+
+    The components stay alive between polls, so their pooled connections
+    and caches are reused. A failed poll is retried after a jittered
+    backoff that doubles up to `max_backoff`.
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"Watching Google Sheet {sheets_manager.spreadsheet_id} every {interval}s")
+    failures = 0
+    while True:
+        try:
+            publish_pass(sheets_manager, llm, image_handler, fanout)
+            failures = 0
+            delay = interval
+        except Exception as e:
+            failures += 1
+            delay = min(interval * (2 ** failures), max_backoff) * random.uniform(0.5, 1.0)
+            logger.error(f"Error polling Google Sheet ({failures} in a row): {str(e)}; retrying in {delay:.0f}s")
+        time.sleep(delay)
+
+def main(sites=None, watch=False, interval=SHEET_POLL_INTERVAL, source=None):
+    """Main function to orchestrate the blog publishing process.
+
+    `sites` lists the WordPress sites every post is published to, and
+    defaults to the site in the configuration. `source` supplies the rows,
+    and defaults to the configured Google Sheet. With `watch`, the source
+    is polled every `interval` seconds instead of processed once.
+    """
     try:
         # Setup logging
         setup_logging()
@@ -49,103 +89,24 @@ def main():
         logger.info("Starting blog publishing process")
 
         # Initialize components
-        sheets_manager = GoogleSheetsManager()
-        content_processor = ContentProcessor()
-        wordpress = WordPressIntegration()
+        sheets_manager = source or GoogleSheetsManager()
         llm = LLMIntegration()
         image_handler = ImageHandler()
-
-        # Get blog data from Google Sheets
-        blog_data = sheets_manager.get_blog_data()
-        if not blog_data:
-            logger.warning("No blog data found in Google Sheets")
-            return
-
-        # Process each blog post
-        for post in blog_data:
-            try:
-                # Clean and format the post data
-                post_data = clean_sheet_data(post)
-                logger.info(f"Processing post: {post_data}")
-
-                # Skip if already published
-                if post_data['status'].lower() == 'published ✅':
-                    logger.info(f"Skipping already published post: {post_data['title']}")
-                    continue
-
-                # Skip if title is empty
-                if not post_data['title']:
-                    logger.warning("Skipping post with empty title")
-                    continue
-
-                # Search and download images
-                logger.info(f"Searching for images for: {post_data['title']}")
-                images = image_handler.search_and_download_images(
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords']
-                )
-                
-                if not images:
-                    logger.warning(f"No images found for post: {post_data['title']}")
-                    continue
-
-                # Select featured image
-                featured_image = image_handler.select_featured_image(images)
-                if not featured_image:
-                    logger.warning(f"Could not select featured image for post: {post_data['title']}")
-                    continue
-
-                # Remove featured image from content images
-                content_images = [img for img in images if img != featured_image]
-
-                # Generate content using LLaMA
-                logger.info(f"Generating content for: {post_data['title']}")
-                logger.info(f"Topic: {post_data['topic']}")
-                logger.info(f"Keywords: {post_data['keywords']}")
-                logger.info(f"Context: {post_data['context']}")
-                
-                markdown_content = llm.generate_content(
-                    title=post_data['title'],
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords'],
-                    context=post_data['context']
-                )
-                logger.info("Generated content using LLaMA")
-
-                # Convert markdown to HTML
-                html_content = content_processor.convert_markdown_to_html(markdown_content)
-                logger.info("Converted markdown to HTML")
-
-                # Add required elements if specified
-                if post_data['must_have_elements']:
-                    required_elements = [elem.strip() for elem in post_data['must_have_elements'].split(',')]
-                    logger.info(f"Adding required elements: {required_elements}")
-                    html_content = content_processor.add_required_elements(html_content, required_elements)
-
-                # Insert images into content (excluding featured image)
-                logger.info("Inserting images into content")
-                html_content = content_processor.insert_images(html_content, content_images)
-
-                # Insert AdSense
-                html_content = content_processor.insert_adsense(html_content)
-                logger.info("Added AdSense to content")
-
-                # Publish to WordPress with featured image
-                logger.info(f"Publishing post: {post_data['title']}")
-                post_id = wordpress.publish_post(
-                    title=post_data['title'],
-                    content=html_content,
-                    featured_image_path=featured_image
-                )
-
-                # Log success
-                logger.info(f"Successfully published post: {post_data['title']} (ID: {post_id})")
-                logger.info("Note: Sheet status cannot be updated as the sheet is public")
-
-            except Exception as e:
-                logger.error(f"Error processing post {post_data.get('title', 'Unknown')}: {str(e)}")
-                continue
-
+        fanout = FanoutPublisher(sites or default_sites(), image_handler)
+        sheets_manager.set_targets(site.url for site in fanout.sites)
+        logger.info(f"Publishing to {', '.join(site.url for site in fanout.sites)}")
+
+        try:
+            if watch:
+                watch_sheet(sheets_manager, llm, image_handler, fanout, interval=interval)
+            else:
+                publish_pass(sheets_manager, llm, image_handler, fanout)
+        except KeyboardInterrupt:
+            logger.info("Stopping")
+        finally:
+            fanout.close()
+            image_handler.cleanup()
+            get_http_client().log_stats()
         logger.info("Blog publishing process completed")
 
     except Exception as e:
@@ -153,4 +114,26 @@ def main():
         raise
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate blog posts from a Google Sheet and publish them to WordPress")
+    parser.add_argument('--sites', default=WORDPRESS_SITES_FILE,
+                        help="JSON file listing the WordPress sites to publish every post to")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running, polling the sheet and publishing new and changed rows")
+    parser.add_argument('--interval', type=int, default=SHEET_POLL_INTERVAL,
+                        help="Seconds between polls in watch mode")
+    parser.add_argument('--input',
+                        help="Local CSV, TSV or JSONL file to read rows from instead of the Google Sheet")
+    parser.add_argument('--rows',
+                        help="Range of input file rows to process, e.g. 1000:2000 (0-based, end exclusive)")
+    args = parser.parse_args()
+
+    source = None
+    if args.input:
+        try:
+            start, stop = parse_row_range(args.rows)
+        except ValueError as e:
+            parser.error(str(e))
+        source = LocalFileSource(args.input, start=start, stop=stop)
+    elif args.rows:
+        parser.error("--rows needs --input")
+    main(load_sites(args.sites) if args.sites else None, watch=args.watch, interval=args.interval, source=source)
\ No newline at end of file
@@ -18,13 +18,13 @@ import time
 import urllib.request
 from urllib.parse import urlparse
 import os
-import requests
-import io
-from PIL import Image
 import re
 
 #custom patch libraries
 from . import patch
+from .image_downloader import ImageDownloader
+from .image_normalizer import ImageNormalizer
+from .image_filter import ImageFilter
 
 class GoogleImageScraper():
     def __init__(self, webdriver_path, image_path, search_key="cat", number_of_images=1, headless=True, min_resolution=(0, 0), max_resolution=(1920, 1080), max_missed=10):
@@ -80,6 +80,8 @@ class GoogleImageScraper():
         self.min_resolution = min_resolution
         self.max_resolution = max_resolution
         self.max_missed = max_missed
+        self.downloader = ImageDownloader()
+        self.normalizer = ImageNormalizer()
 
     def find_image_urls(self):
         """
@@ -89,16 +91,35 @@ class GoogleImageScraper():
                 image_urls = google_image_scraper.find_image_urls()
 
         """
+        return list(self.iter_image_urls())
+
+    def iter_image_urls(self, max_urls=None):
+        """
+            This function searches for image urls and yields each one as soon as it is found,
+            so the images can be downloaded while the search continues. Stopping the iteration
+            stops the search and quits the driver.
+            Example:
+                google_image_scraper = GoogleImageScraper("webdriver_path","image_path","search_key",number_of_photos)
+                google_image_scraper.save_images(google_image_scraper.iter_image_urls(50), False, limit=10)
+
+        """
+        max_urls = max_urls or self.number_of_images
         print("[INFO] Gathering image links")
+        try:
+            yield from self._gather_image_urls(max_urls)
+        finally:
+            self.driver.quit()
+            print("[INFO] Google search ended")
+
+    def _gather_image_urls(self, max_urls):
         self.driver.get(self.url)
-        image_urls=[]
         count = 0
         missed_count = 0
         indx_1 = 0
         indx_2 = 0
         search_string = '//*[@id="rso"]/div/div/div[1]/div/div/div[%s]/div[2]/h3/a/div/div/div/g-img'
         time.sleep(3)
-        while self.number_of_images > count and missed_count < self.max_missed:
+        while max_urls > count and missed_count < self.max_missed:
             if indx_2 > 0:
                 try:
                     imgurl = self.driver.find_element(By.XPATH, search_string%(indx_1,indx_2+1))
@@ -130,6 +151,7 @@ class GoogleImageScraper():
                         indx_1 = indx_1 + 1
                         missed_count = missed_count + 1
                     
+            found = None
             try:
                 #select image from the popup
                 time.sleep(1)
@@ -141,12 +163,15 @@ class GoogleImageScraper():
                     if(("http" in src_link) and (not "encrypted" in src_link)):
                         print(
                             f"[INFO] {self.search_key} \t #{count} \t {src_link}")
-                        image_urls.append(src_link)
+                        found = src_link
                         count +=1
                         break
             except Exception:
                 print("[INFO] Unable to get link")
 
+            if found:
+                yield found
+
             try:
                 #scroll page to load next image
                 if(count%3==0):
@@ -158,74 +183,64 @@ class GoogleImageScraper():
             except Exception:
                 time.sleep(1)
 
-        self.driver.quit()
-        print("[INFO] Google search ended")
-        return image_urls
-
-    def save_images(self,image_urls, keep_filenames):
+    def save_images(self,image_urls, keep_filenames, limit=None):
         """
             This function takes in an array of image urls and save it into the given image path/directory.
+            The urls may also be a generator such as iter_image_urls(), in which case images are downloaded
+            while the search continues, and the search stops once limit images have been saved.
             Example:
                 google_image_scraper = GoogleImageScraper("webdriver_path","image_path","search_key",number_of_photos)
                 image_urls=["https://example_1.jpg","https://example_2.jpg"]
                 google_image_scraper.save_images(image_urls)
         """
         print("[INFO] Saving images, please wait...")
-        for indx,image_url in enumerate(image_urls):
+        search_string = ''.join(e for e in self.search_key if e.isalnum())
+
+        # Check resolution only if both min and max are specified
+        if all(self.min_resolution) and all(self.max_resolution):
+            image_filter = ImageFilter(min_resolution=self.min_resolution, max_resolution=self.max_resolution)
+        else:
+            image_filter = ImageFilter(min_resolution=(0, 0), max_resolution=(float('inf'), float('inf')))
+
+        pending = []
+        # Downloads run concurrently and arrive in the order they finish.
+        # Each image's format and resolution are read from its first bytes,
+        # so images failing the checks are never fully downloaded or decoded
+        for download in self.downloader.download_all(image_urls, limit=limit, image_filter=image_filter):
+            indx = download['index']
+            image_url = download['url']
+            print("[INFO] Image url:%s"%(image_url))
             try:
-                print("[INFO] Image url:%s"%(image_url))
-                search_string = ''.join(e for e in self.search_key if e.isalnum())
+                ext = download['format'].lower()
                 
-                # Download image with timeout
-                image = requests.get(image_url, timeout=10)
-                if image.status_code == 200:
-                    # Try to open the image
-                    try:
-                        image_from_web = Image.open(io.BytesIO(image.content))
-                        
-                        # Generate filename
-                        if keep_filenames:
-                            o = urlparse(image_url)
-                            image_url = o.scheme + "://" + o.netloc + o.path
-                            name = os.path.splitext(os.path.basename(image_url))[0]
-                            filename = "%s.%s"%(name, image_from_web.format.lower() if image_from_web.format else 'jpg')
-                        else:
-                            # Use original format, fallback to jpg if format is unknown
-                            ext = image_from_web.format.lower() if image_from_web.format else 'jpg'
-                            filename = "%s%s.%s"%(search_string, str(indx), ext)
-
-                        image_path = os.path.join(self.image_path, filename)
-                        
-                        # Convert to RGB if necessary
-                        if image_from_web.mode in ('RGBA', 'LA', 'P'):
-                            image_from_web = image_from_web.convert('RGB')
-                        
-                        # Save the image
-                        image_from_web.save(image_path, quality=95)
-                        print(f"[INFO] {self.search_key} \t {indx} \t Image saved at: {image_path}")
-                        
-                        # Check resolution only if both min and max are specified
-                        if all(self.min_resolution) and all(self.max_resolution):
-                            image_resolution = image_from_web.size
-                            if (image_resolution[0] < self.min_resolution[0] or 
-                                image_resolution[1] < self.min_resolution[1] or 
-                                image_resolution[0] > self.max_resolution[0] or 
-                                image_resolution[1] > self.max_resolution[1]):
-                                print(f"[INFO] Image {filename} removed due to resolution constraints")
-                                os.remove(image_path)
-                        
-                        image_from_web.close()
-                        
-                    except Exception as e:
-                        print(f"[ERROR] Failed to process image: {str(e)}")
-                        continue
-                        
+                # Generate filename
+                if keep_filenames:
+                    o = urlparse(image_url)
+                    image_url = o.scheme + "://" + o.netloc + o.path
+                    name = os.path.splitext(os.path.basename(image_url))[0]
+                    filename = "%s.%s"%(name, ext)
                 else:
-                    print(f"[ERROR] Failed to download image. Status code: {image.status_code}")
-                    
+                    filename = "%s%s.%s"%(search_string, str(indx), ext)
+
+                image_path = os.path.join(self.image_path, filename)
+
+                # Save the downloaded bytes as-is; resizing and re-encoding, when
+                # needed, happen in the normalizer's worker processes
+                with open(image_path, 'wb') as f:
+                    f.write(download['content'])
+                if self.normalizer.needs_conversion(download):
+                    pending.append((self.normalizer.submit(image_path), image_path))
+                else:
+                    print(f"[INFO] {self.search_key} \t {indx} \t Image saved at: {image_path}")
+                
             except Exception as e:
-                print(f"[ERROR] Download failed: {str(e)}")
+                print(f"[ERROR] Failed to save image: {str(e)}")
                 continue
+
+        for future, image_path in pending:
+            image_path = self.normalizer.result(future, image_path)[0]
+            print(f"[INFO] {self.search_key} \t Image saved at: {image_path}")
+        self.normalizer.shutdown()
                 
         print("--------------------------------------------------")
         print("[INFO] All downloads completed!")
@@ -0,0 +1,158 @@
+import logging
+from config.config import WORDPRESS_BATCH_SIZE
+
+# WordPress refuses batches larger than this unless a plugin raises the limit
+MAX_BATCH_SIZE = 25
+
+class BatchPublisher:
+    """Groups post creations and updates into WordPress REST batch requests.
+
+    Requests are queued with add_post/add_update and sent by flush(), in
+    /wp-json/batch/v1 requests of up to `batch_size` items when the site
+    supports batching (WordPress 5.6+), and as individual calls otherwise.
+    Items the batch endpoint rejects as not batchable are retried
+    individually, so a flush always returns one result per queued item.
+    """
+
+    def __init__(self, wordpress, batch_size=WORDPRESS_BATCH_SIZE):
+        self.setup_logging()
+        self.wordpress = wordpress
+        self.batch_size = min(max(batch_size, 1), MAX_BATCH_SIZE)
+        self.batch_url = f"{wordpress.wordpress_url}/wp-json/batch/v1"
+        self.pending = []
+        self._supported = None
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def supports_batch(self):
+        """Check once whether the site has the batch endpoint, and how many items it accepts"""
+        if self._supported is None:
+            self._supported = False
+            try:
+                response = self.wordpress.http.get(f"{self.wordpress.wordpress_url}/wp-json/", auth=self.wordpress.auth)
+                response.raise_for_status()
+                route = response.json().get('routes', {}).get('/batch/v1')
+                if route:
+                    self._supported = True
+                    endpoint = (route.get('endpoints') or [{}])[0]
+                    max_items = endpoint.get('args', {}).get('requests', {}).get('maxItems')
+                    if max_items:
+                        self.batch_size = min(self.batch_size, int(max_items))
+            except Exception as e:
+                self.logger.warning(f"Could not check for WordPress batch support: {str(e)}")
+            self.logger.info(f"WordPress batch requests {'supported' if self._supported else 'not supported'} "
+                             f"on {self.wordpress.wordpress_url}")
+        return self._supported
+
+    def add_request(self, method, path, body, context=None, terms=None):
+        """Queue a REST request, e.g. POST /wp/v2/tags; `context` is returned with its result.
+
+        `terms` gives categories and tags by name, {'categories': [...],
+        'tags': [...]}, which are created if needed and added to the body
+        by ID when the request is sent.
+        """
+        self.pending.append({'method': method, 'path': path, 'body': body, 'context': context, 'terms': terms})
+
+    def add_post(self, title, content, featured_media=None, status='publish', categories=None, tags=None,
+                 context=None):
+        """Queue a post to be created, with its categories and tags given by name"""
+        body = {'title': title, 'content': content, 'status': status}
+        if featured_media:
+            body['featured_media'] = int(featured_media)
+        terms = {'categories': list(categories or []), 'tags': list(tags or [])}
+        self.add_request('POST', '/wp/v2/posts', body, context, terms if any(terms.values()) else None)
+
+    def add_update(self, post_id, fields, context=None):
+        """Queue an update of an existing post's fields, e.g. its categories or meta"""
+        self.add_request('POST', f"/wp/v2/posts/{int(post_id)}", fields, context)
+
+    def is_full(self):
+        """Whether enough requests are queued to fill a batch"""
+        return len(self.pending) >= self.batch_size
+
+    def flush(self):
+        """Send every queued request, returning (context, response body, error) for each in order"""
+        items, self.pending = self.pending, []
+        if not items:
+            return []
+
+        self._assign_terms(items)
+        if self.batch_size <= 1 or not self.supports_batch():
+            results = [self._send_single(item) for item in items]
+        else:
+            results = []
+            for start in range(0, len(items), self.batch_size):
+                results.extend(self._send_batch(items[start:start + self.batch_size]))
+
+        # Keep the site inventory current, so later rows see the posts just created
+        if self.wordpress.inventory:
+            for item, (_, body, error) in zip(items, results):
+                if not error and item['path'] == '/wp/v2/posts' and 'id' in body:
+                    self.wordpress.inventory.add_post(body)
+        return results
+
+    def _assign_terms(self, items):
+        """Create the missing categories and tags of the queued requests in one go, then add them by ID"""
+        items = [item for item in items if item['terms']]
+        if not items:
+            return
+        self.wordpress.prepare_terms(
+            [name for item in items for name in item['terms']['categories']],
+            [name for item in items for name in item['terms']['tags']]
+        )
+        for item in items:
+            item['body'].update(self.wordpress.post_terms(**item['terms']))
+
+    def _send_batch(self, items):
+        """Send one batch request, falling back to individual calls for items it can't handle"""
+        payload = {
+            'validation': 'normal',
+            'requests': [{'method': item['method'], 'path': item['path'], 'body': item['body']} for item in items]
+        }
+        try:
+            # Not retried: a batch that reached the site may have created posts
+            response = self.wordpress.http.post(self.batch_url, auth=self.wordpress.auth, json=payload)
+            if 400 <= response.status_code < 500:
+                # The site refused the batch as a whole, so nothing in it was applied
+                self.logger.warning(f"Batch request refused with HTTP {response.status_code}, "
+                                    f"sending {len(items)} requests individually")
+                return [self._send_single(item) for item in items]
+            response.raise_for_status()
+            responses = response.json().get('responses', [])
+            if len(responses) != len(items):
+                raise ValueError(f"Batch returned {len(responses)} responses for {len(items)} requests")
+        except Exception as e:
+            # The batch may have been partly applied, so its items are not resent
+            self.logger.error(f"Batch request failed: {str(e)}")
+            return [(item['context'], None, str(e)) for item in items]
+
+        self.logger.info(f"Sent {len(items)} requests in one batch to {self.wordpress.wordpress_url}")
+        results = []
+        for item, item_response in zip(items, responses):
+            status = item_response.get('status', 500)
+            body = item_response.get('body') or {}
+            if status < 400:
+                results.append((item['context'], body, None))
+            elif body.get('code') == 'rest_batch_not_allowed':
+                results.append(self._send_single(item))
+            else:
+                message = body.get('message', f"HTTP {status}")
+                self.logger.error(f"Batched request {item['method']} {item['path']} failed: {message}")
+                results.append((item['context'], None, message))
+        return results
+
+    def _send_single(self, item):
+        """Send one queued request on its own"""
+        try:
+            response = self.wordpress.http.request(
+                item['method'],
+                f"{self.wordpress.wordpress_url}/wp-json{item['path']}",
+                auth=self.wordpress.auth,
+                json=item['body']
+            )
+            response.raise_for_status()
+            return item['context'], response.json(), None
+        except Exception as e:
+            self.logger.error(f"Request {item['method']} {item['path']} failed: {str(e)}")
+            return item['context'], None, str(e)
@@ -1,6 +1,5 @@
 import markdown2
 import logging
-import os
 import re
 from urllib.parse import urlparse
 from config.config import REQUIRED_ELEMENTS, ADSENSE_SCRIPT
@@ -39,27 +38,23 @@ class ContentProcessor:
             raise
 
     def insert_images(self, html_content, image_paths):
-        """Insert images into the HTML content with proper structure"""
+        """Insert images into the HTML content with proper structure.
+
+        Images can be paths, ImageBuffers or media already uploaded with
+        WordPressIntegration.upload_media_all.
+        """
         try:
             if not image_paths:
                 self.logger.warning("No images provided for insertion")
                 return html_content
 
-            # Upload images to WordPress and get their URLs
-            image_data = []
-            for img_path in image_paths:
-                try:
-                    if not os.path.exists(img_path):
-                        self.logger.error(f"Image file not found: {img_path}")
-                        continue
-
-                    media_data = self.wordpress.upload_media(img_path)
-                    if media_data:
-                        image_data.append(media_data)
-                        self.logger.info(f"Successfully uploaded and added image: {img_path}")
-                except Exception as e:
-                    self.logger.error(f"Error uploading image {img_path}: {str(e)}")
-                    continue
+            # Upload the images not uploaded yet to WordPress concurrently,
+            # keeping their order, and get their URLs
+            uploads = iter(self.wordpress.upload_media_all(
+                [img for img in image_paths if not isinstance(img, dict)]
+            ))
+            image_data = [img if isinstance(img, dict) else next(uploads) for img in image_paths]
+            image_data = [media_data for media_data in image_data if media_data]
 
             if not image_data:
                 self.logger.warning("No images were successfully uploaded")
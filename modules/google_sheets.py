@@ -1,19 +1,54 @@
-import requests
+import csv
+import codecs
 import logging
 from config.config import SPREADSHEET_ID as DEFAULT_SPREADSHEET_ID
+from config.config import SHEET_CHANGED_ROWS_ONLY
+from modules.http_client import get_http_client
+from modules.sheet_state import RowTracker, get_sheet_state
 
-class GoogleSheetsManager:
-    def __init__(self, spreadsheet_id=None):
+def read_csv_rows(lines, delimiter=','):
+    """Parse CSV lines into a dict per non-empty row, keyed by the stripped header names"""
+    reader = csv.reader(lines, delimiter=delimiter)
+    headers = [h.strip() for h in next(reader, [])]
+    for values in reader:
+        if not any(v.strip() for v in values):  # Skip empty rows
+            continue
+        # Pad the row with empty strings if it's shorter than headers
+        values = [v.strip() for v in values] + [''] * (len(headers) - len(values))
+        yield dict(zip(headers, values))
+
+class GoogleSheetsManager(RowTracker):
+    def __init__(self, spreadsheet_id=None, changed_only=SHEET_CHANGED_ROWS_ONLY, state=None):
         self.setup_logging()
         # Use the provided spreadsheet_id or fall back to the config value
         self.spreadsheet_id = spreadsheet_id if spreadsheet_id else DEFAULT_SPREADSHEET_ID
+        self.http = get_http_client()
+
+        # Only rows added or edited since the last successful run are read
+        # when changed_only is set; see mark_processed and save_state
+        self.changed_only = changed_only
+        self.state = state or get_sheet_state()
+        self._reset_run()
         self.logger.info(f"GoogleSheetsManager initialized with spreadsheet ID: {self.spreadsheet_id}")
 
     def setup_logging(self):
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def source_key(self):
+        return self.spreadsheet_id
+
     def get_blog_data(self):
-        """Fetch blog post data from public Google Sheet"""
+        """Fetch blog post data from public Google Sheet as a list of rows"""
+        return list(self.stream_blog_data())
+
+    def stream_blog_data(self):
+        """Fetch blog post data from public Google Sheet, yielding each row as it arrives.
+
+        The sheet is requested before this returns, so errors reaching it
+        are raised here; the rows are then parsed from the response as it
+        streams in, so memory stays flat however large the sheet is.
+        """
         try:
             # Check if spreadsheet ID is provided
             if not self.spreadsheet_id:
@@ -24,43 +59,49 @@ class GoogleSheetsManager:
             csv_url = f"https://docs.google.com/spreadsheets/d/{self.spreadsheet_id}/export?format=csv"
             self.logger.info(f"Fetching data from Google Sheet: {self.spreadsheet_id}")
 
-            # Fetch the CSV data
-            response = requests.get(csv_url)
+            self._reset_run()
+            headers = self.state.conditional_headers(self.state_key) if self.changed_only else {}
+            response = self.http.get(csv_url, stream=True, headers=headers)
+            if response.status_code == 304:
+                response.close()
+                self._not_modified = True
+                self.logger.info(f"Google Sheet {self.spreadsheet_id} unchanged since the last run")
+                return iter(())
             response.raise_for_status()
-
-            # Parse CSV data
-            csv_data = response.text.split('\n')
-            if not csv_data:
-                self.logger.warning("No data found in the spreadsheet")
-                return []
-
-            # Convert to list of dictionaries
-            headers = [h.strip() for h in csv_data[0].strip().split(',')]
-            blog_data = []
-
-            for row in csv_data[1:]:
-                if row.strip():  # Skip empty rows
-                    values = [v.strip() for v in row.strip().split(',')]
-                    if len(values) >= len(headers):
-                        post_data = dict(zip(headers, values))
-                        # Log the data we're getting for debugging
-                        self.logger.info(f"Processing post data: {post_data}")
-                        blog_data.append(post_data)
-                    else:
-                        # Pad the row with empty strings if it's shorter than headers
-                        padded_values = values + [''] * (len(headers) - len(values))
-                        post_data = dict(zip(headers, padded_values))
-                        self.logger.info(f"Processing padded post data: {post_data}")
-                        blog_data.append(post_data)
-
-            return blog_data
+            self._validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return self._read_rows(response)
         except Exception as e:
             self.logger.error(f"Error fetching blog data: {str(e)}")
             raise
 
+    def _iter_lines(self, response):
+        """Decode the response into lines as it downloads.
+
+        Line endings are kept, so the CSV parser can tell a newline inside
+        a quoted field from the end of a row.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        pending = ''
+        for chunk in response.iter_content(chunk_size=65536):
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split('\n')
+            for line in lines:
+                yield line + '\n'
+        pending += decoder.decode(b'', final=True)
+        if pending:
+            yield pending
+
+    def _read_rows(self, response):
+        """Parse the CSV export as it downloads, yielding the changed rows"""
+        try:
+            rows = read_csv_rows(self._iter_lines(response))
+            yield from self._track_rows(rows, f"Google Sheet {self.spreadsheet_id}")
+        finally:
+            response.close()
+
     def update_status(self, row_index, status):
         """This is a placeholder since we can't update public sheets without authentication"""
         self.logger.warning(f"Cannot update status in public sheet without authentication. Sheet ID: {self.spreadsheet_id}")
         # These parameters are intentionally unused as this is a placeholder method
         _ = row_index, status
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,191 @@
+import time
+import random
+import logging
+import threading
+import requests
+from collections import OrderedDict
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from config.config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRIES,
+    HTTP_RETRY_BACKOFF,
+    HTTP_RETRY_STATUSES,
+    HTTP_POOL_SIZE,
+    HTTP_MAX_HOSTS
+)
+
+# Methods that can be repeated without changing the result, and so are safe to retry
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}
+
+class HttpClient:
+    """Pooled HTTP transport shared by every outbound call.
+
+    Each host gets its own session, so connections to it are kept alive and
+    reused across calls. Only the `max_hosts` most recently used hosts keep
+    their session; image downloads reach many hosts once each, so older
+    sessions are closed rather than kept for the life of the process.
+    Requests get the configured connect and read
+    timeouts unless they pass their own, and idempotent requests that fail
+    to connect, time out or get a retryable status are retried with jittered
+    exponential backoff.
+    """
+
+    def __init__(self, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 retries=HTTP_RETRIES, backoff=HTTP_RETRY_BACKOFF, retry_statuses=HTTP_RETRY_STATUSES,
+                 pool_size=HTTP_POOL_SIZE, max_hosts=HTTP_MAX_HOSTS):
+        self.setup_logging()
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_statuses = set(retry_statuses)
+        self.pool_size = pool_size
+        self.max_hosts = max(max_hosts, 1)
+        self._sessions = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def session(self, url):
+        """Get the pooled session for a URL's host"""
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        evicted = []
+        with self._lock:
+            if host in self._sessions:
+                self._sessions.move_to_end(host)
+            else:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['Accept-Encoding'] = 'gzip, deflate'
+                self._sessions[host] = session
+                self._counters[host] = {'requests': 0, 'retries': 0, 'errors': 0}
+                while len(self._sessions) > self.max_hosts:
+                    old_host, old_session = self._sessions.popitem(last=False)
+                    self._counters.pop(old_host, None)
+                    evicted.append(old_session)
+            session = self._sessions[host]
+        # A request still using an evicted session finishes normally; its
+        # connection is closed instead of going back to the pool
+        for old_session in evicted:
+            old_session.close()
+        return host, session
+
+    def _count(self, host, counter):
+        with self._lock:
+            counters = self._counters.get(host)
+            if counters:
+                counters[counter] += 1
+
+    def retry_delay(self, attempt, response=None):
+        """Seconds to wait before a retry: Retry-After if given, else full-jitter exponential backoff"""
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.isdigit():
+            return min(int(retry_after), 60)
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def request(self, method, url, timeout=None, retry=None, retries=None, **kwargs):
+        """Send a request over the host's pooled session.
+
+        `retry` defaults to whether the method is idempotent; pass True for
+        calls known to be safe to repeat. `retries` overrides the configured
+        number of retries.
+        """
+        method = method.upper()
+        host, session = self.session(url)
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        retries = self.retries if retries is None else retries
+        attempts = retries + 1 if retry else 1
+
+        for attempt in range(attempts):
+            self._count(host, 'requests')
+            last_attempt = attempt == attempts - 1
+            try:
+                response = session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count(host, 'errors')
+                if last_attempt:
+                    raise
+                delay = self.retry_delay(attempt)
+                self.logger.warning(f"{method} {url} failed ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in self.retry_statuses or last_attempt:
+                    return response
+                self._count(host, 'errors')
+                delay = self.retry_delay(attempt, response)
+                self.logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+            self._count(host, 'retries')
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def stats(self):
+        """Per-host request counts and connection reuse, for tuning pool sizes and timeouts.
+
+        Only hosts that still have a session are included. `connections`
+        is the number of connections opened; every other request reused a
+        kept-alive connection.
+        """
+        with self._lock:
+            hosts = list(self._sessions.items())
+            counters = {host: dict(counts) for host, counts in self._counters.items()}
+
+        stats = {}
+        for host, session in hosts:
+            connections = 0
+            pool_requests = 0
+            adapter = session.get_adapter(host)
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    pool_requests += pool.num_requests
+            stats[host] = dict(counters[host], connections=connections,
+                               reused=max(pool_requests - connections, 0))
+        return stats
+
+    def log_stats(self):
+        """Log the connection statistics for each host"""
+        for host, host_stats in self.stats().items():
+            self.logger.info(
+                f"HTTP {host}: {host_stats['requests']} requests, {host_stats['connections']} connections "
+                f"opened, {host_stats['reused']} reused, {host_stats['retries']} retries, "
+                f"{host_stats['errors']} errors"
+            )
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = OrderedDict()
+            self._counters = {}
+        for session in sessions:
+            session.close()
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+def get_http_client():
+    """Get the process-wide HTTP client, so every integration shares its connection pools"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
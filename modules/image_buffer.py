@@ -0,0 +1,58 @@
+import os
+import mimetypes
+from io import BytesIO
+from PIL import Image
+
+# MIME types for the formats images are identified or normalized as
+FORMAT_MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+    'GIF': 'image/gif'
+}
+
+class ImageBuffer:
+    """An image held in memory, with the MIME type and filename to upload it as.
+
+    Downloaded images travel through normalization to the upload as buffers,
+    without touching the disk. `path` is set if the image was also written
+    to a file.
+    """
+
+    def __init__(self, data, mime_type, filename, path=None):
+        self.data = data
+        self.mime_type = mime_type
+        self.filename = filename
+        self.path = path
+
+    def __str__(self):
+        return self.path or self.filename
+
+    def __repr__(self):
+        return f"ImageBuffer({self.filename!r}, {self.mime_type}, {len(self.data)} bytes)"
+
+    def open(self):
+        """Get a file object reading the image's bytes"""
+        return BytesIO(self.data)
+
+    def spill(self, directory):
+        """Write the image to a file in directory and return its path"""
+        path = os.path.join(directory, self.filename)
+        with open(path, 'wb') as f:
+            f.write(self.data)
+        self.path = path
+        return path
+
+    @classmethod
+    def from_file(cls, path):
+        """Read an image file into a buffer"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        mime_type = mimetypes.guess_type(path)[0] or 'image/jpeg'
+        return cls(data, mime_type, os.path.basename(path), path=path)
+
+def open_image(image):
+    """Open an image given as a file path or an ImageBuffer with Pillow"""
+    if isinstance(image, ImageBuffer):
+        return Image.open(image.open())
+    return Image.open(image)
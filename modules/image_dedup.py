@@ -0,0 +1,168 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+from PIL import Image
+from modules.image_buffer import open_image
+from modules.storage import write_json_atomic, SharedInstances
+from config.config import (
+    IMAGE_DEDUP_THRESHOLD,
+    IMAGE_DEDUP_SITE_HISTORY,
+    IMAGE_DEDUP_HISTORY_SIZE,
+    IMAGE_DEDUP_HISTORY_PATH
+)
+
+HASH_SIZE = 8  # 8x8 gradient bits -> 64-bit hash
+
+def dhash(image_path, hash_size=HASH_SIZE, thumbnail=None):
+    """Compute the difference hash of an image.
+
+    The image is reduced to a tiny grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right-hand neighbour, so resized or
+    re-encoded copies of a picture hash to (nearly) the same value. An
+    existing thumbnail of the image can be passed to avoid decoding the file.
+    """
+    if thumbnail is not None:
+        small = thumbnail.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+        return int.from_bytes(np.packbits(_gradient_bits(small)).tobytes(), 'big')
+
+    with open_image(image_path) as image:
+        # JPEGs can be decoded straight to a small grayscale draft
+        image.draft('L', (hash_size * 4, hash_size * 4))
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    return int.from_bytes(np.packbits(_gradient_bits(small)).tobytes(), 'big')
+
+def _gradient_bits(image):
+    """Compare each pixel of a grayscale image with its right-hand neighbour"""
+    pixels = np.asarray(image, dtype=np.int16)
+    return pixels[:, 1:] > pixels[:, :-1]
+
+def image_area(image_path):
+    """Get an image's pixel count from its header"""
+    with open_image(image_path) as image:
+        return image.size[0] * image.size[1]
+
+def hamming_distances(image_hash, hashes):
+    """Count the differing bits between one hash and an array of hashes"""
+    if len(hashes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    xor = np.asarray(hashes, dtype=np.uint64) ^ np.uint64(image_hash)
+    return np.unpackbits(xor.view(np.uint8)).reshape(len(xor), -1).sum(axis=1)
+
+class ImageDeduplicator:
+    """Drops near-duplicate images using perceptual hashes"""
+
+    def __init__(self, threshold=IMAGE_DEDUP_THRESHOLD, use_site_history=IMAGE_DEDUP_SITE_HISTORY,
+                 history_size=IMAGE_DEDUP_HISTORY_SIZE, history_path=IMAGE_DEDUP_HISTORY_PATH):
+        self.setup_logging()
+        self.threshold = threshold
+        self.use_site_history = use_site_history
+        self.history_size = history_size
+        self.history_path = history_path
+        self._lock = threading.Lock()
+        self.history = self._load_history() if use_site_history else {}
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load_history(self):
+        """Load the per-site hash history from disk"""
+        if not os.path.exists(self.history_path):
+            return {}
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                return {site: [int(h, 16) for h in hashes] for site, hashes in json.load(f).items()}
+        except Exception as e:
+            self.logger.warning(f"Could not read image history {self.history_path}: {str(e)}")
+            return {}
+
+    def _save_history(self):
+        """Write the per-site hash history atomically"""
+        write_json_atomic(self.history_path,
+                          {site: [format(h, '016x') for h in hashes] for site, hashes in self.history.items()})
+
+    def is_near_duplicate(self, image_hash, hashes):
+        """Check whether a hash is within the threshold of any of the given hashes"""
+        hashes = [h for h in hashes if h is not None]
+        return bool(hashes) and hamming_distances(image_hash, hashes).min() <= self.threshold
+
+    def filter_unique(self, image_paths, site=None, thumbnails=None, hashes=None):
+        """Remove near-duplicates, keeping the largest copy of each picture.
+
+        The surviving images keep the position of their group's first
+        occurrence. When site history is enabled, images close to ones
+        recently published on the site are dropped as well. `thumbnails`
+        optionally maps paths to (size, thumbnail) pairs to hash from, and
+        `hashes` maps paths to hashes already computed.
+        """
+        thumbnails = thumbnails or {}
+        hashes = hashes or {}
+        candidates = []
+        for image_path in image_paths:
+            try:
+                size, thumbnail = thumbnails.get(image_path, (None, None))
+                image_hash = hashes.get(image_path)
+                if image_hash is None:
+                    image_hash = dhash(image_path, thumbnail=thumbnail)
+                area = size[0] * size[1] if size else image_area(image_path)
+                candidates.append((image_path, image_hash, area))
+            except Exception as e:
+                self.logger.warning(f"Could not hash image {image_path}: {str(e)}")
+                candidates.append((image_path, None, 0))
+
+        with self._lock:
+            recent = list(self.history.get(site, [])) if (site and self.use_site_history) else []
+
+        kept = []  # [path, hash, area] per group of near-duplicates
+        for image_path, image_hash, area in candidates:
+            if image_hash is None:
+                kept.append([image_path, None, area])
+                continue
+
+            if recent and hamming_distances(image_hash, recent).min() <= self.threshold:
+                self.logger.info(f"Dropping {image_path}: recently published on {site}")
+                continue
+
+            group_hashes = [group[1] for group in kept if group[1] is not None]
+            if group_hashes:
+                distances = hamming_distances(image_hash, group_hashes)
+                closest = int(distances.argmin())
+                if distances[closest] <= self.threshold:
+                    group = [group for group in kept if group[1] is not None][closest]
+                    self.logger.info(f"Dropping near-duplicate image: {image_path} matches {group[0]}")
+                    if area > group[2]:
+                        group[0], group[2] = image_path, area
+                    continue
+
+            kept.append([image_path, image_hash, area])
+
+        return [group[0] for group in kept]
+
+    def remember(self, image_paths, site):
+        """Record images published on a site so later posts can avoid them"""
+        if not (site and self.use_site_history):
+            return
+        hashes = []
+        for image_path in image_paths:
+            try:
+                hashes.append(dhash(image_path))
+            except Exception as e:
+                self.logger.warning(f"Could not hash image {image_path}: {str(e)}")
+        self.remember_hashes(hashes, site)
+
+    def remember_hashes(self, hashes, site):
+        """Record the hashes of images published on a site"""
+        if not (site and self.use_site_history) or not hashes:
+            return
+        with self._lock:
+            site_history = self.history.setdefault(site, [])
+            site_history.extend(hashes)
+            del site_history[:-self.history_size]
+            self._save_history()
+
+_shared_deduplicators = SharedInstances(lambda history_path: ImageDeduplicator(history_path=history_path))
+
+def get_image_deduplicator(history_path=IMAGE_DEDUP_HISTORY_PATH):
+    """Get the process-wide deduplicator for a history file, so concurrent runs share one history"""
+    return _shared_deduplicators.get(history_path)
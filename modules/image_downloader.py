@@ -0,0 +1,251 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from config.config import (
+    IMAGE_DOWNLOAD_WORKERS,
+    IMAGE_DOWNLOAD_PER_HOST,
+    IMAGE_DOWNLOAD_TIMEOUT,
+    HTTP_MAX_HOSTS
+)
+from modules.image_filter import ImageRejected
+from modules.http_client import get_http_client
+from modules.log_broadcaster import get_log_context, set_log_context, submit_with_context
+
+BROWSER_USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+)
+
+# File extensions for the image content types we expect from search results
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': 'jpeg',
+    'image/jpg': 'jpeg',
+    'image/png': 'png',
+    'image/webp': 'webp',
+    'image/gif': 'gif'
+}
+
+# File extensions for the formats identified from image headers
+FORMAT_EXTENSIONS = {'JPEG': 'jpeg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+class ImageDownloader:
+    def __init__(self, max_workers=IMAGE_DOWNLOAD_WORKERS, per_host=IMAGE_DOWNLOAD_PER_HOST,
+                 timeout=IMAGE_DOWNLOAD_TIMEOUT, max_hosts=HTTP_MAX_HOSTS):
+        self.setup_logging()
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_hosts = max(max_hosts, 1)
+
+        # Connections to each host are pooled and reused by all workers
+        self.http = get_http_client()
+        self.headers = {'User-Agent': BROWSER_USER_AGENT}
+
+        # host -> [semaphore, downloads holding or waiting for it], least recently used first
+        self._host_slots = OrderedDict()
+        self._host_lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _host_slot(self, host):
+        """Get the semaphore limiting concurrent connections to a host, for one download.
+
+        Only the `max_hosts` most recently used hosts keep their semaphore,
+        as image downloads reach many hosts once each; a host's semaphore
+        is never dropped while a download holds or waits for it. Each call
+        must be matched by _leave_host once the download is done.
+        """
+        with self._host_lock:
+            entry = self._host_slots.get(host)
+            if entry is None:
+                entry = self._host_slots[host] = [threading.BoundedSemaphore(self.per_host), 0]
+            else:
+                self._host_slots.move_to_end(host)
+            entry[1] += 1
+            idle = [old_host for old_host, (_, users) in self._host_slots.items() if not users]
+            for old_host in idle[:max(len(self._host_slots) - self.max_hosts, 0)]:
+                del self._host_slots[old_host]
+            return entry[0]
+
+    def _leave_host(self, host):
+        with self._host_lock:
+            entry = self._host_slots.get(host)
+            if entry:
+                entry[1] -= 1
+
+    def download(self, url, dest_dir=None, filename_stem='image', image_filter=None):
+        """Download a single image before its deadline.
+
+        The image is written to dest_dir when one is given, otherwise its bytes
+        are returned in the result under 'content'. With an image_filter, the
+        format and dimensions are read from the first bytes received and the
+        download is abandoned with ImageRejected as soon as the image is
+        disqualified; accepted images get 'format', 'size' and 'exif' entries.
+        """
+        deadline = time.monotonic() + self.timeout
+        host = urlparse(url).netloc.lower()
+        slot = self._host_slot(host)
+        if not slot.acquire(timeout=self.timeout):
+            self._leave_host(host)
+            raise TimeoutError(f"Timed out waiting for a connection to {host}")
+
+        filepath = None
+        info = None
+        try:
+            remaining = max(deadline - time.monotonic(), 0.1)
+            # Not retried: searches find more URLs than needed, and another
+            # image is quicker than waiting out a backoff
+            response = self.http.get(url, stream=True, timeout=remaining, retries=0, headers=self.headers)
+            try:
+                response.raise_for_status()
+                if image_filter:
+                    image_filter.check_response(response.headers)
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                ext = CONTENT_TYPE_EXTENSIONS.get(content_type, 'jpg')
+
+                chunks = []
+                output = None
+                header = bytearray()
+                received = 0
+                try:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        if time.monotonic() > deadline:
+                            raise TimeoutError(f"Download exceeded {self.timeout}s deadline")
+                        received += len(chunk)
+
+                        if image_filter:
+                            image_filter.check_size(received)
+                            if info is None:
+                                # Hold data back until the header shows the image is wanted
+                                header.extend(chunk)
+                                info = image_filter.check_header(bytes(header))
+                                if info is None:
+                                    continue
+                                ext = FORMAT_EXTENSIONS.get(info['format'], ext)
+                                chunk = bytes(header)
+
+                        if dest_dir and output is None:
+                            filepath = os.path.join(dest_dir, f"{filename_stem}.{ext}")
+                            output = open(filepath, 'wb')
+                        if output:
+                            output.write(chunk)
+                        else:
+                            chunks.append(chunk)
+                finally:
+                    if output:
+                        output.close()
+
+                if not received:
+                    raise ValueError("Empty response body")
+                if image_filter and info is None:
+                    raise ImageRejected("Download ended before the image header")
+            finally:
+                response.close()
+        except Exception:
+            # Don't leave partial files behind for later stages to pick up
+            if filepath and os.path.exists(filepath):
+                os.remove(filepath)
+            raise
+        finally:
+            slot.release()
+            self._leave_host(host)
+
+        result = {'url': url, 'content_type': content_type}
+        if info:
+            result.update(info)
+        if dest_dir:
+            result['path'] = filepath
+        else:
+            result['content'] = b''.join(chunks)
+        return result
+
+    def download_all(self, urls, dest_dir=None, prefix='image', limit=None, image_filter=None):
+        """Download images concurrently, yielding results in the order they finish.
+
+        `urls` may be any iterable, including a generator still searching for
+        more: each URL is queued for download as soon as it is produced, on a
+        separate thread, so searching and downloading overlap. Failed and
+        rejected downloads are logged and skipped. Stops once `limit` images
+        have been yielded, or earlier if the caller stops iterating; the URL
+        source is then closed before this returns, and downloads still
+        queued are cancelled.
+        """
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        finished = queue.Queue()
+        stop = threading.Event()
+        futures = []
+        # The search and the downloads log under the caller's job, post and stage
+        context = get_log_context()
+
+        def produce():
+            set_log_context(**context)
+            submitted = 0
+            try:
+                for index, url in enumerate(urls):
+                    if stop.is_set():
+                        break
+                    future = submit_with_context(executor, self.download, url, dest_dir, f"{prefix}{index}",
+                                                 image_filter)
+                    futures.append(future)
+                    future.add_done_callback(lambda f, index=index, url=url: finished.put((index, url, f)))
+                    submitted += 1
+            except Exception as e:
+                if not stop.is_set():
+                    self.logger.warning(f"Error collecting image URLs: {str(e)}")
+            finally:
+                # Stop a generator that is still searching, e.g. to close its browser
+                if hasattr(urls, 'close'):
+                    try:
+                        urls.close()
+                    except Exception as e:
+                        self.logger.warning(f"Error closing image URL source: {str(e)}")
+                # Tell the consumer how many results to expect
+                finished.put((None, submitted, None))
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        delivered = 0
+        received = 0
+        total = None
+        try:
+            while total is None or received < total:
+                index, url, future = finished.get()
+                if index is None:
+                    total = url
+                    continue
+                received += 1
+                try:
+                    result = future.result()
+                except ImageRejected as e:
+                    self.logger.info(f"Skipped image {index} ({url}): {str(e)}")
+                    continue
+                except Exception as e:
+                    self.logger.warning(f"Error downloading image {index} ({url}): {str(e)}")
+                    continue
+
+                result['index'] = index
+                self.logger.info(f"Downloaded image {index}: {url}")
+                yield result
+                delivered += 1
+                if limit and delivered >= limit:
+                    break
+        finally:
+            stop.set()
+            # Wait for the producer to stop and close the URL source, so a
+            # search still running can't outlive this call, e.g. clicking in
+            # a browser the next search will use
+            producer.join()
+            for future in list(futures):
+                future.cancel()
+            # In-flight downloads finish on their own deadline; don't hold up the caller
+            executor.shutdown(wait=False)
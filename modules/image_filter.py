@@ -0,0 +1,132 @@
+import struct
+from config.config import (
+    IMAGE_MIN_RESOLUTION,
+    IMAGE_MAX_RESOLUTION,
+    IMAGE_MAX_BYTES,
+    IMAGE_ALLOWED_FORMATS,
+    IMAGE_PROBE_BYTES
+)
+
+# JPEG start-of-frame markers, which carry the image dimensions
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+class ImageRejected(Exception):
+    """Raised when an image is disqualified before it is fully downloaded"""
+
+def _probe_jpeg(data):
+    """Read dimensions and EXIF presence from the JPEG markers before the first frame"""
+    exif = False
+    offset = 2
+    while True:
+        if offset + 4 > len(data):
+            return None
+        if data[offset] != 0xFF:
+            raise ImageRejected("Malformed JPEG header")
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # Standalone markers carry no length
+            offset += 2
+            continue
+        length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return {'format': 'JPEG', 'size': (width, height), 'exif': exif}
+        if marker == 0xE1 and data[offset + 4:offset + 10] == b'Exif\x00\x00':
+            exif = True
+        offset += 2 + length
+
+def _probe_webp(data):
+    """Read dimensions and EXIF presence from the first WebP chunk"""
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', data[26:30])
+        return {'format': 'WEBP', 'size': (width & 0x3FFF, height & 0x3FFF), 'exif': False}
+    if chunk == b'VP8L':
+        bits = struct.unpack('<I', data[21:25])[0]
+        return {'format': 'WEBP', 'size': ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1), 'exif': False}
+    if chunk == b'VP8X':
+        flags = data[20]
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return {'format': 'WEBP', 'size': (width, height), 'exif': bool(flags & 0x08)}
+    raise ImageRejected("Unrecognized WebP chunk")
+
+def probe_image_header(data):
+    """Identify an image's format and dimensions from the start of its bytes.
+
+    Returns a dict with 'format', 'size' and 'exif', or None if more data
+    is needed. Raises ImageRejected for data that is not a supported image.
+    """
+    if len(data) < 12:
+        return None
+    if data.startswith(b'\xff\xd8'):
+        return _probe_jpeg(data)
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        if len(data) < 24:
+            return None
+        width, height = struct.unpack('>II', data[16:24])
+        return {'format': 'PNG', 'size': (width, height), 'exif': False}
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', data[6:10])
+        return {'format': 'GIF', 'size': (width, height), 'exif': False}
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return _probe_webp(data)
+    raise ImageRejected("Not a supported image format")
+
+class ImageFilter:
+    """Disqualifies images from their headers so rejected images are never fully downloaded"""
+
+    def __init__(self, min_resolution=IMAGE_MIN_RESOLUTION, max_resolution=IMAGE_MAX_RESOLUTION,
+                 max_bytes=IMAGE_MAX_BYTES, allowed_formats=IMAGE_ALLOWED_FORMATS,
+                 probe_bytes=IMAGE_PROBE_BYTES):
+        self.min_resolution = min_resolution
+        self.max_resolution = max_resolution
+        self.max_bytes = max_bytes
+        self.allowed_formats = [fmt.upper() for fmt in allowed_formats]
+        self.probe_bytes = probe_bytes
+
+    def check_response(self, headers):
+        """Reject responses whose headers already rule them out"""
+        content_type = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type and not content_type.startswith(('image/', 'application/octet-stream')):
+            raise ImageRejected(f"Content-Type is {content_type}")
+
+        content_length = headers.get('Content-Length')
+        if self.max_bytes and content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise ImageRejected(f"Image is {int(content_length)} bytes, limit is {self.max_bytes}")
+
+    def check_size(self, received):
+        """Reject a download once it grows beyond the byte limit"""
+        if self.max_bytes and received > self.max_bytes:
+            raise ImageRejected(f"Image exceeded {self.max_bytes} bytes")
+
+    def check_header(self, data):
+        """Check the start of an image, returning its header info once it can be read.
+
+        Returns None while more data is needed.
+        """
+        info = probe_image_header(data)
+        if info is None:
+            if len(data) >= self.probe_bytes:
+                raise ImageRejected(f"No image header within the first {self.probe_bytes} bytes")
+            return None
+
+        if info['format'] not in self.allowed_formats:
+            raise ImageRejected(f"Format {info['format']} is not allowed")
+
+        width, height = info['size']
+        min_width, min_height = self.min_resolution
+        max_width, max_height = self.max_resolution
+        if width < min_width or height < min_height:
+            raise ImageRejected(f"Image is {width}x{height}, smaller than {min_width}x{min_height}")
+        if width > max_width or height > max_height:
+            raise ImageRejected(f"Image is {width}x{height}, larger than {max_width}x{max_height}")
+        return info
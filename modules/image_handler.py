@@ -1,222 +1,317 @@
 import os
-import time
 import logging
-import requests
-import subprocess
-from PIL import Image
-from io import BytesIO
 from config.config import (
     DEFAULT_IMAGE_PATH,
-    IMAGE_DOWNLOAD_PATH
+    IMAGE_DOWNLOAD_PATH,
+    IMAGE_SCORE_THUMBNAIL,
+    IMAGE_SEARCH_PROVIDERS,
+    IMAGE_SEARCH_OVERFETCH,
+    IMAGE_KEEP_FILES
 )
 import sys
 # Add the parent directory of the current file to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from .GoogleImageScraper import GoogleImageScraper
+from .image_downloader import ImageDownloader, FORMAT_EXTENSIONS
+from .media_store import get_media_store
+from .image_normalizer import ImageNormalizer
+from .image_dedup import get_image_deduplicator, dhash
+from .image_scorer import ImageScorer
+from .image_filter import ImageFilter
+from .image_search import create_providers
+from .search_cache import get_search_cache
+from .image_workspace import get_image_workspace
+from .image_buffer import ImageBuffer, FORMAT_MIME_TYPES
 
 class ImageHandler:
-    def __init__(self, temp_dir=IMAGE_DOWNLOAD_PATH):
+    def __init__(self, temp_dir=IMAGE_DOWNLOAD_PATH, media_store=None, providers=None, search_cache=None,
+                 workspace=None):
         self.temp_dir = temp_dir
         self.default_dir = DEFAULT_IMAGE_PATH
         self.logger = logging.getLogger(__name__)
-        os.makedirs(temp_dir, exist_ok=True)
         os.makedirs(DEFAULT_IMAGE_PATH, exist_ok=True)
-
-        # Initialize Google Image Scraper
-        self.webdriver_path = os.path.join(os.path.dirname(__file__), 'webdriver', 'chromedriver')
-
-        # Check if ChromeDriver exists
-        if not os.path.exists(self.webdriver_path):
-            self.logger.warning("ChromeDriver not found at: %s", self.webdriver_path)
-
-            # Try to install ChromeDriver
-            if self._install_chromedriver():
-                self.logger.info("ChromeDriver installed successfully")
-            else:
-                self.logger.error("Failed to install ChromeDriver")
-                self.webdriver_path = None
-
-    def _install_chromedriver(self):
-        """Attempt to install ChromeDriver"""
+        # Images are kept in memory; when they are also written to disk, they
+        # go to a directory of their own for this run, inside a workspace
+        # that keeps all runs within a disk budget
+        self.keep_files = IMAGE_KEEP_FILES
+        self.workspace = workspace or get_image_workspace(temp_dir)
+        self.run_dir = self.workspace.create_run()
+        self.images_in_use = []
+        self.downloader = ImageDownloader()
+        self.image_filter = ImageFilter()
+        self.media_store = media_store or get_media_store()
+        # The normalizer also returns a small thumbnail of each image, which
+        # deduplication and scoring use instead of decoding the file again;
+        # each image's perceptual hash is computed once, from its thumbnail
+        self.normalizer = ImageNormalizer(thumbnail_edge=IMAGE_SCORE_THUMBNAIL)
+        self.deduplicator = get_image_deduplicator()
+        self.scorer = ImageScorer(thumbnail_size=IMAGE_SCORE_THUMBNAIL)
+        self.thumbnails = {}
+        self.image_hashes = {}
+
+        # Image sources, tried in order until enough images are found
+        self.providers = create_providers(providers or IMAGE_SEARCH_PROVIDERS)
+        # Image URLs found per query, so rows sharing a topic don't repeat the search
+        self.search_cache = search_cache or get_search_cache()
+
+    def search_provider(self, provider, search_query, num_images=5):
+        """Find images with one provider, downloading remote results"""
         try:
-            # Check if chromedriver_installer.py exists
-            installer_path = os.path.join(os.path.dirname(__file__), 'chromedriver_installer.py')
-            if not os.path.exists(installer_path):
-                self.logger.error("ChromeDriver installer not found")
-                return False
-
-            # Run the ChromeDriver installer
-            self.logger.info("Attempting to install ChromeDriver...")
-            result = subprocess.run([sys.executable, installer_path],
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   text=True)
-
-            if result.returncode == 0:
-                self.logger.info("ChromeDriver installed successfully")
-                return True
-            else:
-                self.logger.error(f"ChromeDriver installation failed: {result.stderr}")
-                return False
-        except Exception as e:
-            self.logger.error(f"Error installing ChromeDriver: {str(e)}")
-            return False
+            if provider.local:
+                # Local images are used as they are; they are never
+                # normalized in place or moved into the image store
+                return provider.search(search_query, num_images)
+
+            # Ask for extra URLs since some downloads fail or are rejected
+            num_urls = num_images * IMAGE_SEARCH_OVERFETCH
+            image_urls = self.search_cache.get(provider.name, search_query, num_urls, num_images)
+            if image_urls is not None:
+                self.logger.info(f"Using {len(image_urls)} cached {provider.name} results for: {search_query}")
+                image_paths = self.download_images(image_urls, search_query, num_images)
+                if image_paths or not image_urls:
+                    return image_paths
+                # None of the cached URLs work any more, so search again
+                self.search_cache.invalidate(provider.name, search_query)
+
+            # Download each URL as soon as the provider finds it; the search
+            # is stopped once enough images have passed validation
+            search = {'urls': [], 'complete': False, 'failed': False}
+            image_paths = self.download_images(
+                self._record_search(provider.iter_search(search_query, num_urls), search),
+                search_query,
+                num_images
+            )
 
-    def search_google_images(self, search_query, num_images=5):
-        """Search images using Google Image Scraper"""
-        if not self.webdriver_path:
-            self.logger.warning("ChromeDriver not available, skipping Google Images search")
+            if not search['failed']:
+                # A search stopped early is only good for as many images as
+                # its URLs produced
+                produced = None if search['complete'] else len(image_paths)
+                self.search_cache.put(provider.name, search_query, search['urls'], num_urls, produced)
+            return image_paths
+        except Exception as e:
+            self.logger.error(f"Error in {provider.name} image search: {str(e)}")
             return []
 
-        # Create a directory for the search results
-        search_dir = os.path.join(self.temp_dir, search_query)
-        os.makedirs(search_dir, exist_ok=True)
-
-        # Use a more reliable approach with webdriver-manager
+    def _record_search(self, image_urls, search):
+        """Pass search results through, noting the URLs found and whether the search finished"""
         try:
-            from selenium import webdriver
-            from selenium.webdriver.chrome.service import Service
-            from selenium.webdriver.chrome.options import Options
-            from webdriver_manager.chrome import ChromeDriverManager
-
-            # Set up Chrome options
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-
-            # Initialize the Chrome driver with webdriver-manager
-            self.logger.info("Initializing Chrome driver with webdriver-manager")
-            driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=chrome_options
-            )
-
-            # Set up the search URL
-            search_url = f"https://www.google.com/search?q={search_query}&tbm=isch"
-            self.logger.info(f"Searching Google Images with URL: {search_url}")
-
-            # Navigate to the search URL
-            driver.get(search_url)
-
-            # Wait for the page to load
-            import time
-            time.sleep(2)
+            for url in image_urls:
+                search['urls'].append(url)
+                yield url
+            search['complete'] = True
+        except Exception:
+            search['failed'] = True
+            raise
+        finally:
+            image_urls.close()
+
+    def download_images(self, image_urls, search_query, num_images=5):
+        """Download and normalize images from an iterable of URLs until num_images distinct ones are found.
+
+        Images are returned as in-memory ImageBuffers, which are also written
+        to this run's workspace when IMAGE_KEEP_FILES is set. Near-duplicates
+        are returned too, for filter_unique to keep the best copy of each
+        picture, but don't count towards num_images.
+        """
+        clean_query = ''.join(c if c.isalnum() else '' for c in search_query)
+
+        # Download the images concurrently over the shared session.
+        # Images are checked from their headers, so unsuitable ones are
+        # abandoned before their bodies are transferred
+        downloads = self.downloader.download_all(
+            image_urls,
+            prefix=clean_query,
+            image_filter=self.image_filter
+        )
+
+        # Hand each image to the normalization processes as soon as it
+        # arrives, so the work overlaps the remaining downloads; images that
+        # need no resizing or re-encoding only get their thumbnail made
+        pending = []
+        finished = []
+        distinct = []  # Hashes of the distinct pictures found so far
+        try:
+            for download in downloads:
+                image = ImageBuffer(
+                    download['content'],
+                    FORMAT_MIME_TYPES[download['format']],
+                    f"{clean_query}{download['index']}.{FORMAT_EXTENSIONS[download['format']]}"
+                )
+                if self.normalizer.needs_conversion(download):
+                    future = self.normalizer.submit(image)
+                else:
+                    future = self.normalizer.describe(image)
+                pending.append((future, image, download['size']))
+
+                # Once there could be enough, wait for the pending images'
+                # hashes to tell how many distinct pictures there are
+                if len(distinct) + len(pending) >= num_images:
+                    finished += [self._finish_image(*item, distinct) for item in pending]
+                    pending = []
+                    if len(distinct) >= num_images:
+                        break
+        finally:
+            downloads.close()
+        finished += [self._finish_image(*item, distinct) for item in pending]
+
+        # Each search gets a fresh directory, so earlier results are never picked up
+        search_dir = None
+        if self.keep_files and finished:
+            search_dir = self.workspace.create_dir(self.run_dir, clean_query or 'search')
+
+        # Only return images downloaded by this search, once each
+        images = []
+        seen = set()
+        for image, size, thumbnail, image_hash in finished:
+            content_hash = self.media_store.hash_bytes(image.data)
+            if content_hash in seen:
+                continue
+            seen.add(content_hash)
+
+            if search_dir:
+                # Keep the file until the post using it is finished
+                self.workspace.add(image.spill(search_dir))
+                self.images_in_use.append(image.path)
+            if thumbnail is not None:
+                self.thumbnails[image] = (size, thumbnail)
+            if image_hash is not None:
+                self.image_hashes[image] = image_hash
+            images.append(image)
+        return images
+
+    def _finish_image(self, future, image, size, distinct):
+        """Wait for an image's normalization and hash it from its thumbnail, adding new pictures to distinct.
+
+        Returns (image, size, thumbnail, hash); the hash is None if the
+        image has no thumbnail.
+        """
+        image, normalized_size, thumbnail = self.normalizer.result(future, image)
+        image_hash = None
+        if thumbnail is not None:
+            image_hash = dhash(None, thumbnail=thumbnail)
+        if image_hash is None or not self.deduplicator.is_near_duplicate(image_hash, distinct):
+            distinct.append(image_hash)
+        return image, normalized_size or size, thumbnail, image_hash
+
+    def search_and_download_images(self, topic, keywords, num_images=5, site=None):
+        """Search for images with each provider in turn until enough are found"""
+        try:
+            # A new search means the previous post is finished with its images
+            self.release_images()
 
-            # Find image elements
-            from selenium.webdriver.common.by import By
-            img_elements = driver.find_elements(By.CSS_SELECTOR, "img.rg_i")
+            search_query = f"{topic} {keywords}"
+            self.logger.info(f"Searching for images with query: {search_query}")
 
-            # Get image URLs
-            image_urls = []
-            for i, img in enumerate(img_elements):
-                if i >= num_images:
+            # Drop the same picture returned at different sizes, and optionally
+            # pictures the site has published recently, after each provider,
+            # so the next one is only asked for the pictures still missing
+            image_paths = []
+            unique = []
+            for provider in self.providers:
+                if len(unique) >= num_images:
                     break
+                found = self.search_provider(provider, search_query, num_images - len(unique))
+                image_paths += [path for path in found if path not in image_paths]
+                unique = self.deduplicator.filter_unique(image_paths, site=site, thumbnails=self.thumbnails,
+                                                         hashes=self.image_hashes)
 
-                try:
-                    # Get the image source
-                    img.click()
-                    time.sleep(1)
-
-                    # Find the larger image
-                    large_img = driver.find_elements(By.CSS_SELECTOR, "img.r48jcc")
-                    if large_img:
-                        src = large_img[0].get_attribute("src")
-                        if src and src.startswith("http"):
-                            image_urls.append(src)
-                            self.logger.info(f"Found image URL: {src}")
-                except Exception as e:
-                    self.logger.warning(f"Error getting image {i}: {str(e)}")
-                    continue
-
-            # Close the driver
-            driver.quit()
-
-            # Download the images
-            for i, url in enumerate(image_urls):
-                try:
-                    # Download the image
-                    response = requests.get(url, stream=True, timeout=10)
-                    if response.status_code == 200:
-                        # Generate a filename
-                        ext = "jpg"  # Default extension
-                        if "image/png" in response.headers.get("Content-Type", ""):
-                            ext = "png"
-                        elif "image/jpeg" in response.headers.get("Content-Type", ""):
-                            ext = "jpeg"
-                        elif "image/webp" in response.headers.get("Content-Type", ""):
-                            ext = "webp"
-
-                        # Clean the search query for filename
-                        clean_query = ''.join(c if c.isalnum() else '' for c in search_query)
-                        filename = f"{clean_query}{i}.{ext}"
-                        filepath = os.path.join(search_dir, filename)
-
-                        # Save the image
-                        with open(filepath, "wb") as f:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                f.write(chunk)
-
-                        self.logger.info(f"Saved image to {filepath}")
-                except Exception as e:
-                    self.logger.warning(f"Error downloading image {i}: {str(e)}")
-                    continue
-
-            # Get the saved image paths
-            if not os.path.exists(search_dir):
+            if not image_paths:
+                self.logger.warning("No images found from any image search provider")
                 return []
 
-            # Accept all image files
-            return [os.path.join(search_dir, f)
-                   for f in os.listdir(search_dir)
-                   if os.path.isfile(os.path.join(search_dir, f))]
+            unique = unique[:num_images]
+            self._keep_thumbnails(unique)
+            return unique
 
         except Exception as e:
-            self.logger.error(f"Error in Google image search: {str(e)}")
+            self.logger.error(f"Error in image search: {str(e)}")
             return []
 
-    def search_and_download_images(self, topic, keywords, num_images=5):
-        """Search and download images using Google Image Scraper"""
-        try:
-            search_query = f"{topic} {keywords}"
-            self.logger.info(f"Searching for images with query: {search_query}")
+    def _keep_thumbnails(self, images):
+        """Forget the thumbnails and hashes of images other than those given"""
+        self.thumbnails = {image: self.thumbnails[image] for image in images if image in self.thumbnails}
+        self.image_hashes = {image: self.image_hashes[image] for image in images if image in self.image_hashes}
 
-            # Search for images using Google Image Scraper
-            image_paths = self.search_google_images(search_query, num_images)
+    def release_images(self):
+        """Let the workspace evict the images downloaded for the current post"""
+        self.workspace.release(self.images_in_use)
+        self.images_in_use = []
+        self.thumbnails = {}
+        self.image_hashes = {}
 
-            if not image_paths:
-                self.logger.warning("No images found from Google Images")
-                return []
-
-            return image_paths
+    def rank_images(self, images):
+        """Order images from most to least suitable, by resolution, aspect ratio, sharpness and colour.
 
-        except Exception as e:
-            self.logger.error(f"Error in image search: {str(e)}")
+        The thumbnails are kept until the next search, so ranking the same
+        images again doesn't decode them again.
+        """
+        if not images:
             return []
+        try:
+            ranked = self.scorer.rank(images, thumbnails=self.thumbnails)
+        except Exception as e:
+            self.logger.error(f"Error scoring images: {str(e)}")
+            return list(images)
+
+        # Keep images that could not be scored, after the scored ones
+        return ranked + [img for img in images if img not in ranked]
 
     def select_featured_image(self, images):
         """Select the most suitable image as featured image"""
-        if not images:
-            return None
-
-        # For now, just return the first image
-        # In a more sophisticated implementation, you could analyze images
-        # to select the most suitable one based on size, aspect ratio, etc.
-        return images[0]
+        ranked = self.rank_images(images)
+        return ranked[0] if ranked else None
+
+    def published_image_records(self, images):
+        """The (hash, path) of each image, all that is kept of a post's images until its batch is published.
+
+        The hash is only taken when the deduplicator keeps a site history,
+        from the thumbnail hash when the search made one.
+        """
+        records = []
+        for image in images:
+            image_hash = None
+            if self.deduplicator.use_site_history:
+                image_hash = self.image_hashes.get(image)
+                if image_hash is None:
+                    try:
+                        image_hash = dhash(image)
+                    except Exception as e:
+                        self.logger.warning(f"Could not hash image {image}: {str(e)}")
+            records.append((image_hash, getattr(image, 'path', None)))
+        return records
+
+    def record_published_images(self, records, site):
+        """Remember images published on a site, given their (hash, path), for near-duplicate checks"""
+        # Images just published count as recently used in the workspace
+        for _, path in records:
+            if path:
+                self.workspace.touch(path)
+        try:
+            self.deduplicator.remember_hashes([image_hash for image_hash, _ in records if image_hash is not None],
+                                              site)
+        except Exception as e:
+            self.logger.warning(f"Error recording published images: {str(e)}")
 
     def cleanup(self):
         """Clean up resources"""
         try:
-            # Clean up temporary files
-            for file in os.listdir(self.temp_dir):
-                file_path = os.path.join(self.temp_dir, file)
-                try:
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-                except Exception as e:
-                    self.logger.error(f"Error deleting file {file_path}: {str(e)}")
+            self.normalizer.shutdown()
         except Exception as e:
-            self.logger.error(f"Error in cleanup: {str(e)}")
+            self.logger.error(f"Error stopping image normalizer: {str(e)}")
+
+        for provider in getattr(self, 'providers', []):
+            try:
+                provider.close()
+            except Exception as e:
+                self.logger.error(f"Error closing {provider.name} image search: {str(e)}")
+
+        # Delete the images downloaded during this run
+        run_dir = getattr(self, 'run_dir', None)
+        if run_dir:
+            try:
+                self.workspace.remove_run(run_dir)
+                self.run_dir = None
+            except Exception as e:
+                self.logger.error(f"Error removing image workspace {run_dir}: {str(e)}")
 
     def __del__(self):
         """Destructor to ensure cleanup"""
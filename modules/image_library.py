@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import math
+import time
+import logging
+import threading
+from config.config import (
+    ALLOWED_IMAGE_EXTENSIONS,
+    IMAGE_LIBRARY_PATH,
+    IMAGE_LIBRARY_INDEX,
+    IMAGE_LIBRARY_MIN_MATCHES,
+    IMAGE_LIBRARY_REFRESH_INTERVAL
+)
+from modules.storage import write_json_atomic, SharedInstances
+
+# Sidecar files holding extra tags for an image, e.g. "ather-grid.jpg" + "ather-grid.tags"
+SIDECAR_EXTENSIONS = ['.tags', '.txt']
+
+STOPWORDS = {'a', 'an', 'and', 'the', 'of', 'for', 'in', 'on', 'to', 'with', 'by', 'at', 'or', 'is', 'its'}
+
+def tokenize(text):
+    """Split text into normalized keywords: lowercase, no stopwords, simple plurals folded"""
+    # Split camelCase and digits from letters before lowercasing
+    text = re.sub(r'([a-z])([A-Z0-9])', r'\1 \2', text)
+    tokens = []
+    for word in re.split(r'[^0-9a-zA-Z]+', text.lower()):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+class LocalImageLibrary:
+    """Keyword search over a directory of curated images.
+
+    Keywords come from each image's directory names, filename and optional
+    sidecar tag file. The inverted index is persisted and refreshed
+    incrementally, so only new or modified files are re-read.
+    """
+
+    def __init__(self, root=IMAGE_LIBRARY_PATH, index_path=IMAGE_LIBRARY_INDEX,
+                 min_matches=IMAGE_LIBRARY_MIN_MATCHES, refresh_interval=IMAGE_LIBRARY_REFRESH_INTERVAL):
+        self.setup_logging()
+        self.root = root
+        self.index_path = index_path
+        self.min_matches = min_matches
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self.files = {}  # relative path -> {'mtime', 'size', 'tokens'}
+        self.index = {}  # token -> set of relative paths
+        self._last_refresh = 0
+        self._load()
+        self.refresh()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self):
+        """Load the persisted index"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('root') != os.path.abspath(self.root):
+                return
+            self.files = data.get('files', {})
+            self.index = {token: set(paths) for token, paths in data.get('index', {}).items()}
+        except Exception as e:
+            self.logger.warning(f"Could not read image library index {self.index_path}: {str(e)}")
+
+    def _save(self):
+        """Persist the index atomically"""
+        data = {
+            'root': os.path.abspath(self.root),
+            'files': self.files,
+            'index': {token: sorted(paths) for token, paths in self.index.items()}
+        }
+        write_json_atomic(self.index_path, data)
+
+    def _scan(self):
+        """List the library's images with their modification times and sizes, including sidecars"""
+        found = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            names = set(filenames)
+            for filename in filenames:
+                stem, ext = os.path.splitext(filename)
+                if ext.lower() not in ALLOWED_IMAGE_EXTENSIONS:
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                    mtime, size = stat.st_mtime, stat.st_size
+                    for sidecar_ext in SIDECAR_EXTENSIONS:
+                        if stem + sidecar_ext in names:
+                            mtime = max(mtime, os.stat(os.path.join(dirpath, stem + sidecar_ext)).st_mtime)
+                except OSError:
+                    continue
+                found[os.path.relpath(path, self.root)] = (mtime, size)
+        return found
+
+    def _file_tokens(self, rel_path):
+        """Collect the keywords for an image from its path and sidecar tags"""
+        directory, filename = os.path.split(rel_path)
+        stem = os.path.splitext(filename)[0]
+        tokens = set(tokenize(directory)) | set(tokenize(stem))
+        for sidecar_ext in SIDECAR_EXTENSIONS:
+            sidecar = os.path.join(self.root, directory, stem + sidecar_ext)
+            if os.path.exists(sidecar):
+                try:
+                    with open(sidecar, 'r', encoding='utf-8') as f:
+                        tokens |= set(tokenize(f.read()))
+                except Exception as e:
+                    self.logger.warning(f"Could not read image tags {sidecar}: {str(e)}")
+        return sorted(tokens)
+
+    def refresh(self):
+        """Bring the index up to date with the library directory, re-reading only changed files"""
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            if not os.path.isdir(self.root):
+                return
+            found = self._scan()
+            changed = False
+
+            for rel_path in [p for p in self.files if p not in found]:
+                self._remove(rel_path)
+                changed = True
+
+            for rel_path, (mtime, size) in found.items():
+                entry = self.files.get(rel_path)
+                if entry and entry['mtime'] == mtime and entry['size'] == size:
+                    continue
+                if entry:
+                    self._remove(rel_path)
+                tokens = self._file_tokens(rel_path)
+                self.files[rel_path] = {'mtime': mtime, 'size': size, 'tokens': tokens}
+                for token in tokens:
+                    self.index.setdefault(token, set()).add(rel_path)
+                changed = True
+
+            if changed:
+                self._save()
+                self.logger.info(f"Indexed {len(self.files)} images in library {self.root}")
+
+    def _remove(self, rel_path):
+        """Drop a file from the index"""
+        entry = self.files.pop(rel_path, None)
+        if not entry:
+            return
+        for token in entry['tokens']:
+            paths = self.index.get(token)
+            if paths:
+                paths.discard(rel_path)
+                if not paths:
+                    del self.index[token]
+
+    def search(self, query, limit=5):
+        """Find the library images best matching a query.
+
+        Matches are weighted by how rare each keyword is in the library, and
+        images must match at least `min_matches` of the query's keywords.
+        """
+        if time.monotonic() - self._last_refresh > self.refresh_interval:
+            self.refresh()
+
+        query_tokens = set(tokenize(query))
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            total = max(len(self.files), 1)
+            scores = {}
+            matches = {}
+            for token in query_tokens:
+                paths = self.index.get(token)
+                if not paths:
+                    continue
+                weight = math.log(1 + total / len(paths))
+                for rel_path in paths:
+                    scores[rel_path] = scores.get(rel_path, 0) + weight
+                    matches[rel_path] = matches.get(rel_path, 0) + 1
+
+        required = min(self.min_matches, len(query_tokens))
+        ranked = sorted((p for p in scores if matches[p] >= required), key=lambda p: scores[p], reverse=True)
+        return [os.path.join(self.root, rel_path) for rel_path in ranked[:limit]]
+
+_shared_libraries = SharedInstances(lambda key: LocalImageLibrary(root=key[0], index_path=key[1]))
+
+def get_image_library(root=IMAGE_LIBRARY_PATH, index_path=IMAGE_LIBRARY_INDEX):
+    """Get the process-wide library for a directory, so concurrent runs share one index"""
+    return _shared_libraries.get((root, index_path))
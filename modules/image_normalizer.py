@@ -0,0 +1,193 @@
+import os
+import logging
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from modules.image_buffer import ImageBuffer, FORMAT_MIME_TYPES
+from config.config import (
+    IMAGE_MAX_WIDTH,
+    IMAGE_OUTPUT_FORMAT,
+    IMAGE_OUTPUT_QUALITY,
+    IMAGE_NORMALIZE_WORKERS
+)
+
+OUTPUT_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+def _normalize(image, output, max_width, output_format, quality, thumbnail_edge):
+    """Downscale, re-encode and strip an open image, saving it to a path or file object"""
+    icc_profile = image.info.get('icc_profile')
+    width, height = image.size
+    # EXIF orientations 5-8 rotate the image by 90 degrees when displayed
+    rotated = image.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+    display_width = height if rotated else width
+    if display_width > max_width and image.format == 'JPEG':
+        # Let the JPEG decoder scale down while decoding instead of
+        # decoding the full-size image first
+        scale = max_width / display_width
+        image.draft('RGB', (max(1, round(width * scale)), max(1, round(height * scale))))
+
+    # Apply the EXIF orientation before the EXIF data is dropped
+    image = ImageOps.exif_transpose(image)
+    if image.size[0] > max_width:
+        width, height = image.size
+        image = image.resize((max_width, max(1, round(height * max_width / width))), Image.LANCZOS)
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if output_format == 'webp' and has_alpha:
+        image = image.convert('RGBA')
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    # EXIF, comments, XMP and other metadata are not carried over; only the
+    # colour profile is kept so colours render the same. Some encoders copy
+    # entries of the source's info, so it is cleared first
+    image.info = {}
+    save_options = {'quality': quality}
+    if icc_profile:
+        save_options['icc_profile'] = icc_profile
+
+    if output_format == 'webp':
+        image.save(output, 'WEBP', method=4, **save_options)
+    else:
+        image.save(output, 'JPEG', optimize=True, progressive=True, **save_options)
+
+    thumbnail = None
+    if thumbnail_edge:
+        thumbnail = image.convert('RGB').resize((thumbnail_edge, thumbnail_edge), Image.BILINEAR,
+                                                reducing_gap=2.0)
+    return image.size, thumbnail
+
+def normalize_image(source_path, max_width=IMAGE_MAX_WIDTH, output_format=IMAGE_OUTPUT_FORMAT,
+                    quality=IMAGE_OUTPUT_QUALITY, thumbnail_edge=None):
+    """Downscale an image, re-encode it and strip its EXIF data.
+
+    Runs in a worker process. Returns the path of the normalized image, which
+    replaces the source file, together with its size and, if thumbnail_edge
+    is set, a square RGB thumbnail so later stages need not decode it again.
+    """
+    output_format = output_format.lower()
+    stem = os.path.splitext(source_path)[0]
+    output_path = f"{stem}.{OUTPUT_EXTENSIONS[output_format]}"
+
+    tmp_path = f"{output_path}.tmp"
+    with Image.open(source_path) as image:
+        size, thumbnail = _normalize(image, tmp_path, max_width, output_format, quality, thumbnail_edge)
+
+    os.replace(tmp_path, output_path)
+    if output_path != source_path:
+        os.remove(source_path)
+    return output_path, size, thumbnail
+
+def normalize_data(data, max_width=IMAGE_MAX_WIDTH, output_format=IMAGE_OUTPUT_FORMAT,
+                   quality=IMAGE_OUTPUT_QUALITY, thumbnail_edge=None):
+    """Like normalize_image, for an image held in memory; returns (bytes, size, thumbnail)"""
+    output = BytesIO()
+    with Image.open(BytesIO(data)) as image:
+        size, thumbnail = _normalize(image, output, max_width, output_format.lower(), quality, thumbnail_edge)
+    return output.getvalue(), size, thumbnail
+
+def describe_data(data, thumbnail_edge):
+    """Get the size and a square RGB thumbnail of an in-memory image that needs no normalization.
+
+    Runs in a worker process; returns (None, size, thumbnail) like
+    normalize_data, with no new image data.
+    """
+    with Image.open(BytesIO(data)) as image:
+        size = image.size
+        # JPEGs can be decoded straight to a reduced size
+        image.draft('RGB', (thumbnail_edge, thumbnail_edge))
+        thumbnail = image.convert('RGB').resize((thumbnail_edge, thumbnail_edge), Image.BILINEAR,
+                                                reducing_gap=2.0)
+    return None, size, thumbnail
+
+class ImageNormalizer:
+    """Runs CPU-bound image normalization in a process pool, off the I/O threads"""
+
+    def __init__(self, max_width=IMAGE_MAX_WIDTH, output_format=IMAGE_OUTPUT_FORMAT,
+                 quality=IMAGE_OUTPUT_QUALITY, max_workers=IMAGE_NORMALIZE_WORKERS, thumbnail_edge=None):
+        self.setup_logging()
+        if output_format.lower() not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"Unsupported image output format: {output_format}")
+        self.max_width = max_width
+        self.output_format = output_format
+        self.quality = quality
+        self.max_workers = max_workers
+        self.thumbnail_edge = thumbnail_edge
+        self.executor = None
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def needs_conversion(self, info):
+        """Check from an image's header info whether it has to be re-encoded.
+
+        Images already in the output format, within the maximum width and
+        without EXIF data can be used exactly as downloaded.
+        """
+        if not info or 'format' not in info:
+            return True
+        return (info['format'] != self.output_format.upper()
+                or info['size'][0] > self.max_width
+                or info.get('exif', True))
+
+    def _executor(self):
+        if self.executor is None:
+            # Forking a process with running threads, such as the web server's
+            # or the downloaders', can deadlock the child, so workers are
+            # started from a clean process instead
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context(start_method))
+        return self.executor
+
+    def submit(self, image):
+        """Queue an image, given as a path or an ImageBuffer, for normalization and return a future"""
+        if isinstance(image, ImageBuffer):
+            # Worker processes receive a copy of the bytes; memoryviews can't be pickled
+            data = image.data if isinstance(image.data, bytes) else bytes(image.data)
+            return self._executor().submit(
+                normalize_data, data, self.max_width, self.output_format, self.quality,
+                self.thumbnail_edge
+            )
+        return self._executor().submit(
+            normalize_image, image, self.max_width, self.output_format, self.quality,
+            self.thumbnail_edge
+        )
+
+    def describe(self, image):
+        """Queue an ImageBuffer that is used as it is for its thumbnail only, and return a future.
+
+        result() then returns the image itself with its size and thumbnail.
+        """
+        data = image.data if isinstance(image.data, bytes) else bytes(image.data)
+        return self._executor().submit(describe_data, data, self.thumbnail_edge)
+
+    def result(self, future, image):
+        """Wait for a normalization, returning (image, size, thumbnail).
+
+        The image is a new path, or a new ImageBuffer for buffers. Falls back
+        to the original image, with no size or thumbnail, if normalization
+        failed.
+        """
+        try:
+            result, size, thumbnail = future.result()
+        except Exception as e:
+            self.logger.warning(f"Could not normalize image {image}, using original: {str(e)}")
+            return image, None, None
+
+        if result is None:
+            # Only described, so the image is unchanged
+            return image, size, thumbnail
+        if isinstance(image, ImageBuffer):
+            output_format = self.output_format.lower()
+            stem = os.path.splitext(image.filename)[0]
+            result = ImageBuffer(result, FORMAT_MIME_TYPES[output_format.upper()],
+                                 f"{stem}.{OUTPUT_EXTENSIONS[output_format]}")
+        return result, size, thumbnail
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -1,5 +1,4 @@
 import os
-import requests
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -10,10 +9,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from PIL import Image
 import logging
 from config.config import IMAGE_DOWNLOAD_PATH, ALLOWED_IMAGE_EXTENSIONS, MAX_IMAGES_PER_POST
+from modules.http_client import get_http_client
 
 class ImageProcessor:
     def __init__(self):
         self.setup_logging()
+        self.http = get_http_client()
         self.setup_directories()
         self.setup_selenium()
 
@@ -65,7 +66,7 @@ class ImageProcessor:
     def download_image(self, url, filename):
         """Download and save an image"""
         try:
-            response = requests.get(url, stream=True)
+            response = self.http.get(url, stream=True)
             response.raise_for_status()
             
             # Get file extension
@@ -0,0 +1,108 @@
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from modules.image_buffer import open_image
+from config.config import (
+    FEATURED_IMAGE_SIZE,
+    IMAGE_SCORE_THUMBNAIL,
+    IMAGE_SCORE_WEIGHTS
+)
+
+GRAYSCALE_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+class ImageScorer:
+    """Ranks candidate images by how well they would work as a featured image"""
+
+    def __init__(self, target_size=FEATURED_IMAGE_SIZE, thumbnail_size=IMAGE_SCORE_THUMBNAIL,
+                 weights=IMAGE_SCORE_WEIGHTS, max_workers=8):
+        self.setup_logging()
+        self.target_size = target_size
+        self.thumbnail_size = thumbnail_size
+        self.weights = weights
+        self.max_workers = max_workers
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self, image_path):
+        """Load an image's size and a fixed-size RGB thumbnail of it"""
+        edge = self.thumbnail_size
+        with open_image(image_path) as image:
+            size = image.size
+            # JPEGs can be decoded straight to a reduced draft
+            image.draft('RGB', (edge, edge))
+            thumbnail = image.convert('RGB').resize((edge, edge), Image.BILINEAR)
+        return size, np.asarray(thumbnail, dtype=np.float32)
+
+    def score(self, image_paths, thumbnails=None):
+        """Score images, returning (path, score) pairs for the images that could be read.
+
+        `thumbnails` optionally maps paths to (size, thumbnail) pairs already
+        produced elsewhere, such as by the normalizer; other images are loaded
+        from disk.
+        """
+        thumbnails = thumbnails or {}
+        edge = self.thumbnail_size
+        loaded = []
+        to_load = []
+        for path in image_paths:
+            size, thumbnail = thumbnails.get(path, (None, None))
+            if thumbnail is not None and thumbnail.size == (edge, edge):
+                loaded.append((path, size, np.asarray(thumbnail.convert('RGB'), dtype=np.float32)))
+            else:
+                to_load.append(path)
+
+        if to_load:
+            # Decoding releases the GIL, so thumbnails load in parallel
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(to_load)))) as executor:
+                futures = [(path, executor.submit(self._load, path)) for path in to_load]
+                for path, future in futures:
+                    try:
+                        loaded.append((path, *future.result()))
+                    except Exception as e:
+                        self.logger.warning(f"Could not load image {path} for scoring: {str(e)}")
+        if not loaded:
+            return []
+
+        paths = [item[0] for item in loaded]
+        sizes = np.array([item[1] for item in loaded], dtype=np.float32)
+        pixels = np.stack([item[2] for item in loaded])  # (N, edge, edge, 3)
+
+        # Resolution: how close each image comes to covering the featured slot
+        target_width, target_height = self.target_size
+        resolution = np.minimum(sizes[:, 0] / target_width, sizes[:, 1] / target_height).clip(0, 1)
+
+        # Aspect ratio fit: 1.0 for an exact match, falling off with the log ratio
+        aspect = np.exp(-2.0 * np.abs(np.log((sizes[:, 0] / sizes[:, 1]) / (target_width / target_height))))
+
+        # Sharpness: variance of the Laplacian of the grayscale thumbnail
+        gray = pixels @ GRAYSCALE_WEIGHTS
+        laplacian = (gray[:, :-2, 1:-1] + gray[:, 2:, 1:-1] + gray[:, 1:-1, :-2] + gray[:, 1:-1, 2:]
+                     - 4 * gray[:, 1:-1, 1:-1])
+        sharpness = laplacian.reshape(len(paths), -1).var(axis=1)
+
+        # Colourfulness (Hasler and Suesstrunk)
+        red, green, blue = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+        rg = (red - green).reshape(len(paths), -1)
+        yb = (0.5 * (red + green) - blue).reshape(len(paths), -1)
+        colourfulness = (np.sqrt(rg.std(axis=1) ** 2 + yb.std(axis=1) ** 2)
+                         + 0.3 * np.sqrt(rg.mean(axis=1) ** 2 + yb.mean(axis=1) ** 2))
+
+        metrics = {
+            'resolution': resolution,
+            'aspect': aspect,
+            # Sharpness and colourfulness have no natural scale, so compare candidates to each other
+            'sharpness': sharpness / max(float(sharpness.max()), 1e-6),
+            'colourfulness': colourfulness / max(float(colourfulness.max()), 1e-6)
+        }
+        scores = sum(self.weights.get(name, 0) * values for name, values in metrics.items())
+        return list(zip(paths, scores.tolist()))
+
+    def rank(self, image_paths, thumbnails=None):
+        """Order images from best to worst featured-image candidate"""
+        if not image_paths:
+            return []
+        scored = self.score(image_paths, thumbnails)
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [path for path, _ in scored]
@@ -0,0 +1,309 @@
+import os
+import sys
+import json
+import time
+import logging
+import subprocess
+from urllib.parse import quote_plus
+from bs4 import BeautifulSoup
+from config.config import IMAGE_SEARCH_API_KEY, IMAGE_SEARCH_ENGINE_ID
+from modules.image_library import get_image_library
+from modules.image_downloader import BROWSER_USER_AGENT
+from modules.http_client import get_http_client
+
+class ImageSearchProvider:
+    """Base class for image search backends.
+
+    Providers return image URLs to download, or, for local providers, paths
+    to image files that can be used directly.
+    """
+
+    name = 'base'
+    local = False
+
+    def __init__(self):
+        self.setup_logging()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def search(self, query, num_images=5):
+        """Return up to num_images image URLs (or local paths) for a query"""
+        raise NotImplementedError
+
+    def iter_search(self, query, num_images=5):
+        """Yield results as they are found, so they can be used before the search ends.
+
+        Providers that find results one at a time override this; stopping
+        iteration early stops the search.
+        """
+        yield from self.search(query, num_images)
+
+    def close(self):
+        """Release any resources held by the provider"""
+
+class SeleniumImageSearchProvider(ImageSearchProvider):
+    """Scrapes Google Images with a headless Chrome.
+
+    The browser is started on the first search and kept open for later
+    ones until close(), so a long-running process pays its startup once.
+    """
+
+    name = 'selenium'
+
+    def __init__(self):
+        super().__init__()
+        self.driver = None
+        self.webdriver_path = os.path.join(os.path.dirname(__file__), 'webdriver', 'chromedriver')
+
+        # Check if ChromeDriver exists
+        if not os.path.exists(self.webdriver_path):
+            self.logger.warning("ChromeDriver not found at: %s", self.webdriver_path)
+
+            # Try to install ChromeDriver
+            if self._install_chromedriver():
+                self.logger.info("ChromeDriver installed successfully")
+            else:
+                self.logger.error("Failed to install ChromeDriver")
+                self.webdriver_path = None
+
+    def _install_chromedriver(self):
+        """Attempt to install ChromeDriver"""
+        try:
+            # Check if chromedriver_installer.py exists
+            installer_path = os.path.join(os.path.dirname(__file__), 'chromedriver_installer.py')
+            if not os.path.exists(installer_path):
+                self.logger.error("ChromeDriver installer not found")
+                return False
+
+            # Run the ChromeDriver installer
+            self.logger.info("Attempting to install ChromeDriver...")
+            result = subprocess.run([sys.executable, installer_path],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   text=True)
+
+            if result.returncode == 0:
+                self.logger.info("ChromeDriver installed successfully")
+                return True
+            else:
+                self.logger.error(f"ChromeDriver installation failed: {result.stderr}")
+                return False
+        except Exception as e:
+            self.logger.error(f"Error installing ChromeDriver: {str(e)}")
+            return False
+
+    def search(self, query, num_images=5):
+        """Collect full-size image URLs from Google Images"""
+        return list(self.iter_search(query, num_images))
+
+    def iter_search(self, query, num_images=5):
+        """Yield full-size image URLs from Google Images as each one is found"""
+        if not self.webdriver_path:
+            self.logger.warning("ChromeDriver not available, skipping Google Images search")
+            return
+
+        from selenium.webdriver.common.by import By
+
+        driver = self._get_driver()
+        try:
+            # Set up the search URL
+            search_url = f"https://www.google.com/search?q={query}&tbm=isch"
+            self.logger.info(f"Searching Google Images with URL: {search_url}")
+
+            # Navigate to the search URL
+            driver.get(search_url)
+
+            # Wait for the page to load
+            time.sleep(2)
+
+            # Find image elements
+            img_elements = driver.find_elements(By.CSS_SELECTOR, "img.rg_i")
+
+            # Yield each image URL as soon as it is found; the caller stops
+            # the search once it has enough images
+            found = 0
+            for i, img in enumerate(img_elements):
+                if found >= num_images:
+                    break
+
+                try:
+                    # Get the image source
+                    img.click()
+                    time.sleep(1)
+
+                    # Find the larger image
+                    large_img = driver.find_elements(By.CSS_SELECTOR, "img.r48jcc")
+                    src = large_img[0].get_attribute("src") if large_img else None
+                except Exception as e:
+                    self.logger.warning(f"Error getting image {i}: {str(e)}")
+                    continue
+
+                if src and src.startswith("http"):
+                    self.logger.info(f"Found image URL: {src}")
+                    found += 1
+                    yield src
+        except Exception:
+            # The browser may be in a bad state; start a fresh one next time
+            self.close()
+            raise
+
+    def _get_driver(self):
+        """Get the running Chrome driver, starting it if needed"""
+        if self.driver is None:
+            # Use a more reliable approach with webdriver-manager
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            from selenium.webdriver.chrome.options import Options
+            from webdriver_manager.chrome import ChromeDriverManager
+
+            # Set up Chrome options
+            chrome_options = Options()
+            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+
+            # Initialize the Chrome driver with webdriver-manager
+            self.logger.info("Initializing Chrome driver with webdriver-manager")
+            self.driver = webdriver.Chrome(
+                service=Service(ChromeDriverManager().install()),
+                options=chrome_options
+            )
+        return self.driver
+
+    def close(self):
+        """Quit the browser"""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                self.logger.warning(f"Error closing Chrome driver: {str(e)}")
+            self.driver = None
+
+class HttpImageSearchProvider(ImageSearchProvider):
+    """Finds images over plain HTTP, without a browser.
+
+    Uses the Google Custom Search JSON API when IMAGE_SEARCH_API_KEY and
+    IMAGE_SEARCH_ENGINE_ID are configured, and otherwise parses Bing's image
+    results page.
+    """
+
+    name = 'http'
+    api_url = 'https://www.googleapis.com/customsearch/v1'
+    results_url = 'https://www.bing.com/images/search'
+
+    def __init__(self, api_key=IMAGE_SEARCH_API_KEY, engine_id=IMAGE_SEARCH_ENGINE_ID, timeout=10):
+        super().__init__()
+        self.api_key = api_key
+        self.engine_id = engine_id
+        self.timeout = timeout
+        self.http = get_http_client()
+        self.headers = {'User-Agent': BROWSER_USER_AGENT}
+
+    def search(self, query, num_images=5):
+        """Find image URLs for a query"""
+        if self.api_key and self.engine_id:
+            return self._search_api(query, num_images)
+        return self._search_results_page(query, num_images)
+
+    def _search_api(self, query, num_images):
+        """Query the Google Custom Search JSON API, 10 results per request"""
+        image_urls = []
+        start = 1
+        while len(image_urls) < num_images and start <= 91:
+            response = self.http.get(self.api_url, headers=self.headers, params={
+                'key': self.api_key,
+                'cx': self.engine_id,
+                'q': query,
+                'searchType': 'image',
+                'imgSize': 'large',
+                'num': min(10, num_images - len(image_urls)),
+                'start': start
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            items = response.json().get('items', [])
+            if not items:
+                break
+            image_urls += [item['link'] for item in items if item.get('link', '').startswith('http')]
+            start += len(items)
+        self.logger.info(f"Image search API returned {len(image_urls)} images for: {query}")
+        return image_urls[:num_images]
+
+    def _search_results_page(self, query, num_images):
+        """Parse full-size image URLs from Bing's image results page"""
+        response = self.http.get(
+            f"{self.results_url}?q={quote_plus(query)}&first=1&qft=+filterui:imagesize-large",
+            headers=self.headers,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        image_urls = []
+        soup = BeautifulSoup(response.text, 'html.parser')
+        # Each result link carries its metadata, including the image URL, as JSON
+        for link in soup.select('a.iusc'):
+            try:
+                url = json.loads(link.get('m', '{}')).get('murl', '')
+            except ValueError:
+                continue
+            if url.startswith('http') and url not in image_urls:
+                image_urls.append(url)
+                if len(image_urls) >= num_images:
+                    break
+        self.logger.info(f"Found {len(image_urls)} image URLs over HTTP for: {query}")
+        return image_urls
+
+class LibraryImageSearchProvider(ImageSearchProvider):
+    """Searches the curated local image library"""
+
+    name = 'library'
+    local = True
+
+    def __init__(self, library=None):
+        super().__init__()
+        self.library = library or get_image_library()
+
+    def search(self, query, num_images=5):
+        """Find library images matching a query"""
+        image_paths = self.library.search(query, limit=num_images)
+        self.logger.info(f"Found {len(image_paths)} images in the local library for: {query}")
+        return image_paths
+
+class StaticImageSearchProvider(ImageSearchProvider):
+    """Returns fixed results, for tests and offline runs.
+
+    `results` is either a list returned for every query or a dict mapping
+    queries to lists. Set local=True when the results are file paths.
+    """
+
+    name = 'static'
+
+    def __init__(self, results=None, local=False):
+        super().__init__()
+        self.results = results or []
+        self.local = local
+
+    def search(self, query, num_images=5):
+        """Return the configured results for a query"""
+        results = self.results.get(query, []) if isinstance(self.results, dict) else self.results
+        return list(results)[:num_images]
+
+PROVIDERS = {
+    'selenium': SeleniumImageSearchProvider,
+    'http': HttpImageSearchProvider,
+    'library': LibraryImageSearchProvider,
+    'static': StaticImageSearchProvider
+}
+
+def create_providers(providers):
+    """Build a provider chain from provider names and/or provider instances"""
+    chain = []
+    for provider in providers:
+        if isinstance(provider, ImageSearchProvider):
+            chain.append(provider)
+        elif provider in PROVIDERS:
+            chain.append(PROVIDERS[provider]())
+        else:
+            raise ValueError(f"Unknown image search provider: {provider}. "
+                             f"Available providers: {', '.join(PROVIDERS)}")
+    return chain
@@ -0,0 +1,153 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from config.config import (
+    IMAGE_DOWNLOAD_PATH,
+    IMAGE_WORKSPACE_MAX_BYTES,
+    IMAGE_WORKSPACE_STALE_AFTER
+)
+from modules.storage import SharedInstances
+
+class ImageWorkspace:
+    """Disk-bounded scratch space for downloaded images.
+
+    Each run gets its own directory under the root, and each search a fresh
+    directory inside it, so runs never see each other's or earlier runs'
+    files. Files are tracked in least-recently-used order, a file being used
+    when it is added and each time a post with it is published; once their
+    total size exceeds `max_bytes`, the least recently used files that are
+    not pinned by a post in progress are deleted.
+    """
+
+    def __init__(self, root=IMAGE_DOWNLOAD_PATH, max_bytes=IMAGE_WORKSPACE_MAX_BYTES,
+                 stale_after=IMAGE_WORKSPACE_STALE_AFTER):
+        self.setup_logging()
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self.files = OrderedDict()  # path -> size, least recently used first
+        self.pinned = {}  # path -> number of posts using the file
+        self.total_bytes = 0
+        self.runs = set()
+        os.makedirs(self.root, exist_ok=True)
+        self.purge_stale()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def purge_stale(self):
+        """Delete leftovers of earlier runs that were not cleaned up, e.g. after a crash.
+
+        Only directories are removed: run directories, and the per-query
+        directories images were downloaded to before runs had their own.
+        Files such as .gitkeep and hidden directories are left alone.
+        """
+        cutoff = time.time() - self.stale_after
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if name.startswith('.') or not os.path.isdir(path) or os.path.islink(path):
+                    continue
+                if path in self.runs or os.path.getmtime(path) > cutoff:
+                    continue
+                shutil.rmtree(path)
+                self.logger.info(f"Removed stale image workspace entry: {path}")
+            except OSError as e:
+                self.logger.warning(f"Could not remove stale image workspace entry {path}: {str(e)}")
+
+    def create_run(self):
+        """Create an isolated directory for one run"""
+        run_dir = os.path.abspath(tempfile.mkdtemp(prefix='run-', dir=self.root))
+        with self._lock:
+            self.runs.add(run_dir)
+        return run_dir
+
+    def create_dir(self, run_dir, name):
+        """Create a fresh directory inside a run, e.g. for one search"""
+        return os.path.abspath(tempfile.mkdtemp(prefix=f"{name[:50]}-", dir=run_dir))
+
+    def add(self, path, pin=True):
+        """Track a file, optionally pinning it until released, and evict files over the budget"""
+        path = os.path.abspath(path)
+        if not path.startswith(self.root + os.sep):
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._lock:
+            self.total_bytes += size - self.files.pop(path, 0)
+            self.files[path] = size
+            if pin:
+                self.pinned[path] = self.pinned.get(path, 0) + 1
+            self._evict()
+
+    def touch(self, path):
+        """Mark a tracked file as recently used"""
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self.files:
+                self.files.move_to_end(path)
+
+    def release(self, paths):
+        """Unpin files once the post using them is finished, making them evictable"""
+        with self._lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                count = self.pinned.get(path, 0) - 1
+                if count > 0:
+                    self.pinned[path] = count
+                else:
+                    self.pinned.pop(path, None)
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used, unpinned files until the workspace fits its budget"""
+        if not self.max_bytes or self.total_bytes <= self.max_bytes:
+            return
+        for path in list(self.files):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if path in self.pinned:
+                continue
+            self.total_bytes -= self.files.pop(path)
+            try:
+                os.remove(path)
+                self.logger.info(f"Evicted {path} from the image workspace")
+            except OSError:
+                pass
+            self._remove_empty_dirs(os.path.dirname(path))
+
+    def _remove_empty_dirs(self, directory):
+        """Remove a search directory left empty by eviction, up to its run directory"""
+        while directory not in self.runs and directory.startswith(self.root + os.sep):
+            try:
+                if os.listdir(directory):
+                    return
+                os.rmdir(directory)
+            except OSError:
+                # Already removed, or refilled, by another run
+                return
+            directory = os.path.dirname(directory)
+
+    def remove_run(self, run_dir):
+        """Delete a run's directory and everything in it"""
+        run_dir = os.path.abspath(run_dir)
+        prefix = run_dir + os.sep
+        with self._lock:
+            self.runs.discard(run_dir)
+            for path in [p for p in self.files if p.startswith(prefix)]:
+                self.total_bytes -= self.files.pop(path)
+                self.pinned.pop(path, None)
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+_shared_workspaces = SharedInstances(ImageWorkspace)
+
+def get_image_workspace(root=IMAGE_DOWNLOAD_PATH):
+    """Get the process-wide workspace for a directory, so concurrent runs share one disk budget"""
+    return _shared_workspaces.get(root)
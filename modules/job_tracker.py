@@ -0,0 +1,241 @@
+import time
+import threading
+from collections import OrderedDict
+from config.config import JOB_HISTORY_SIZE
+from modules.storage import forget_finished
+
+# Stages a post goes through, in order, before its outcome is known
+STAGES = ('images', 'content', 'publish', 'queued')
+
+# Stages that do the work of a post, leaving out the wait for its batch
+WORK_STAGES = STAGES[:-1]
+
+# Post states that are final
+OUTCOMES = ('published', 'failed', 'skipped')
+
+class JobProgress:
+    """Progress of one automation job: its state, each post's stage and outcome, and stage timings.
+
+    Counts and stage totals are kept up to date as posts move along, so a
+    summary is cheap to take however many posts the job has. Works on its
+    own too, for runs that aren't tracked.
+    """
+
+    def __init__(self, job_id=None, params=None):
+        self.job_id = job_id
+        self.params = dict(params or {})
+        self.state = 'queued'
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.posts = OrderedDict()
+        self.rows = 0
+        self.counts = {'running': 0, 'queued': 0, 'published': 0, 'failed': 0, 'skipped': 0}
+        # Posts still running or queued, the only ones a summary looks at
+        self.active = OrderedDict()
+        # Seconds spent in each stage over all posts, and posts that went through it
+        self.stage_totals = {stage: [0.0, 0] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.state = 'running'
+            self.started = time.time()
+
+    def finish(self, state, error=None):
+        """Mark the job completed or failed; posts it left unfinished count as failed"""
+        with self._lock:
+            unfinished = list(self.active)
+        for title in unfinished:
+            self.fail_post(title, "The job ended before the post was published")
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.finished = time.time()
+
+    def start_post(self, title):
+        """Start tracking a row; a later row with the same title replaces the earlier one"""
+        with self._lock:
+            self.rows += 1
+            earlier = self.posts.pop(title, None)
+            if earlier:
+                self._set_state(earlier, None)
+            post = self.posts[title] = {
+                'title': title,
+                'row': self.rows,
+                'state': None,
+                'stage': None,
+                'started': time.time(),
+                'finished': None,
+                'stage_timings': {},
+                'sites': {},
+                'error': None
+            }
+            self._set_state(post, 'running')
+
+    def enter_stage(self, title, stage):
+        """Move a post to its next stage, timing the one it leaves"""
+        with self._lock:
+            post = self.posts.get(title)
+            if post is None:
+                return
+            self._end_stage(post)
+            post['stage'] = stage
+            post['stage_started'] = time.time()
+            if stage == 'queued':
+                self._set_state(post, 'queued')
+
+    def skip_post(self, title, reason):
+        self._settle(title, 'skipped', reason)
+
+    def fail_post(self, title, error):
+        self._settle(title, 'failed', error)
+
+    def post_sent(self, title, urls, errors):
+        """Record the sites a post was sent to and those that failed; it waits in their batches for the rest"""
+        with self._lock:
+            post = self.posts.get(title)
+            if post is None:
+                return
+            for url in urls:
+                if errors.get(url):
+                    post['sites'][url] = {'post_id': None, 'error': errors[url]}
+                else:
+                    # A full batch may already have published it
+                    post['sites'].setdefault(url, {'post_id': None, 'error': None})
+        self.enter_stage(title, 'queued')
+        self._settle_sites(title)
+
+    def record_result(self, url, title, post_id, error):
+        """Record a site's outcome for a queued post; the post is settled once every site has one"""
+        with self._lock:
+            post = self.posts.get(title)
+            if post is None or post['state'] in OUTCOMES:
+                return
+            post['sites'][url] = {'post_id': post_id, 'error': error}
+            if post['state'] != 'queued':
+                return
+        self._settle_sites(title)
+
+    def _settle_sites(self, title):
+        with self._lock:
+            post = self.posts.get(title)
+            sites = list(post['sites'].values()) if post else []
+            if not sites or any(site['post_id'] is None and not site['error'] for site in sites):
+                return
+        if all(site['error'] for site in sites):
+            self.fail_post(title, "Publishing failed on every site")
+        elif any(site['error'] for site in sites):
+            self.fail_post(title, "Publishing failed on some sites")
+        else:
+            self._settle(title, 'published', None)
+
+    def _settle(self, title, state, error):
+        with self._lock:
+            post = self.posts.get(title)
+            if post is None or post['state'] in OUTCOMES:
+                return
+            self._end_stage(post)
+            self._set_state(post, state)
+            post['stage'] = None
+            post['error'] = error
+            post['finished'] = time.time()
+
+    def _end_stage(self, post):
+        stage, started = post.get('stage'), post.pop('stage_started', None)
+        if stage is None or started is None:
+            return
+        seconds = time.time() - started
+        post['stage_timings'][stage] = round(post['stage_timings'].get(stage, 0) + seconds, 3)
+        totals = self.stage_totals.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+    def _set_state(self, post, state):
+        """Change a post's state, keeping the counts and active posts in step"""
+        if post['state']:
+            self.counts[post['state']] -= 1
+        self.active.pop(post['title'], None)
+        post['state'] = state
+        if state:
+            self.counts[state] += 1
+        if state in ('running', 'queued'):
+            self.active[post['title']] = post
+
+    def _eta(self):
+        """Seconds until the posts started so far are queued, from the average time of each stage.
+
+        Rows not started yet are not counted, since a streamed sheet's
+        length isn't known until the end; nor is the wait for a batch,
+        which depends on when the batch fills.
+        """
+        if self.state != 'running':
+            return 0 if self.finished else None
+        averages = {stage: total / count for stage, (total, count) in self.stage_totals.items() if count}
+        eta = 0.0
+        now = time.time()
+        for post in self.active.values():
+            if post['stage'] not in WORK_STAGES:
+                continue
+            remaining = WORK_STAGES[WORK_STAGES.index(post['stage']):]
+            if any(stage not in averages for stage in remaining):
+                return None
+            # The current stage's elapsed time comes off its average
+            elapsed = now - post.get('stage_started', now)
+            eta += max(averages[remaining[0]] - elapsed, 0) + sum(averages[stage] for stage in remaining[1:])
+        return round(eta, 1)
+
+    def summary(self):
+        """The job's state, post counts, average stage timings and ETA"""
+        with self._lock:
+            return {
+                'id': self.job_id,
+                'state': self.state,
+                'error': self.error,
+                'params': self.params,
+                'created': self.created,
+                'started': self.started,
+                'finished': self.finished,
+                'duration': round((self.finished or time.time()) - self.started, 3) if self.started else None,
+                'posts': len(self.posts),
+                'counts': dict(self.counts),
+                'current': [{'title': post['title'], 'stage': post['stage']}
+                            for post in self.active.values() if post['state'] == 'running'],
+                'stage_timings': {stage: {'posts': count, 'total': round(total, 3),
+                                          'average': round(total / count, 3) if count else None}
+                                  for stage, (total, count) in self.stage_totals.items()},
+                'eta_seconds': self._eta()
+            }
+
+    def post_list(self, state=None):
+        """Each post's state, stage, timings and post IDs per site, optionally only those in a state"""
+        with self._lock:
+            return [{key: (dict(value) if isinstance(value, dict) else value)
+                     for key, value in post.items() if key != 'stage_started'}
+                    for post in self.posts.values() if state is None or post['state'] == state]
+
+class JobTracker:
+    """In-memory store of the web interface's jobs, keeping the last `history_size` finished ones"""
+
+    def __init__(self, history_size=JOB_HISTORY_SIZE):
+        self.history_size = history_size
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create_job(self, job_id, params=None):
+        job = JobProgress(job_id, params)
+        with self._lock:
+            self.jobs[job_id] = job
+            forget_finished(self.jobs, self.history_size)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        """Summaries of the jobs, most recent first"""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [job.summary() for job in reversed(jobs)]
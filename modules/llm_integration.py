@@ -1,12 +1,14 @@
 import requests
 import logging
-from config.config import OLLAMA_URL, MODEL_NAME
+from config.config import OLLAMA_URL, MODEL_NAME, HTTP_CONNECT_TIMEOUT, LLM_READ_TIMEOUT
+from modules.http_client import get_http_client
 
 class LLMIntegration:
     def __init__(self):
         self.setup_logging()
         self.base_url = OLLAMA_URL
         self.model_name = MODEL_NAME
+        self.http = get_http_client()
 
     def setup_logging(self):
         self.logger = logging.getLogger(__name__)
@@ -54,7 +56,9 @@ Requirements:
 Format the response in markdown with appropriate headings, bullet points, and paragraphs."""
 
             # Make request to Ollama
-            response = requests.post(
+            # Not retried: an unresponsive model would stall the row for a
+            # full read timeout per attempt
+            response = self.http.post(
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model_name,
@@ -66,7 +70,8 @@ Format the response in markdown with appropriate headings, bullet points, and pa
                         "max_tokens": 2000
                     }
                 },
-                timeout=60  # Increased timeout for longer responses
+                timeout=(HTTP_CONNECT_TIMEOUT, LLM_READ_TIMEOUT),  # Longer read timeout for longer responses
+                retry=False
             )
             response.raise_for_status()
 
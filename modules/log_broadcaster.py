@@ -0,0 +1,151 @@
+import time
+import uuid
+import logging
+import threading
+from collections import deque, OrderedDict
+from config.config import LOG_BUFFER_SIZE, JOB_HISTORY_SIZE
+from modules.storage import forget_finished
+
+# The job, post and stage the current thread is working on, attached to its log events
+_context = threading.local()
+
+def set_log_context(**fields):
+    """Set fields (job, post, stage) on the log events this thread emits; None clears a field"""
+    for name, value in fields.items():
+        setattr(_context, name, value)
+
+def get_log_context():
+    return {name: getattr(_context, name, None) for name in ('job', 'post', 'stage')}
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """Submit fn to an executor, so it logs under the submitting thread's job, post and stage"""
+    context = get_log_context()
+
+    def run():
+        # Pool threads are reused, so the thread's own context is restored afterwards
+        previous = get_log_context()
+        set_log_context(**context)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            set_log_context(**previous)
+
+    return executor.submit(run)
+
+class JobChannel:
+    """The recent log events of one job, in a ring buffer subscribers wait on"""
+
+    def __init__(self, job_id, buffer_size):
+        self.job_id = job_id
+        self.events = deque(maxlen=buffer_size)
+        self.next_id = 1
+        self.finished = False
+        self.status = 'running'
+        self.condition = threading.Condition()
+
+class LogBroadcaster:
+    """Fans log events out to every viewer of a job.
+
+    Each job keeps its last `buffer_size` events, so viewers that connect
+    late or reconnect are replayed what they missed, and memory stays
+    bounded when nobody is watching. Like the job tracker, it keeps the
+    last JOB_HISTORY_SIZE finished jobs. Viewers block until a new event
+    arrives rather than polling.
+    """
+
+    def __init__(self, buffer_size=LOG_BUFFER_SIZE, max_jobs=JOB_HISTORY_SIZE):
+        self.buffer_size = buffer_size
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create_job(self, job_id=None):
+        """Start a channel for a new job and return its ID"""
+        job_id = job_id or uuid.uuid4().hex[:12]
+        with self._lock:
+            self.jobs[job_id] = JobChannel(job_id, self.buffer_size)
+            forget_finished(self.jobs, self.max_jobs)
+        return job_id
+
+    def get(self, job_id=None):
+        """Get a job's channel, or the most recent job's without an ID"""
+        with self._lock:
+            if job_id is None:
+                return next(reversed(self.jobs.values()), None)
+            return self.jobs.get(job_id)
+
+    def publish(self, job_id, event):
+        """Add an event to a job's buffer and wake its viewers"""
+        channel = self.get(job_id)
+        if channel is None:
+            return
+        with channel.condition:
+            event = dict(event, id=channel.next_id, job=job_id)
+            channel.next_id += 1
+            channel.events.append(event)
+            channel.condition.notify_all()
+
+    def finish(self, job_id, status):
+        """Mark a job finished, sending viewers a final event with its status"""
+        channel = self.get(job_id)
+        if channel is None:
+            return
+        self.publish(job_id, {'time': time.time(), 'level': 'INFO', 'stage': 'end', 'status': status,
+                              'message': f"Job {status}"})
+        with channel.condition:
+            channel.finished = True
+            channel.status = status
+            channel.condition.notify_all()
+
+    def subscribe(self, job_id, last_id=0, heartbeat=15):
+        """Yield a job's events after `last_id` as they arrive, and None every `heartbeat` idle seconds.
+
+        Ends once the job has finished and every event has been sent.
+        """
+        channel = self.get(job_id)
+        if channel is None:
+            return
+        while True:
+            with channel.condition:
+                pending = [event for event in channel.events if event['id'] > last_id]
+                if not pending:
+                    if channel.finished:
+                        return
+                    channel.condition.wait(timeout=heartbeat)
+                    pending = [event for event in channel.events if event['id'] > last_id]
+            if not pending:
+                yield None
+                continue
+            for event in pending:
+                last_id = event['id']
+                yield event
+
+class JobLogHandler(logging.Handler):
+    """Logging handler that publishes records as structured events to their job's viewers.
+
+    A record goes to the job set in its thread's log context. Records from
+    threads without one, such as the web server's request threads, belong
+    to no job and are left to the other handlers; worker pools log under
+    the job that submitted the work (see submit_with_context).
+    """
+
+    def __init__(self, broadcaster):
+        super().__init__()
+        self.broadcaster = broadcaster
+
+    def emit(self, record):
+        try:
+            context = get_log_context()
+            if not context['job']:
+                return
+            event = {
+                'time': record.created,
+                'level': record.levelname,
+                'logger': record.name,
+                'post': context['post'],
+                'stage': context['stage'],
+                'message': record.getMessage()
+            }
+            self.broadcaster.publish(context['job'], event)
+        except Exception:
+            self.handleError(record)
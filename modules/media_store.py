@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from itertools import islice
+from config.config import IMAGE_STORE_INDEX, IMAGE_STORE_MAX_ENTRIES, IMAGE_STORE_SAVE_INTERVAL
+from modules.storage import write_json_atomic, SharedInstances
+
+class MediaStore:
+    """Content-addressed index of images keyed by the SHA-256 of their bytes.
+
+    Each entry records the local file holding the image and, per WordPress
+    site, the media ID and URL it was uploaded as, so identical images are
+    neither kept twice on disk nor uploaded twice to the same site.
+
+    Only the `max_entries` most recently uploaded images are kept, and the
+    index is written at most every `save_interval` seconds, so uploads made
+    in between are saved together; flush() writes what is left at the end
+    of a run.
+    """
+
+    def __init__(self, index_path=IMAGE_STORE_INDEX, max_entries=IMAGE_STORE_MAX_ENTRIES,
+                 save_interval=IMAGE_STORE_SAVE_INTERVAL):
+        self.setup_logging()
+        self.index_path = index_path
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved = time.time()
+        self.entries = self._load()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self):
+        """Load the index from disk"""
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Could not read image store index {self.index_path}: {str(e)}")
+            return {}
+
+    def _save(self):
+        """Write the index if it changed since it was last written; called with the lock held"""
+        if not self._dirty:
+            return
+        try:
+            write_json_atomic(self.index_path, self.entries)
+            self._dirty = False
+        except Exception as e:
+            self.logger.warning(f"Could not write image store index {self.index_path}: {str(e)}")
+        self._saved = time.time()
+
+    def flush(self):
+        """Write the changes not saved yet"""
+        with self._lock:
+            self._save()
+
+    @staticmethod
+    def hash_file(path):
+        """Compute the SHA-256 of a file's contents"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_bytes(data):
+        """Compute the SHA-256 of an image held in memory"""
+        return hashlib.sha256(data).hexdigest()
+
+    def get_media(self, image_hash, site):
+        """Get the media previously uploaded to a site for an image hash"""
+        with self._lock:
+            entry = self.entries.get(image_hash)
+            if not entry:
+                return None
+            return entry.get('media', {}).get(site)
+
+    def forget_media(self, image_hash, site):
+        """Forget the media an image was uploaded as on a site, e.g. once it was deleted there"""
+        with self._lock:
+            entry = self.entries.get(image_hash)
+            if entry and entry.get('media', {}).pop(site, None) is not None:
+                self._dirty = True
+
+    def record_media(self, image_hash, site, media_data, path=None):
+        """Remember the media ID and URL an image was uploaded as on a site"""
+        with self._lock:
+            # Entries are kept from least to most recently uploaded
+            entry = self.entries.pop(image_hash, None) or {'path': path, 'media': {}}
+            self.entries[image_hash] = entry
+            if path and not entry.get('path'):
+                entry['path'] = path
+            entry['media'][site] = {'id': media_data['id'], 'url': media_data['url']}
+            # Images forgotten here are still found on the site by their hash tag
+            for old_hash in list(islice(self.entries, max(len(self.entries) - self.max_entries, 0))):
+                del self.entries[old_hash]
+            self._dirty = True
+            if time.time() - self._saved >= self.save_interval:
+                self._save()
+
+_shared_stores = SharedInstances(MediaStore)
+
+def get_media_store(index_path=IMAGE_STORE_INDEX):
+    """Get the process-wide store for an index file, so every component shares one copy"""
+    return _shared_stores.get(index_path)
@@ -0,0 +1,335 @@
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from config.config import WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD, WORDPRESS_ASSIGN_TERMS
+from modules.wordpress_integration import WordPressIntegration
+from modules.content_processor import ContentProcessor
+from modules.batch_publisher import BatchPublisher
+from modules.log_broadcaster import submit_with_context, set_log_context
+from modules.sheet_rows import clean_sheet_data
+
+def load_sites(path):
+    """Load the WordPress sites to publish to from a JSON file.
+
+    The file holds a list of objects with `url`, `username` and `password`
+    (or `password_env`, the name of an environment variable holding it),
+    and optionally `adsense_script` to use instead of the configured one.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        sites = json.load(f)
+    if not isinstance(sites, list) or not sites:
+        raise ValueError(f"Sites file {path} must hold a non-empty list of sites")
+    for site in sites:
+        if not site.get('url'):
+            raise ValueError(f"Site without a url in {path}")
+        if 'password_env' in site:
+            site['password'] = os.getenv(site['password_env'], '')
+    return sites
+
+def default_sites():
+    """The single site set in the configuration"""
+    return [{'url': WORDPRESS_URL, 'username': WORDPRESS_USERNAME, 'password': WORDPRESS_PASSWORD}]
+
+class SitePublisher:
+    """Publishes generated articles to one WordPress site.
+
+    Holds the site's own integration, content processor and batch
+    publisher, so uploads, ads and post creation use that site's
+    credentials and media URLs. `on_result(url, title, post_id, error)`
+    is called for each queued post once the site has created it or failed.
+    """
+
+    def __init__(self, site, image_handler, on_result=None):
+        self.setup_logging()
+        self.wordpress = WordPressIntegration(
+            wordpress_url=site['url'],
+            wordpress_username=site.get('username'),
+            wordpress_password=site.get('password')
+        )
+        self.url = self.wordpress.wordpress_url
+        self.content_processor = ContentProcessor(wordpress_integration=self.wordpress)
+        if site.get('adsense_script'):
+            self.content_processor.adsense_script = site['adsense_script']
+        self.publisher = BatchPublisher(self.wordpress)
+        self.image_handler = image_handler
+        self.on_result = on_result
+        # Titles of queued posts the site failed to create
+        self.failed_titles = set()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def prepare(self):
+        """Load the posts and media the site already has, and its categories and tags.
+
+        Once loaded, only the posts and media changed since are fetched.
+        """
+        if self.wordpress.inventory:
+            self.wordpress.inventory.refresh()
+        else:
+            self.wordpress.load_inventory()
+        if WORDPRESS_ASSIGN_TERMS:
+            self.wordpress.prepare_terms()
+
+    def find_post(self, title):
+        return self.wordpress.find_post(title)
+
+    def publish(self, article):
+        """Upload the article's images to the site and queue the post"""
+        title = article['title']
+
+        # Upload the featured and content images concurrently; the results
+        # keep the ranked order, and the best image that uploaded becomes
+        # the featured image
+        self.logger.info(f"Uploading images to {self.url}")
+        uploaded_media = [media for media in self.wordpress.upload_media_all(article['ranked_images']) if media]
+        if not uploaded_media:
+            raise ValueError(f"No images could be uploaded for post: {title}")
+        featured_media = uploaded_media[0]
+
+        # Insert images into content (excluding featured image)
+        html_content = self.content_processor.insert_images(article['html'], uploaded_media[1:])
+
+        # Insert AdSense
+        html_content = self.content_processor.insert_adsense(html_content)
+
+        # Queue the post with its featured image; posts are created in
+        # batches to save round trips, after any of the batch's categories
+        # and tags the site doesn't have yet
+        self.logger.info(f"Queueing post for publishing on {self.url}: {title}")
+        self.publisher.add_post(
+            title=title,
+            content=html_content,
+            featured_media=featured_media['id'],
+            categories=article['categories'],
+            tags=article['tags'],
+            context=(title, article['image_records'])
+        )
+        if self.publisher.is_full():
+            self.flush()
+
+    def flush(self):
+        """Publish the queued posts, and record and log their outcome"""
+        for (title, image_records), post, error in self.publisher.flush():
+            if self.on_result:
+                self.on_result(self.url, title, None if error else post['id'], error)
+            if error:
+                self.logger.error(f"Error publishing post {title} on {self.url}: {error}")
+                self.failed_titles.add(title)
+                continue
+            self.image_handler.record_published_images(image_records, self.url)
+            self.logger.info(f"Successfully published post: {title} (ID: {post['id']}) on {self.url}")
+
+class FanoutPublisher:
+    """Publishes each generated article to several WordPress sites concurrently.
+
+    The article's content and images are produced once; each site then
+    uploads the images, assembles the post and publishes it on its own, so
+    a failure on one site doesn't affect the others.
+    """
+
+    def __init__(self, sites, image_handler, on_result=None):
+        self.setup_logging()
+        self.sites = [SitePublisher(site, image_handler, on_result) for site in sites]
+        self.executor = ThreadPoolExecutor(max_workers=len(self.sites))
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def content_processor(self):
+        """A content processor for the steps that are the same for every site"""
+        return self.sites[0].content_processor
+
+    @property
+    def history_site(self):
+        """The site whose published images new images are checked against, if there is only one"""
+        return self.sites[0].url if len(self.sites) == 1 else None
+
+    def _run(self, sites, action, description):
+        """Run action(site) on each site concurrently, returning {site url: error or None}"""
+        # Workers log under the caller's job, post and stage
+        futures = {site.url: submit_with_context(self.executor, action, site) for site in sites}
+        errors = {}
+        for url, future in futures.items():
+            try:
+                future.result()
+                errors[url] = None
+            except Exception as e:
+                self.logger.error(f"Error {description} on {url}: {str(e)}")
+                errors[url] = str(e)
+        return errors
+
+    def prepare(self):
+        """Prepare every site for publishing"""
+        return self._run(self.sites, lambda site: site.prepare(), "preparing site")
+
+    def sites_without(self, title):
+        """The sites that don't have a post with this title yet"""
+        sites = []
+        for site in self.sites:
+            existing_post = site.find_post(title)
+            if existing_post:
+                self.logger.info(f"Skipping post already on {site.url}: {title} (ID: {existing_post['id']})")
+            else:
+                sites.append(site)
+        return sites
+
+    def publish(self, article, sites=None):
+        """Publish an article to each of the given sites, or all of them"""
+        return self._run(sites or self.sites, lambda site: site.publish(article),
+                         f"publishing post {article['title']}")
+
+    def flush(self):
+        """Publish the posts still queued on every site"""
+        return self._run(self.sites, lambda site: site.flush(), "publishing queued posts")
+
+    def failed_titles(self):
+        """Titles of the queued posts that any site failed to create since this was last called"""
+        titles = set()
+        for site in self.sites:
+            titles |= site.failed_titles
+            site.failed_titles = set()
+        return titles
+
+    def close(self):
+        # Publish any posts still queued, e.g. by a run that stopped partway
+        if any(site.publisher.pending for site in self.sites):
+            self.flush()
+        self.executor.shutdown(wait=True)
+        # Write the media uploaded since the image store was last saved
+        for site in self.sites:
+            site.wordpress.media_store.flush()
+
+
+def process_row(post, sheets_manager, llm, image_handler, fanout, job=None, num_images=5, article_length=1000):
+    """Generate the article for one sheet row and publish it to the sites that don't have it yet.
+
+    The row is marked processed once every site has it, and is left for
+    the next run otherwise. Errors are logged rather than raised, so one
+    bad row doesn't stop the others. `job` is told about the post's
+    stages and outcome when the run is tracked.
+    """
+    logger = logging.getLogger(__name__)
+
+    def enter_stage(title, stage):
+        set_log_context(post=title, stage=stage)
+        if job:
+            job.enter_stage(title, stage)
+
+    try:
+        # Clean and format the post data
+        post_data = clean_sheet_data(post)
+        logger.info(f"Processing post: {post_data}")
+
+        # Skip if already published
+        if post_data['status'].lower() == 'published ✅':
+            logger.info(f"Skipping already published post: {post_data['title']}")
+            if job:
+                job.start_post(post_data['title'])
+                job.skip_post(post_data['title'], "Marked published in the sheet")
+            sheets_manager.mark_processed(post)
+            return
+
+        # Skip if title is empty
+        if not post_data['title']:
+            logger.warning("Skipping post with empty title")
+            sheets_manager.mark_processed(post)
+            return
+
+        # Skip the sites that already have a post with this title
+        if job:
+            job.start_post(post_data['title'])
+        sites = fanout.sites_without(post_data['title'])
+        if not sites:
+            if sheets_manager.is_edited(post):
+                # Posts are only ever created, so the edit stays in the sheet
+                logger.warning(f"Row '{post_data['title']}' was edited after it was published; "
+                               "edits to published rows are not applied to the posts")
+                reason = "Edited after publishing; edits are not applied"
+            else:
+                logger.info(f"Skipping post already on every site: {post_data['title']}")
+                reason = "Already on every site"
+            if job:
+                job.skip_post(post_data['title'], reason)
+            sheets_manager.mark_processed(post)
+            return
+
+        # Search and download images
+        enter_stage(post_data['title'], 'images')
+        logger.info(f"Searching for images for: {post_data['title']}")
+        images = image_handler.search_and_download_images(
+            topic=post_data['topic'],
+            keywords=post_data['keywords'],
+            num_images=num_images,
+            site=fanout.history_site
+        )
+
+        if not images:
+            logger.warning(f"No images found for post: {post_data['title']}")
+            if job:
+                job.fail_post(post_data['title'], "No images found")
+            return
+
+        # Rank the candidates: the best becomes the featured image and
+        # the rest are placed in the content in ranked order
+        ranked_images = image_handler.rank_images(images)
+        if not ranked_images:
+            logger.warning(f"Could not select featured image for post: {post_data['title']}")
+            if job:
+                job.fail_post(post_data['title'], "Could not select featured image")
+            return
+
+        # Generate content using LLM
+        enter_stage(post_data['title'], 'content')
+        logger.info(f"Generating content for: {post_data['title']}")
+        logger.info(f"Topic: {post_data['topic']}")
+        logger.info(f"Keywords: {post_data['keywords']}")
+        logger.info(f"Context: {post_data['context']}")
+        logger.info(f"Target article length: {article_length} words")
+
+        markdown_content = llm.generate_content(
+            title=post_data['title'],
+            topic=post_data['topic'],
+            keywords=post_data['keywords'],
+            context=post_data['context'],
+            word_count=article_length
+        )
+        logger.info("Generated content using LLM")
+
+        # Convert markdown to HTML
+        html_content = fanout.content_processor.convert_markdown_to_html(markdown_content)
+        logger.info("Converted markdown to HTML")
+
+        # Add required elements if specified
+        if post_data['must_have_elements']:
+            required_elements = [elem.strip() for elem in post_data['must_have_elements'].split(',')]
+            logger.info(f"Adding required elements: {required_elements}")
+            html_content = fanout.content_processor.add_required_elements(html_content, required_elements)
+
+        # The content and images are produced once; each site then
+        # uploads the images and publishes the post concurrently,
+        # independently of the others
+        enter_stage(post_data['title'], 'publish')
+        errors = fanout.publish({
+            'title': post_data['title'],
+            'html': html_content,
+            'ranked_images': ranked_images,
+            # Only the images' hashes and paths wait in the sites' batches
+            'image_records': image_handler.published_image_records(images),
+            'categories': post_data['categories'],
+            'tags': post_data['tags']
+        }, sites)
+        if job:
+            job.post_sent(post_data['title'], [site.url for site in sites], errors)
+        # Rows that failed on any site are tried again next run
+        if not any(errors.values()):
+            sheets_manager.mark_processed(post)
+
+    except Exception as e:
+        logger.error(f"Error processing post {post.get('title', 'Unknown')}: {str(e)}")
+        if job and post.get('title', '').strip():
+            job.fail_post(post['title'].strip(), str(e))
+    finally:
+        set_log_context(post=None, stage=None)
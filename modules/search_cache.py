@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import logging
+import threading
+from config.config import (
+    IMAGE_SEARCH_CACHE_PATH,
+    IMAGE_SEARCH_CACHE_TTL,
+    IMAGE_SEARCH_CACHE_NEGATIVE_TTL
+)
+from modules.image_library import tokenize
+from modules.storage import write_json_atomic, SharedInstances
+
+def normalize_query(query):
+    """Reduce a query to a cache key, so word order, case and plurals don't matter"""
+    return ' '.join(sorted(set(tokenize(query))))
+
+class SearchCache:
+    """Persistent cache of image search results, keyed by provider and normalized query.
+
+    Results expire after `ttl` seconds. Searches that found nothing are
+    cached too, for the shorter `negative_ttl`, so a query that keeps
+    failing doesn't relaunch a search for every row that uses it.
+    """
+
+    def __init__(self, path=IMAGE_SEARCH_CACHE_PATH, ttl=IMAGE_SEARCH_CACHE_TTL,
+                 negative_ttl=IMAGE_SEARCH_CACHE_NEGATIVE_TTL):
+        self.setup_logging()
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self):
+        """Load the cache from disk, dropping expired entries"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Could not read image search cache {self.path}: {str(e)}")
+            return {}
+        now = time.time()
+        return {key: entry for key, entry in entries.items() if entry['expires'] > now}
+
+    def _save(self):
+        """Write the cache atomically"""
+        write_json_atomic(self.path, self.entries)
+
+    @staticmethod
+    def _key(provider, query):
+        return f"{provider}:{normalize_query(query)}"
+
+    def get(self, provider, query, num_results, num_images=None):
+        """Get cached results for a query, or None if a fresh search is needed.
+
+        A cached list shorter than the number of results it was searched for
+        is complete, so it satisfies any request; otherwise it must hold at
+        least `num_results` entries. A search stopped early, once it had
+        enough images, also satisfies requests for up to as many images as
+        its results produced.
+        """
+        key = self._key(provider, query)
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+            if entry['expires'] <= time.time():
+                del self.entries[key]
+                return None
+            results = entry['results']
+            if 'images' in entry:
+                return results if num_images is not None and entry['images'] >= num_images else None
+            if len(results) < entry['requested'] or len(results) >= num_results:
+                return results[:num_results]
+            return None
+
+    def put(self, provider, query, results, num_results, num_images=None):
+        """Cache the results of a search for `num_results` results.
+
+        `num_images` is the number of images the results produced, for a
+        search that was stopped before it found `num_results`.
+        """
+        ttl = self.ttl if results else self.negative_ttl
+        entry = {
+            'results': list(results),
+            'requested': num_results,
+            'expires': time.time() + ttl
+        }
+        if num_images is not None:
+            entry['images'] = num_images
+        with self._lock:
+            self.entries[self._key(provider, query)] = entry
+            try:
+                self._save()
+            except Exception as e:
+                self.logger.warning(f"Could not write image search cache {self.path}: {str(e)}")
+
+    def invalidate(self, provider, query):
+        """Forget the cached results for a query, e.g. once its URLs stop working"""
+        with self._lock:
+            if self.entries.pop(self._key(provider, query), None) is not None:
+                self._save()
+
+_shared_caches = SharedInstances(SearchCache)
+
+def get_search_cache(path=IMAGE_SEARCH_CACHE_PATH):
+    """Get the process-wide cache for a file, so every component shares one copy"""
+    return _shared_caches.get(path)
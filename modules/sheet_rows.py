@@ -0,0 +1,38 @@
+import re
+from config.config import WORDPRESS_ASSIGN_TERMS
+
+def split_terms(value):
+    """Split a comma or semicolon separated list of category or tag names"""
+    return [name.strip() for name in re.split(r'[,;]', value.strip().strip('"')) if name.strip()]
+
+def clean_sheet_data(post):
+    """Clean and format data from Google Sheets"""
+    # Get images and clean them
+    images = post.get('images', '')
+    if images:
+        # Split by comma and clean each URL/path
+        image_list = [img.strip() for img in images.split(',') if img.strip()]
+    else:
+        image_list = []
+
+    # Categories and tags come from their own columns if the sheet has them,
+    # else from the topic and keywords
+    topic = post.get('topic name', '').strip()
+    keywords = post.get('keywords', '').strip().strip('"')
+    if WORDPRESS_ASSIGN_TERMS:
+        categories = split_terms(post.get('categories', '')) or ([topic] if topic else [])
+        tags = split_terms(post.get('tags', '')) or split_terms(keywords)
+    else:
+        categories, tags = [], []
+
+    return {
+        'title': post.get('title', '').strip(),
+        'topic': topic,
+        'keywords': keywords,
+        'context': post.get('context', '').strip().strip('"'),
+        'status': post.get('status', '').strip().strip('"'),
+        'must_have_elements': post.get('must have elements', '').strip().strip('"'),
+        'images': image_list,
+        'categories': categories,
+        'tags': tags
+    }
@@ -0,0 +1,201 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from config.config import SHEET_STATE_PATH, SHEET_STATE_MAX_ROWS
+from modules.storage import write_json_atomic, SharedInstances
+
+def row_key(post):
+    """Identify a sheet row across runs by its title"""
+    return ' '.join(post.get('title', '').lower().split())
+
+def row_hash(post):
+    """Hash a row's contents, so edits to any column are detected"""
+    return hashlib.sha256(json.dumps(post, sort_keys=True).encode('utf-8')).hexdigest()
+
+class SheetState:
+    """What the last successful run saw of each sheet.
+
+    Per spreadsheet it keeps the export's ETag and Last-Modified
+    validators, for a conditional download that is skipped when nothing
+    changed, and a content hash of each row processed, so only rows added
+    or edited since are processed again. At most `max_rows` hashes are
+    kept per spreadsheet, so memory doesn't grow with the input; rows
+    processed longest ago are forgotten first, and are processed again if
+    they come up.
+    """
+
+    def __init__(self, path=SHEET_STATE_PATH, max_rows=SHEET_STATE_MAX_ROWS):
+        self.setup_logging()
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self.sheets = self._load()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self):
+        """Load the state from disk"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Could not read sheet state {self.path}: {str(e)}")
+            return {}
+
+    def _save(self):
+        """Write the state atomically"""
+        write_json_atomic(self.path, self.sheets)
+
+    def _sheet(self, spreadsheet_id):
+        return self.sheets.setdefault(spreadsheet_id, {'etag': None, 'last_modified': None, 'rows': {}})
+
+    def validators(self, spreadsheet_id):
+        """The (ETag, Last-Modified) of the input as of the last successful run"""
+        with self._lock:
+            sheet = self.sheets.get(spreadsheet_id, {})
+            return sheet.get('etag'), sheet.get('last_modified')
+
+    def conditional_headers(self, spreadsheet_id):
+        """Headers asking for the export only if it changed since the last successful run"""
+        etag, last_modified = self.validators(spreadsheet_id)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def is_unchanged(self, spreadsheet_id, post):
+        """Whether a row was processed before with the same contents"""
+        with self._lock:
+            rows = self.sheets.get(spreadsheet_id, {}).get('rows', {})
+            return rows.get(row_key(post)) == row_hash(post)
+
+    def is_edited(self, spreadsheet_id, post):
+        """Whether a row was processed before with different contents"""
+        with self._lock:
+            rows = self.sheets.get(spreadsheet_id, {}).get('rows', {})
+            digest = rows.get(row_key(post))
+            return digest is not None and digest != row_hash(post)
+
+    def record(self, spreadsheet_id, post):
+        """Remember that a row was processed with its current contents"""
+        key, digest = row_key(post), row_hash(post)
+        with self._lock:
+            rows = self._sheet(spreadsheet_id)['rows']
+            # Keep the rows in the order they were last processed
+            rows.pop(key, None)
+            rows[key] = digest
+            while len(rows) > self.max_rows:
+                del rows[next(iter(rows))]
+
+    def forget(self, spreadsheet_id, keys):
+        """Forget rows, so the next run processes them again"""
+        with self._lock:
+            rows = self._sheet(spreadsheet_id)['rows']
+            for key in keys:
+                rows.pop(key, None)
+
+    def update(self, spreadsheet_id, validators=None):
+        """Save the rows recorded so far and the input's validators.
+
+        `validators` (the export's ETag and Last-Modified) are only stored
+        when the run processed every changed row, since a later conditional
+        download would otherwise skip the rows left to do.
+        """
+        with self._lock:
+            sheet = self._sheet(spreadsheet_id)
+            etag, last_modified = validators or (None, None)
+            sheet['etag'] = etag
+            sheet['last_modified'] = last_modified
+            self._save()
+
+class RowTracker:
+    """Change tracking shared by the sources of blog rows.
+
+    A source sets `state`, `source_key` and `changed_only`, passes the rows
+    it parses through _track_rows, and sets `_validators` or
+    `_not_modified` for the input as a whole. Runs call set_targets with
+    the sites they publish to, then mark_processed for each row they
+    handle and save_state at the end. A run only counts rows, so its
+    memory doesn't grow with the input.
+    """
+
+    targets = ()
+
+    def set_targets(self, urls):
+        """Set the sites the rows are published to; each set of sites has its own state"""
+        self.targets = tuple(sorted(set(urls)))
+
+    @property
+    def state_key(self):
+        """The key of this input's state: the source and the sites it is published to.
+
+        A row processed for one set of sites is still new to another, so
+        publishing the same sheet to a different site reads all of it.
+        """
+        if not self.targets:
+            return self.source_key
+        return f"{self.source_key}|{'|'.join(self.targets)}"
+
+    def _reset_run(self):
+        self._validators = None
+        self._not_modified = False
+        self._read_all = False
+        self._read_count = 0
+        self._processed_count = 0
+
+    def _track_rows(self, rows, source):
+        """Yield the rows that changed since the last run (all rows unless changed_only)"""
+        row_count = 0
+        unchanged_count = 0
+        for post_data in rows:
+            if self.changed_only and self.state.is_unchanged(self.state_key, post_data):
+                unchanged_count += 1
+                continue
+            self.logger.debug(f"Read post data: {post_data}")
+            self._read_count += 1
+            row_count += 1
+            yield post_data
+
+        self._read_all = True
+        self.logger.info(f"Read {row_count} rows from {source}"
+                         + (f", skipped {unchanged_count} unchanged since the last run" if unchanged_count else ""))
+
+    def is_edited(self, post):
+        """Whether a row was processed by an earlier run and edited since"""
+        return self.state.is_edited(self.state_key, post)
+
+    def mark_processed(self, post):
+        """Record that a row was handled, so later runs skip it until it is edited"""
+        self.state.record(self.state_key, post)
+        self._processed_count += 1
+
+    def save_state(self, failed_titles=()):
+        """Remember the rows this run processed, once it has finished.
+
+        Rows whose posts failed to publish are left out so the next run
+        retries them. The input's validators are only kept if every row
+        read was processed, so the next run doesn't skip the input while
+        rows remain to be done.
+        """
+        if self._not_modified:
+            return
+        failed = {row_key({'title': title}) for title in failed_titles}
+        complete = self._read_all and not failed and self._processed_count >= self._read_count
+        try:
+            self.state.forget(self.state_key, failed)
+            self.state.update(self.state_key, self._validators if complete else None)
+        except Exception as e:
+            self.logger.warning(f"Could not save sheet state: {str(e)}")
+
+_shared_states = SharedInstances(SheetState)
+
+def get_sheet_state(path=SHEET_STATE_PATH):
+    """Get the process-wide sheet state for a file, so concurrent runs don't overwrite each other"""
+    return _shared_states.get(path)
@@ -0,0 +1,172 @@
+import os
+import re
+import html
+import logging
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from config.config import WORDPRESS_INVENTORY_PAGE_SIZE, WORDPRESS_INVENTORY_CONCURRENCY
+from modules.log_broadcaster import submit_with_context
+
+# Uploaded filenames end in a prefix of the image hash, e.g. photo-1a2b3c4d5e6f.jpg,
+# possibly followed by the suffixes WordPress adds (-scaled, -1)
+HASH_TAG_PATTERN = re.compile(r'-([0-9a-f]{12})(?=[-.]|$)')
+
+# Fields fetched for each kind of item
+FIELDS = {
+    'posts': 'id,slug,title,modified_gmt',
+    'media': 'id,source_url,modified_gmt'
+}
+
+def normalize_title(title):
+    """Reduce a post title to the form titles are compared in"""
+    title = html.unescape(title).replace('’', "'").replace('‘', "'")
+    return ' '.join(title.lower().split())
+
+def slugify(title):
+    """Approximate the slug WordPress generates for a title"""
+    title = normalize_title(title).replace("'", '')
+    return re.sub(r'[^a-z0-9]+', '-', title).strip('-')
+
+def fetch_collection(wordpress, kind, params=None, fields=None, page_size=WORDPRESS_INVENTORY_PAGE_SIZE,
+                     concurrency=WORDPRESS_INVENTORY_CONCURRENCY):
+    """Fetch every item of a REST collection such as posts or tags.
+
+    The first page gives the number of pages, and the rest are fetched
+    concurrently.
+    """
+    params = dict(params or {}, per_page=min(max(page_size, 1), 100), orderby='id', order='asc')
+    if fields:
+        params['_fields'] = fields
+
+    def fetch_page(page):
+        response = wordpress.http.get(f"{wordpress.base_url}/{kind}", auth=wordpress.auth,
+                                      params=dict(params, page=page))
+        response.raise_for_status()
+        return response.json(), int(response.headers.get('X-WP-TotalPages', 1))
+
+    items, total_pages = fetch_page(1)
+    if total_pages > 1:
+        with ThreadPoolExecutor(max_workers=min(max(concurrency, 1), total_pages - 1)) as executor:
+            futures = [submit_with_context(executor, fetch_page, page) for page in range(2, total_pages + 1)]
+            for future in futures:
+                items.extend(future.result()[0])
+    return items
+
+class SiteInventory:
+    """In-memory index of the posts and media that already exist on a WordPress site.
+
+    load() fetches every post (by slug and title) and media item (by file
+    name and image hash tag) with concurrent paginated requests, and
+    refresh() fetches only what changed since, using modified_after, so
+    duplicate checks are local lookups rather than one REST query each.
+    """
+
+    def __init__(self, wordpress, page_size=WORDPRESS_INVENTORY_PAGE_SIZE,
+                 concurrency=WORDPRESS_INVENTORY_CONCURRENCY):
+        self.setup_logging()
+        self.wordpress = wordpress
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.posts_by_slug = {}
+        self.posts_by_title = {}
+        self.media_by_tag = {}
+        self.media_by_filename = {}
+        self.media_by_id = {}
+        self.modified = {'posts': None, 'media': None}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def load(self):
+        """Fetch the site's whole inventory"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            posts = submit_with_context(executor, self._fetch_all, 'posts')
+            media = submit_with_context(executor, self._fetch_all, 'media')
+            posts, media = posts.result(), media.result()
+
+        with self._lock:
+            self.posts_by_slug = {}
+            self.posts_by_title = {}
+            self.media_by_tag = {}
+            self.media_by_filename = {}
+            self.media_by_id = {}
+        self._index('posts', posts)
+        self._index('media', media)
+        self.loaded = True
+        self.logger.info(f"Loaded inventory of {self.wordpress.wordpress_url}: "
+                         f"{len(posts)} posts, {len(media)} media items")
+
+    def refresh(self, kind=None):
+        """Fetch the posts and/or media created or changed since the last load or refresh"""
+        if not self.loaded:
+            self.load()
+            return
+        for item_kind in ([kind] if kind else ['posts', 'media']):
+            params = {}
+            if self.modified[item_kind]:
+                params['modified_after'] = f"{self.modified[item_kind]}Z"
+            items = self._fetch_all(item_kind, params)
+            self._index(item_kind, items)
+            if items:
+                self.logger.info(f"Refreshed inventory of {self.wordpress.wordpress_url}: "
+                                 f"{len(items)} {item_kind} changed")
+
+    def _fetch_all(self, kind, params=None):
+        params = dict(params or {})
+        if kind == 'posts':
+            params['status'] = 'any'
+        return fetch_collection(self.wordpress, kind, params, FIELDS[kind], self.page_size, self.concurrency)
+
+    def _index(self, kind, items):
+        add = self.add_post if kind == 'posts' else self.add_media
+        for item in items:
+            add(item)
+
+    def add_post(self, post):
+        """Index a post as returned by the REST API"""
+        title = post.get('title', '')
+        if isinstance(title, dict):
+            title = title.get('raw') or title.get('rendered', '')
+        entry = {'id': post['id'], 'slug': post.get('slug', ''), 'title': html.unescape(title)}
+        with self._lock:
+            if entry['slug']:
+                self.posts_by_slug[entry['slug']] = entry
+            if title:
+                self.posts_by_title[normalize_title(title)] = entry
+            self._track_modified('posts', post)
+
+    def add_media(self, media):
+        """Index a media item as returned by the REST API"""
+        url = media.get('source_url') or media.get('url', '')
+        filename = os.path.basename(urlparse(url).path)
+        match = HASH_TAG_PATTERN.search(filename)
+        entry = {'id': media['id'], 'url': url, 'filename': filename, 'tag': match.group(1) if match else None}
+        with self._lock:
+            self.media_by_filename[filename] = entry
+            self.media_by_id[entry['id']] = entry
+            if entry['tag']:
+                self.media_by_tag[entry['tag']] = entry
+            self._track_modified('media', media)
+
+    def _track_modified(self, kind, item):
+        modified = item.get('modified_gmt')
+        if modified and (self.modified[kind] is None or modified > self.modified[kind]):
+            self.modified[kind] = modified
+
+    def find_post(self, title):
+        """Get the existing post with a title, matched by title or by the slug it would get"""
+        with self._lock:
+            return self.posts_by_title.get(normalize_title(title)) or self.posts_by_slug.get(slugify(title))
+
+    def find_media(self, tag):
+        """Get the existing media item whose file name carries an image hash tag"""
+        with self._lock:
+            return self.media_by_tag.get(tag)
+
+    def has_media(self, media_id):
+        """Whether a media item with this ID exists on the site"""
+        with self._lock:
+            return media_id in self.media_by_id
@@ -0,0 +1,37 @@
+import os
+import json
+import threading
+
+def write_json_atomic(path, data):
+    """Write data to a JSON file atomically, so a crash never leaves it half-written"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def forget_finished(jobs, limit):
+    """Forget the oldest finished jobs of an ordered {job ID: job} beyond the last `limit`"""
+    finished = [job_id for job_id, job in jobs.items() if job.finished]
+    for job_id in finished[:max(len(finished) - limit, 0)]:
+        del jobs[job_id]
+
+class SharedInstances:
+    """Process-wide instances created by `factory(key)`, one per key such as a file path.
+
+    Components that get their instance from here share one copy of a file's
+    contents, so concurrent runs don't overwrite each other's changes.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.instances = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self.instances:
+                self.instances[key] = self.factory(key)
+            return self.instances[key]
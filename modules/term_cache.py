@@ -0,0 +1,98 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.site_inventory import fetch_collection, normalize_title, slugify
+from modules.batch_publisher import BatchPublisher, MAX_BATCH_SIZE
+from modules.log_broadcaster import submit_with_context
+
+TAXONOMIES = ['categories', 'tags']
+
+class TermCache:
+    """A WordPress site's categories and tags, resolved from name to term ID locally.
+
+    load() fetches every term once, and ensure() creates the missing
+    terms of a batch of posts in batch requests before the posts are
+    sent, so attaching terms to a post costs no requests of its own.
+    """
+
+    def __init__(self, wordpress):
+        self.setup_logging()
+        self.wordpress = wordpress
+        self.terms = {taxonomy: {} for taxonomy in TAXONOMIES}
+        # One publisher for every ensure(), so the site's batch support is checked once
+        self.publisher = BatchPublisher(wordpress, MAX_BATCH_SIZE)
+        self._lock = threading.Lock()
+        self._ensure_lock = threading.Lock()
+
+    def setup_logging(self):
+        self.logger = logging.getLogger(__name__)
+
+    def load(self):
+        """Fetch every category and tag on the site"""
+        with ThreadPoolExecutor(max_workers=len(TAXONOMIES)) as executor:
+            futures = [submit_with_context(executor, self._fetch, taxonomy) for taxonomy in TAXONOMIES]
+            loaded = {taxonomy: future.result() for taxonomy, future in zip(TAXONOMIES, futures)}
+        for taxonomy, terms in loaded.items():
+            self._index(taxonomy, terms)
+        self.logger.info(f"Loaded {len(loaded['categories'])} categories and {len(loaded['tags'])} tags "
+                         f"from {self.wordpress.wordpress_url}")
+
+    def _fetch(self, taxonomy):
+        return fetch_collection(self.wordpress, taxonomy, {'hide_empty': 'false'}, 'id,name,slug')
+
+    def _index(self, taxonomy, terms):
+        with self._lock:
+            for term in terms:
+                self.terms[taxonomy][normalize_title(term['name'])] = term['id']
+                self.terms[taxonomy][term['slug']] = term['id']
+
+    def find(self, taxonomy, name):
+        """Get the ID of a term by name, or None"""
+        with self._lock:
+            terms = self.terms[taxonomy]
+            return terms.get(normalize_title(name)) or terms.get(slugify(name))
+
+    def ensure(self, names):
+        """Create the terms that don't exist yet, given {taxonomy: names}, in as few requests as possible"""
+        with self._ensure_lock:
+            self._ensure(names)
+
+    def _ensure(self, names):
+        publisher = self.publisher
+        missing = {}
+        for taxonomy, taxonomy_names in names.items():
+            for name in taxonomy_names:
+                name = ' '.join(name.split())
+                key = (taxonomy, normalize_title(name))
+                if name and key not in missing and not self.find(taxonomy, name):
+                    missing[key] = name
+                    publisher.add_request('POST', f"/wp/v2/{taxonomy}", {'name': name}, context=(taxonomy, name))
+        if not missing:
+            return
+
+        self.logger.info(f"Creating {len(missing)} categories and tags on {self.wordpress.wordpress_url}")
+        failed = set()
+        for (taxonomy, name), term, error in publisher.flush():
+            if error:
+                # Usually term_exists, for a term created since the cache was loaded
+                failed.add(taxonomy)
+            else:
+                self._index(taxonomy, [term])
+
+        for taxonomy in failed:
+            try:
+                self._index(taxonomy, self._fetch(taxonomy))
+            except Exception as e:
+                self.logger.warning(f"Could not reload {taxonomy}: {str(e)}")
+
+    def ids(self, taxonomy, names):
+        """Get the IDs of the terms with the given names, leaving out any that don't exist"""
+        term_ids = []
+        for name in names:
+            term_id = self.find(taxonomy, name)
+            if term_id:
+                if term_id not in term_ids:
+                    term_ids.append(term_id)
+            else:
+                self.logger.warning(f"No {taxonomy} term named {name} on {self.wordpress.wordpress_url}")
+        return term_ids
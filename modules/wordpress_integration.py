@@ -1,13 +1,33 @@
-import requests
 import logging
 import os
 import mimetypes
+import time
+import threading
+import requests
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 from config.config import WORDPRESS_URL as DEFAULT_WORDPRESS_URL
 from config.config import WORDPRESS_USERNAME as DEFAULT_WORDPRESS_USERNAME
 from config.config import WORDPRESS_PASSWORD as DEFAULT_WORDPRESS_PASSWORD
+from config.config import WORDPRESS_UPLOAD_CONCURRENCY, WORDPRESS_UPLOAD_TIMEOUT, WORDPRESS_UPLOAD_RETRIES
+from config.config import HTTP_CONNECT_TIMEOUT
+from modules.media_store import get_media_store
+from modules.image_buffer import ImageBuffer
+from modules.http_client import get_http_client
+from modules.site_inventory import SiteInventory
+from modules.term_cache import TermCache
+from modules.log_broadcaster import submit_with_context
+
+# Upload slots per site, shared by every integration instance so concurrent
+# posts together stay within the site's limit
+_upload_slots = {}
+_upload_slots_lock = threading.Lock()
+
+# Characters of the image hash added to uploaded filenames, to find an upload again
+UPLOAD_TAG_LENGTH = 12
 
 class WordPressIntegration:
-    def __init__(self, wordpress_url=None, wordpress_username=None, wordpress_password=None):
+    def __init__(self, wordpress_url=None, wordpress_username=None, wordpress_password=None, media_store=None):
         self.setup_logging()
 
         # Use provided values or fall back to defaults
@@ -29,58 +49,237 @@ class WordPressIntegration:
         self.base_url = f"{self.wordpress_url}/wp-json/wp/v2"
         self.media_base_url = f"{self.wordpress_url}/wp-content/uploads"
         self.auth = (self.wordpress_username, self.wordpress_password)
+        self.http = get_http_client()
+
+        # Images already uploaded to this site are reused instead of uploaded again
+        self.media_store = media_store or get_media_store()
+
+        # What already exists on the site, once load_inventory() has fetched it
+        self.inventory = None
+        # Category and tag IDs by name, once prepare_terms() has loaded them
+        self.terms = None
 
         self.logger.info(f"Initialized WordPress integration for {self.wordpress_url}")
 
     def setup_logging(self):
         self.logger = logging.getLogger(__name__)
 
+    def load_inventory(self):
+        """Prefetch the site's existing posts and media, so duplicate checks are local lookups"""
+        inventory = SiteInventory(self)
+        try:
+            inventory.load()
+            self.inventory = inventory
+        except Exception as e:
+            # Without an inventory, duplicate media is still found by searching the site
+            self.logger.warning(f"Could not load inventory of {self.wordpress_url}: {str(e)}")
+        return self.inventory
+
+    def find_post(self, title):
+        """Get the existing post with a title, or None (always None until the inventory is loaded)"""
+        if not self.inventory:
+            return None
+        return self.inventory.find_post(title)
+
+    def prepare_terms(self, categories=(), tags=()):
+        """Load the site's categories and tags, and create the given ones that are missing"""
+        try:
+            if not self.terms:
+                terms = TermCache(self)
+                terms.load()
+                self.terms = terms
+            self.terms.ensure({'categories': categories, 'tags': tags})
+        except Exception as e:
+            # Posts are still published, just without the terms that couldn't be resolved
+            self.logger.warning(f"Could not prepare categories and tags on {self.wordpress_url}: {str(e)}")
+        return self.terms
+
+    def post_terms(self, categories=None, tags=None):
+        """Get the post fields assigning categories and tags by name, resolved from the term cache"""
+        fields = {}
+        if not self.terms:
+            if categories or tags:
+                self.logger.warning("Categories and tags are ignored until prepare_terms() has loaded them")
+            return fields
+        if categories:
+            fields['categories'] = self.terms.ids('categories', categories)
+        if tags:
+            fields['tags'] = self.terms.ids('tags', tags)
+        return {field: term_ids for field, term_ids in fields.items() if term_ids}
+
     def get_mime_type(self, file_path):
         """Get the MIME type of a file"""
         mime_type, _ = mimetypes.guess_type(file_path)
         return mime_type or 'image/jpeg'
 
     def upload_media(self, image_path):
-        """Upload an image to WordPress media library"""
+        """Upload an image to WordPress media library.
+
+        The image can be a file path or an in-memory ImageBuffer, which is
+        uploaded without touching the disk. Files are streamed from disk
+        rather than read into memory.
+        """
         try:
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-
-            mime_type = self.get_mime_type(image_path)
-            filename = os.path.basename(image_path)
-
-            with open(image_path, 'rb') as image_file:
-                files = {
-                    'file': (filename, image_file, mime_type)
-                }
-                headers = {
-                    'Content-Disposition': f'attachment; filename="{filename}"'
-                }
-
-                response = requests.post(
-                    f"{self.base_url}/media",
-                    auth=self.auth,
-                    files=files,
-                    headers=headers
-                )
-
-                response.raise_for_status()
-                media_data = response.json()
-
-                if 'id' not in media_data or 'source_url' not in media_data:
-                    raise ValueError("No media ID or source URL in WordPress response")
-
-                media_id = media_data['id']
-                image_url = media_data['source_url']
-                self.logger.info(f"Successfully uploaded image: {filename} -> ID: {media_id}, URL: {image_url}")
-                return {'id': media_id, 'url': image_url}
+            if isinstance(image_path, ImageBuffer):
+                image_hash = self.media_store.hash_bytes(image_path.data)
+                upload = (image_path.filename, image_path.mime_type, image_path.open)
+                path = image_path.path
+            else:
+                if not os.path.exists(image_path):
+                    raise FileNotFoundError(f"Image file not found: {image_path}")
+                image_hash = self.media_store.hash_file(image_path)
+                upload = (os.path.basename(image_path), self.get_mime_type(image_path),
+                          lambda: open(image_path, 'rb'))
+                path = image_path
+
+            existing_media = self.media_store.get_media(image_hash, self.wordpress_url)
+            if existing_media and self.inventory and not self.inventory.has_media(existing_media['id']):
+                # Deleted on the site since it was uploaded
+                self.logger.info(f"Media {existing_media['id']} for {image_path} is no longer on the site")
+                self.media_store.forget_media(image_hash, self.wordpress_url)
+                existing_media = None
+            if existing_media:
+                self.logger.info(f"Reusing uploaded media for {image_path} -> ID: {existing_media['id']}")
+                return dict(existing_media)
+
+            site_media = self.inventory.find_media(image_hash[:UPLOAD_TAG_LENGTH]) if self.inventory else None
+            if site_media:
+                self.logger.info(f"Image {image_path} already on the site -> ID: {site_media['id']}")
+                media = {'id': site_media['id'], 'url': site_media['url']}
+            else:
+                media = self._post_media(image_hash, *upload)
+                if self.inventory:
+                    self.inventory.add_media(media)
+            self.media_store.record_media(image_hash, self.wordpress_url, media, path=path)
+            return media
 
         except Exception as e:
             self.logger.error(f"Error uploading image {image_path}: {str(e)}")
             raise
 
-    def create_post(self, title, content, featured_media=None, status='publish'):
-        """Create a new blog post with optional featured image"""
+    def _post_media(self, image_hash, filename, mime_type, open_stream):
+        """POST an image to the media endpoint, retrying failures without duplicating the attachment.
+
+        The file is sent as the raw request body, which the connection reads
+        from `open_stream()` in fixed-size blocks. The uploaded filename
+        carries a prefix of the image hash, so before each retry the media
+        library is searched for an attachment an earlier attempt created
+        even though its response was lost.
+        """
+        tag = image_hash[:UPLOAD_TAG_LENGTH]
+        stem, extension = os.path.splitext(filename)
+        filename = f"{stem}-{tag}{extension}"
+        headers = {
+            'Content-Type': mime_type,
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        }
+
+        for attempt in range(WORDPRESS_UPLOAD_RETRIES + 1):
+            if attempt:
+                existing_media = self.find_media(tag)
+                if existing_media:
+                    self.logger.info(f"Upload of {filename} had already succeeded -> ID: {existing_media['id']}")
+                    return existing_media
+
+            last_attempt = attempt == WORDPRESS_UPLOAD_RETRIES
+            response = None
+            try:
+                with open_stream() as stream:
+                    response = self.http.post(
+                        f"{self.base_url}/media",
+                        auth=self.auth,
+                        params={'_fields': 'id,source_url,modified_gmt'},
+                        data=stream,
+                        headers=headers,
+                        timeout=(HTTP_CONNECT_TIMEOUT, WORDPRESS_UPLOAD_TIMEOUT),
+                        retry=False
+                    )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                reason = str(e)
+            else:
+                if response.status_code not in self.http.retry_statuses or last_attempt:
+                    response.raise_for_status()
+                    media_data = response.json()
+                    if 'id' not in media_data or 'source_url' not in media_data:
+                        raise ValueError("No media ID or source URL in WordPress response")
+                    self.logger.info(f"Successfully uploaded image: {filename} -> ID: {media_data['id']}, "
+                                     f"URL: {media_data['source_url']}")
+                    # The inventory's next refresh only fetches media modified after this upload
+                    return {'id': media_data['id'], 'url': media_data['source_url'],
+                            'modified_gmt': media_data.get('modified_gmt')}
+                reason = f"HTTP {response.status_code}"
+
+            delay = self.http.retry_delay(attempt, response)
+            self.logger.warning(f"Upload of {filename} failed ({reason}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def find_media(self, tag):
+        """Find an attachment whose file name contains `tag`, or None.
+
+        With an inventory loaded, only the media changed since it was last
+        refreshed is fetched; otherwise the media library is searched.
+        """
+        try:
+            if self.inventory:
+                self.inventory.refresh('media')
+                site_media = self.inventory.find_media(tag)
+                return {'id': site_media['id'], 'url': site_media['url']} if site_media else None
+
+            response = self.http.get(
+                f"{self.base_url}/media",
+                auth=self.auth,
+                params={'search': tag, 'per_page': 20, '_fields': 'id,source_url'}
+            )
+            response.raise_for_status()
+            for media_data in response.json():
+                file_name = os.path.basename(urlparse(media_data.get('source_url', '')).path)
+                if tag in file_name:
+                    return {'id': media_data['id'], 'url': media_data['source_url']}
+        except Exception as e:
+            self.logger.warning(f"Could not search media library for {tag}: {str(e)}")
+        return None
+
+    def _upload_slot(self):
+        """Get the semaphore limiting concurrent uploads to this site"""
+        with _upload_slots_lock:
+            if self.wordpress_url not in _upload_slots:
+                _upload_slots[self.wordpress_url] = threading.BoundedSemaphore(WORDPRESS_UPLOAD_CONCURRENCY)
+            return _upload_slots[self.wordpress_url]
+
+    def _upload_limited(self, image):
+        with self._upload_slot():
+            return self.upload_media(image)
+
+    def upload_media_all(self, images):
+        """Upload images concurrently, at most WORDPRESS_UPLOAD_CONCURRENCY at a time per site.
+
+        Returns the media for each image in the same order as `images`, with
+        None for images that failed to upload, so one failure doesn't lose
+        the others.
+        """
+        images = list(images)
+        if not images:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(WORDPRESS_UPLOAD_CONCURRENCY, len(images))) as executor:
+            futures = [submit_with_context(executor, self._upload_limited, image) for image in images]
+
+        results = []
+        for image, future in zip(images, futures):
+            try:
+                results.append(future.result())
+            except Exception:
+                # upload_media has already logged the error
+                results.append(None)
+        failed = results.count(None)
+        if failed:
+            self.logger.warning(f"{failed} of {len(images)} images failed to upload")
+        return results
+
+    def create_post(self, title, content, featured_media=None, status='publish', categories=None, tags=None):
+        """Create a new blog post with optional featured image, categories and tags"""
         try:
             post_data = {
                 'title': title,
@@ -92,24 +291,29 @@ class WordPressIntegration:
                 # featured_media should be the media ID
                 post_data['featured_media'] = int(featured_media)
 
-            response = requests.post(
+            post_data.update(self.post_terms(categories, tags))
+
+            response = self.http.post(
                 f"{self.base_url}/posts",
                 auth=self.auth,
                 json=post_data
             )
             response.raise_for_status()
-            post_id = response.json()['id']
+            post = response.json()
+            post_id = post['id']
+            if self.inventory:
+                self.inventory.add_post(post)
             self.logger.info(f"Successfully created post with ID: {post_id}")
             return post_id
         except Exception as e:
             self.logger.error(f"Error creating post: {str(e)}")
             raise
 
-    def publish_post(self, title, content, featured_image_path=None):
-        """Publish a blog post with optional featured image"""
+    def publish_post(self, title, content, featured_image_path=None, featured_media_id=None, categories=None,
+                     tags=None):
+        """Publish a blog post with optional featured image, given as an image or an uploaded media ID"""
         try:
-            featured_media_id = None
-            if featured_image_path:
+            if featured_image_path and not featured_media_id:
                 media_data = self.upload_media(featured_image_path)
                 featured_media_id = media_data['id']
 
@@ -117,7 +321,9 @@ class WordPressIntegration:
             post_id = self.create_post(
                 title=title,
                 content=content,
-                featured_media=featured_media_id
+                featured_media=featured_media_id,
+                categories=categories,
+                tags=tags
             )
 
             self.logger.info(f"Successfully published post with ID: {post_id}")
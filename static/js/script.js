@@ -33,18 +33,32 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    // Function to format log messages with colors
-    function formatLogMessage(message) {
-        if (message.includes('ERROR') || message.includes('Error')) {
-            return `<span class="error">${message}</span>`;
-        } else if (message.includes('WARNING') || message.includes('Warning')) {
-            return `<span class="warning">${message}</span>`;
-        } else if (message.includes('SUCCESS') || message.includes('Successfully')) {
-            return `<span class="success">${message}</span>`;
-        } else if (message.includes('INFO') || message.includes('Starting')) {
-            return `<span class="info">${message}</span>`;
+    // Function to add a line to the terminal, coloured by its class
+    function appendLog(text, className) {
+        const line = document.createElement('span');
+        if (className) {
+            line.className = className;
         }
-        return message;
+        line.textContent = text;
+        logsContainer.appendChild(line);
+        scrollToBottom();
+    }
+
+    // Colour class for a log event's level
+    function levelClass(level) {
+        if (level === 'ERROR' || level === 'CRITICAL') {
+            return 'error';
+        } else if (level === 'WARNING') {
+            return 'warning';
+        }
+        return 'info';
+    }
+
+    // Function to format a structured log event as a terminal line
+    function formatLogEvent(event) {
+        const time = new Date(event.time * 1000).toLocaleTimeString();
+        const post = event.post ? ` [${event.post}${event.stage ? ' / ' + event.stage : ''}]` : '';
+        return `${time} - ${event.level}${post} - ${event.message}\n`;
     }
 
     // Toggle password visibility
@@ -63,7 +77,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Clear logs button
     if (clearLogsBtn) {
         clearLogsBtn.addEventListener('click', function() {
-            logsContainer.innerHTML = 'Logs cleared. Ready for new process.\n';
+            logsContainer.textContent = 'Logs cleared. Ready for new process.\n';
             updateStatus('', 'Ready');
         });
     }
@@ -119,7 +133,7 @@ document.addEventListener('DOMContentLoaded', function() {
         updateStatus('processing', 'Processing...');
 
         // Clear previous logs
-        logsContainer.innerHTML = '';
+        logsContainer.textContent = '';
 
         // Get form data
         const formData = new FormData(form);
@@ -133,11 +147,10 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(data => {
             if (data.status === 'success') {
                 // Add initial message
-                logsContainer.innerHTML += formatLogMessage('Starting blog automation process...\n\n');
-                scrollToBottom();
+                appendLog('Starting blog automation process...\n\n', 'info');
 
-                // Start listening for log events
-                startLogStream();
+                // Start listening for the job's log events
+                startLogStream(data.job_id);
             } else {
                 // Show error
                 updateStatus('error', 'Error');
@@ -154,71 +167,54 @@ document.addEventListener('DOMContentLoaded', function() {
                     errorMessage = `🤖 ${errorMessage}\n\nPlease check that:\n- Ollama is installed and running\n- The Gemma model is installed\n- You can run: ollama run gemma3:latest`;
                 }
 
-                logsContainer.innerHTML += formatLogMessage(`Error: ${errorMessage}\n`);
-                scrollToBottom();
+                appendLog(`Error: ${errorMessage}\n`, 'error');
             }
         })
         .catch(error => {
             updateStatus('error', 'Error');
-            logsContainer.innerHTML += formatLogMessage(`Error: ${error.message}\n`);
-            scrollToBottom();
+            appendLog(`Error: ${error.message}\n`, 'error');
         });
     });
 
-    // Function to start listening for log events
-    function startLogStream() {
-        // Add initial connection message
-        logsContainer.innerHTML += formatLogMessage('Connecting to log stream...\n');
-        scrollToBottom();
+    // Function to start listening for a job's log events
+    function startLogStream(jobId) {
+        appendLog('Connecting to log stream...\n', 'info');
 
-        // Create event source with retry mechanism
+        // Create event source with retry mechanism; a reconnect resumes
+        // after the last event received, so nothing is shown twice
         let retryCount = 0;
         const maxRetries = 3;
+        let lastEventId = 0;
         let eventSource;
 
         function connectEventSource() {
-            eventSource = new EventSource('/logs');
+            eventSource = new EventSource(`/logs?job=${encodeURIComponent(jobId)}&after=${lastEventId}`);
 
             eventSource.onopen = function() {
                 retryCount = 0;
-                logsContainer.innerHTML += formatLogMessage('Connected to log stream. Waiting for process to start...\n');
-                scrollToBottom();
+                appendLog('Connected to log stream. Waiting for process to start...\n', 'info');
             };
 
-            eventSource.onmessage = function(event) {
-                // Skip heartbeat messages
-                if (event.data === 'heartbeat') return;
+            eventSource.onmessage = function(message) {
+                const event = JSON.parse(message.data);
+                lastEventId = event.id;
 
-                // Add log message to terminal
-                logsContainer.innerHTML += formatLogMessage(event.data) + '\n';
-                scrollToBottom();
-
-                // Update status based on log content
-                if (event.data.includes('ERROR') || event.data.includes('Error')) {
-                    updateStatus('error', 'Error');
-                }
-
-                // Check if process is complete
-                if (event.data.includes('Blog publishing process completed')) {
-                    // Close the event source
-                    eventSource.close();
-
-                    // Update status
-                    updateStatus('', 'Completed');
-
-                    // Add completion message
-                    logsContainer.innerHTML += formatLogMessage('\nProcess finished successfully. You can generate more articles.\n');
-                    scrollToBottom();
-                } else if (event.data.includes('Fatal error in blog automation process')) {
-                    // Close the event source
+                // The job's final event carries its outcome
+                if (event.stage === 'end') {
                     eventSource.close();
+                    if (event.status === 'completed') {
+                        updateStatus('', 'Completed');
+                        appendLog('\nProcess finished successfully. You can generate more articles.\n', 'success');
+                    } else {
+                        updateStatus('error', 'Failed');
+                        appendLog('\nProcess failed. Please check the logs for errors.\n', 'error');
+                    }
+                    return;
+                }
 
-                    // Update status
-                    updateStatus('error', 'Failed');
-
-                    // Add completion message
-                    logsContainer.innerHTML += formatLogMessage('\nProcess failed. Please check the logs for errors.\n');
-                    scrollToBottom();
+                appendLog(formatLogEvent(event), levelClass(event.level));
+                if (event.level === 'ERROR' || event.level === 'CRITICAL') {
+                    updateStatus('error', 'Error');
                 }
             };
 
@@ -229,17 +225,15 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Try to reconnect if we haven't exceeded max retries
                 if (retryCount < maxRetries) {
                     retryCount++;
-                    logsContainer.innerHTML += formatLogMessage(`\nLog stream disconnected. Attempting to reconnect (${retryCount}/${maxRetries})...\n`);
-                    scrollToBottom();
+                    appendLog(`\nLog stream disconnected. Attempting to reconnect (${retryCount}/${maxRetries})...\n`, 'warning');
 
                     // Wait before reconnecting
                     setTimeout(connectEventSource, 2000);
                 } else {
                     // Give up after max retries
                     updateStatus('error', 'Disconnected');
-                    logsContainer.innerHTML += formatLogMessage('\nCould not maintain connection to log stream. The process may still be running in the background.\n');
-                    logsContainer.innerHTML += formatLogMessage('You can refresh the page to try reconnecting.\n');
-                    scrollToBottom();
+                    appendLog('\nCould not maintain connection to log stream. The process may still be running in the background.\n', 'error');
+                    appendLog('You can refresh the page to try reconnecting.\n', 'error');
                 }
             };
         }
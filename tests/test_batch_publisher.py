@@ -0,0 +1,105 @@
+from modules.batch_publisher import BatchPublisher
+
+SITE = 'https://blog.example'
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ValueError(f"HTTP {self.status_code}")
+
+class FakeHttp:
+    """Answers a WordPress site's index, batch and single REST requests"""
+
+    def __init__(self, batch=True, batch_status=207, item_statuses=None):
+        self.batch = batch
+        self.batch_status = batch_status
+        self.item_statuses = item_statuses or {}
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(('GET', url))
+        routes = {'/batch/v1': {'endpoints': [{'args': {'requests': {'maxItems': 2}}}]}} if self.batch else {}
+        return FakeResponse(200, {'routes': routes})
+
+    def post(self, url, json=None, **kwargs):
+        self.calls.append(('POST', url))
+        if self.batch_status != 207:
+            return FakeResponse(self.batch_status, {'code': 'rest_invalid_param'})
+        responses = []
+        for request in json['requests']:
+            title = request['body']['title']
+            status = self.item_statuses.get(title, 201)
+            if status < 400:
+                responses.append({'status': status, 'body': {'id': len(self.calls), 'title': title}})
+            else:
+                responses.append({'status': status, 'body': {'code': 'rest_error', 'message': f"{title} refused"}})
+        return FakeResponse(207, {'responses': responses})
+
+    def request(self, method, url, json=None, **kwargs):
+        self.calls.append((method, url))
+        return FakeResponse(201, {'id': len(self.calls), 'title': json['title']})
+
+class FakeWordPress:
+    wordpress_url = SITE
+    auth = None
+    inventory = None
+
+    def __init__(self, http):
+        self.http = http
+
+def publisher(http, batch_size=10):
+    return BatchPublisher(FakeWordPress(http), batch_size)
+
+def test_batches_up_to_the_site_limit():
+    http = FakeHttp()
+    posts = publisher(http)
+    for title in ('a', 'b', 'c'):
+        posts.add_post(title, '<p>text</p>', context=title)
+    results = posts.flush()
+    assert [context for context, _, error in results if not error] == ['a', 'b', 'c']
+    # The site accepts two items per batch
+    assert http.calls.count(('POST', f"{SITE}/wp-json/batch/v1")) == 2
+    assert not posts.pending
+
+def test_reports_errors_per_item():
+    http = FakeHttp(item_statuses={'b': 400})
+    posts = publisher(http)
+    posts.add_post('a', '', context='a')
+    posts.add_post('b', '', context='b')
+    (_, first, first_error), (_, second, second_error) = posts.flush()
+    assert first['title'] == 'a' and first_error is None
+    assert second is None and second_error == 'b refused'
+
+def test_refused_batch_falls_back_to_single_calls():
+    http = FakeHttp(batch_status=400)
+    posts = publisher(http)
+    posts.add_post('a', '', context='a')
+    posts.add_post('b', '', context='b')
+    results = posts.flush()
+    assert [(context, body['title'], error) for context, body, error in results] == [('a', 'a', None), ('b', 'b', None)]
+    assert http.calls.count(('POST', f"{SITE}/wp-json/wp/v2/posts")) == 2
+
+def test_failed_batch_is_not_resent():
+    http = FakeHttp(batch_status=502)
+    posts = publisher(http)
+    posts.add_post('a', '', context='a')
+    assert [error for _, _, error in posts.flush()] == ['HTTP 502']
+    assert ('POST', f"{SITE}/wp-json/wp/v2/posts") not in http.calls
+
+def test_sites_without_batching_get_single_calls():
+    http = FakeHttp(batch=False)
+    posts = publisher(http)
+    posts.add_post('a', '', context='a')
+    posts.add_post('b', '', context='b')
+    assert [error for _, _, error in posts.flush()] == [None, None]
+    # Batch support is checked once
+    posts.add_post('c', '', context='c')
+    posts.flush()
+    assert http.calls.count(('GET', f"{SITE}/wp-json/")) == 1
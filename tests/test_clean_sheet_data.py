@@ -0,0 +1,24 @@
+from modules.sheet_rows import clean_sheet_data
+
+ROW = {
+    'title': ' How to Brew Coffee ',
+    'topic name': 'Coffee',
+    'keywords': '"brewing, beans"',
+    'context': 'For beginners',
+    'status': '',
+    'must have elements': 'table',
+    'images': 'a.jpg, b.jpg'
+}
+
+def test_clean_sheet_data_row():
+    post_data = clean_sheet_data(ROW)
+    assert post_data['title'] == 'How to Brew Coffee'
+    assert post_data['keywords'] == 'brewing, beans'
+    assert post_data['images'] == ['a.jpg', 'b.jpg']
+    assert post_data['categories'] == ['Coffee']
+    assert post_data['tags'] == ['brewing', 'beans']
+
+def test_clean_sheet_data_term_columns():
+    post_data = clean_sheet_data(dict(ROW, categories='Drinks; Coffee', tags='espresso'))
+    assert post_data['categories'] == ['Drinks', 'Coffee']
+    assert post_data['tags'] == ['espresso']
@@ -0,0 +1,75 @@
+import json
+import pytest
+from modules.file_source import LocalFileSource, parse_row_range
+from modules.sheet_state import SheetState
+
+ROWS = [{'title': f"Post {number}", 'keywords': 'coffee'} for number in range(5)]
+
+@pytest.fixture
+def state(tmp_path):
+    return SheetState(path=str(tmp_path / 'state.json'))
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    path.write_text(''.join(json.dumps(row) + '\n' for row in ROWS), encoding='utf-8')
+    return str(path)
+
+def run(source, failed_titles=()):
+    """Process every row read, as a run would, returning their titles"""
+    titles = []
+    for post in source.stream_blog_data():
+        titles.append(post['title'])
+        if post['title'] not in failed_titles:
+            source.mark_processed(post)
+    source.save_state(failed_titles=failed_titles)
+    return titles
+
+def test_parse_row_range():
+    assert parse_row_range(None) == (0, None)
+    assert parse_row_range('1000:2000') == (1000, 2000)
+    assert parse_row_range('1000:') == (1000, None)
+    assert parse_row_range(':500') == (0, 500)
+    assert parse_row_range('5:5') == (5, 5)
+    for value in ('1000', 'a:b', '1.5:2'):
+        with pytest.raises(ValueError, match='expected START:STOP'):
+            parse_row_range(value)
+    with pytest.raises(ValueError, match="can't be negative"):
+        parse_row_range('-5:10')
+    for value in ('2000:1000', '10:-1'):
+        with pytest.raises(ValueError, match='comes before the start'):
+            parse_row_range(value)
+
+def test_reads_rows_in_range(jsonl_file, state):
+    assert run(LocalFileSource(jsonl_file, start=1, stop=3, state=state)) == ['Post 1', 'Post 2']
+
+def test_reads_csv_and_tsv(tmp_path, state):
+    csv_path = tmp_path / 'rows.csv'
+    csv_path.write_text('\ufefftitle,keywords\n"Coffee, Brewed","beans, water"\n', encoding='utf-8')
+    tsv_path = tmp_path / 'rows.tsv'
+    tsv_path.write_text('title\tkeywords\nTea\tleaves\n', encoding='utf-8')
+    assert list(LocalFileSource(str(csv_path), state=state).stream_blog_data()) == [
+        {'title': 'Coffee, Brewed', 'keywords': 'beans, water'}]
+    assert list(LocalFileSource(str(tsv_path), state=state).stream_blog_data()) == [
+        {'title': 'Tea', 'keywords': 'leaves'}]
+
+def test_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        LocalFileSource(str(tmp_path / 'rows.xlsx'))
+
+def test_unchanged_file_is_skipped(jsonl_file, state):
+    assert len(run(LocalFileSource(jsonl_file, state=state))) == 5
+    assert run(LocalFileSource(jsonl_file, state=state)) == []
+
+def test_slice_does_not_record_file_version(jsonl_file, state):
+    source = LocalFileSource(jsonl_file, stop=2, state=state)
+    run(source)
+    assert state.validators(source.state_key) == (None, None)
+    # The processed rows are skipped, but the rest of the file is still read
+    assert run(LocalFileSource(jsonl_file, state=state)) == ['Post 2', 'Post 3', 'Post 4']
+
+def test_failed_rows_are_read_again(jsonl_file, state):
+    source = LocalFileSource(jsonl_file, state=state)
+    run(source, failed_titles=['Post 3'])
+    assert state.validators(source.state_key) == (None, None)
+    assert run(LocalFileSource(jsonl_file, state=state)) == ['Post 3']
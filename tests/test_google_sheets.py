@@ -0,0 +1,96 @@
+import io
+from modules.google_sheets import GoogleSheetsManager, read_csv_rows
+from modules.sheet_state import SheetState
+
+CSV = (
+    'Title , Keywords,Context\r\n'
+    '"Brewing, Explained","beans, water","First line\r\nSecond line"\r\n'
+    ',,\r\n'
+    'Short row\r\n'
+)
+
+class FakeResponse:
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.data), self.chunk_size):
+            yield self.data[start:start + self.chunk_size]
+
+def test_read_csv_rows():
+    rows = list(read_csv_rows(io.StringIO(CSV, newline='')))
+    assert rows == [
+        {'Title': 'Brewing, Explained', 'Keywords': 'beans, water', 'Context': 'First line\r\nSecond line'},
+        {'Title': 'Short row', 'Keywords': '', 'Context': ''}
+    ]
+
+def test_read_csv_rows_tsv():
+    rows = list(read_csv_rows(['title\tkeywords\n', 'Coffee\tbeans, water\n'], delimiter='\t'))
+    assert rows == [{'title': 'Coffee', 'keywords': 'beans, water'}]
+
+def test_streamed_export_is_parsed_across_chunks(tmp_path):
+    sheets = GoogleSheetsManager('sheet', state=SheetState(path=str(tmp_path / 'state.json')))
+    # The BOM and a multi-byte character are split across chunks
+    data = ('\ufeff' + CSV.replace('Explained', 'Expliqué')).encode('utf-8')
+    rows = list(read_csv_rows(sheets._iter_lines(FakeResponse(data, chunk_size=2))))
+    assert list(rows[0]) == ['Title', 'Keywords', 'Context']
+    assert rows[0]['Title'] == 'Brewing, Expliqué'
+    assert rows[0]['Context'] == 'First line\r\nSecond line'
+    assert len(rows) == 2
+
+class FakeExport:
+    """The sheet's CSV export, answering 304 when the request's ETag still matches"""
+
+    def __init__(self, csv, etag):
+        self.csv = csv
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, stream=False, headers=None):
+        self.requests.append(dict(headers or {}))
+        if (headers or {}).get('If-None-Match') == self.etag:
+            return ExportResponse(304, b'', {})
+        return ExportResponse(200, self.csv.encode('utf-8'), {'ETag': self.etag})
+
+class ExportResponse(FakeResponse):
+    def __init__(self, status_code, data, headers):
+        super().__init__(data, chunk_size=64)
+        self.status_code = status_code
+        self.headers = headers
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+def run(sheets):
+    titles = []
+    for post in sheets.stream_blog_data():
+        titles.append(post['title'])
+        sheets.mark_processed(post)
+    sheets.save_state()
+    return titles
+
+def sheet(tmp_path, export):
+    sheets = GoogleSheetsManager('sheet', changed_only=True, state=SheetState(path=str(tmp_path / 'state.json')))
+    sheets.http = export
+    return sheets
+
+def test_unchanged_export_is_not_downloaded(tmp_path):
+    export = FakeExport('title,keywords\nCoffee,beans\nTea,leaves\n', '"v1"')
+    assert run(sheet(tmp_path, export)) == ['Coffee', 'Tea']
+    saved = (tmp_path / 'state.json').read_text(encoding='utf-8')
+    # The next run asks for the export only if it changed, and reads nothing
+    sheets = sheet(tmp_path, export)
+    assert run(sheets) == []
+    assert export.requests[-1]['If-None-Match'] == '"v1"'
+    assert (tmp_path / 'state.json').read_text(encoding='utf-8') == saved
+
+def test_edited_rows_are_read_again(tmp_path):
+    run(sheet(tmp_path, FakeExport('title,keywords\nCoffee,beans\nTea,leaves\n', '"v1"')))
+    sheets = sheet(tmp_path, FakeExport('title,keywords\nCoffee,roasted beans\nTea,leaves\nCocoa,nibs\n', '"v2"'))
+    rows = list(sheets.stream_blog_data())
+    assert [row['title'] for row in rows] == ['Coffee', 'Cocoa']
+    assert sheets.is_edited(rows[0]) and not sheets.is_edited(rows[1])
@@ -0,0 +1,75 @@
+import time
+import pytest
+import requests
+from modules.http_client import HttpClient
+
+URL = 'https://example.com/image.jpg'
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+def fake_session(client, outcomes):
+    """Make the host's session return or raise each outcome in turn, recording the calls"""
+    calls = []
+    _, session = client.session(URL)
+
+    def request(method, url, **kwargs):
+        calls.append(method)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    session.request = request
+    return calls
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    return delays
+
+def test_retries_503_after_retry_after(sleeps):
+    client = HttpClient(retries=3, retry_statuses=[503])
+    calls = fake_session(client, [FakeResponse(503, {'Retry-After': '7'}), FakeResponse(200)])
+    assert client.get(URL).status_code == 200
+    assert calls == ['GET', 'GET']
+    assert sleeps == [7]
+    assert client.stats()['https://example.com']['retries'] == 1
+
+def test_returns_last_response_once_retries_run_out(sleeps):
+    client = HttpClient(retries=2, backoff=0.5, retry_statuses=[503])
+    fake_session(client, [FakeResponse(503)] * 3)
+    assert client.get(URL).status_code == 503
+    assert len(sleeps) == 2
+    assert sleeps[0] <= 0.5 and sleeps[1] <= 1.0
+
+def test_retries_connection_errors(sleeps):
+    client = HttpClient(retries=1)
+    fake_session(client, [requests.ConnectionError('reset'), FakeResponse(200)])
+    assert client.get(URL).status_code == 200
+    fake_session(client, [requests.Timeout('slow'), requests.Timeout('slow')])
+    with pytest.raises(requests.Timeout):
+        client.get(URL)
+
+def test_does_not_retry_posts_unless_asked(sleeps):
+    client = HttpClient(retries=3, retry_statuses=[503])
+    calls = fake_session(client, [FakeResponse(503)])
+    assert client.post(URL).status_code == 503
+    assert calls == ['POST']
+    calls = fake_session(client, [FakeResponse(503), FakeResponse(201)])
+    assert client.post(URL, retry=True).status_code == 201
+    assert calls == ['POST', 'POST']
+
+def test_keeps_sessions_for_recent_hosts():
+    client = HttpClient(max_hosts=2)
+    _, first = client.session('https://a.example/x')
+    client.session('https://b.example/x')
+    assert client.session('https://A.example/y')[1] is first
+    client.session('https://c.example/x')
+    assert list(client.stats()) == ['https://a.example', 'https://c.example']
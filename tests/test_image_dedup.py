@@ -0,0 +1,54 @@
+import numpy as np
+from PIL import Image
+from modules.image_dedup import ImageDeduplicator, dhash, hamming_distances, get_image_deduplicator
+
+def picture(seed, size=(320, 240)):
+    """A random picture, smooth enough that resized copies keep its gradients"""
+    pixels = np.random.default_rng(seed).integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(pixels).resize(size, Image.BILINEAR)
+
+def save(image, path):
+    image.save(path)
+    return str(path)
+
+def test_dhash_of_resized_copy_is_close():
+    image_hash = dhash(None, thumbnail=picture(1))
+    resized_hash = dhash(None, thumbnail=picture(1, (960, 720)))
+    other_hash = dhash(None, thumbnail=picture(2))
+    assert hamming_distances(image_hash, [resized_hash])[0] <= 10
+    assert hamming_distances(image_hash, [other_hash])[0] > 10
+
+def test_hamming_distances():
+    assert list(hamming_distances(0b1011, [0b1011, 0b0011, 0b0100, 2 ** 64 - 1])) == [0, 1, 4, 61]
+    assert len(hamming_distances(0, [])) == 0
+
+def test_filter_unique_keeps_largest_copy(tmp_path):
+    small = save(picture(1), tmp_path / 'small.png')
+    other = save(picture(2), tmp_path / 'other.png')
+    large = save(picture(1, (960, 720)), tmp_path / 'large.png')
+    deduplicator = ImageDeduplicator(use_site_history=False)
+    # The largest copy takes the place of the first one
+    assert deduplicator.filter_unique([small, other, large]) == [large, other]
+
+def test_filter_unique_uses_thumbnails_and_hashes():
+    deduplicator = ImageDeduplicator(use_site_history=False)
+    thumbnails = {'a': ((320, 240), picture(1)), 'b': ((960, 720), picture(1)), 'c': ((320, 240), picture(2))}
+    hashes = {'c': dhash(None, thumbnail=picture(2))}
+    # Never opened, since each image has a thumbnail
+    assert deduplicator.filter_unique(['a', 'b', 'c'], thumbnails=thumbnails, hashes=hashes) == ['b', 'c']
+
+def test_runs_share_one_deduplicator_per_history_file(tmp_path):
+    history_path = str(tmp_path / 'history.json')
+    assert get_image_deduplicator(history_path) is get_image_deduplicator(history_path)
+    assert get_image_deduplicator(history_path) is not get_image_deduplicator(str(tmp_path / 'other.json'))
+
+def test_drops_images_recently_published_on_the_site(tmp_path):
+    deduplicator = ImageDeduplicator(use_site_history=True, history_path=str(tmp_path / 'history.json'))
+    published = save(picture(1), tmp_path / 'published.png')
+    deduplicator.remember([published], 'https://blog.example')
+    candidates = [save(picture(1, (960, 720)), tmp_path / 'copy.png'), save(picture(2), tmp_path / 'new.png')]
+    assert deduplicator.filter_unique(candidates, site='https://blog.example') == candidates[1:]
+    assert deduplicator.filter_unique(candidates, site='https://other.example') == candidates
+    # The history is saved for later runs
+    assert ImageDeduplicator(use_site_history=True, history_path=str(tmp_path / 'history.json')).history == \
+        deduplicator.history
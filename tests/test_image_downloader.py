@@ -0,0 +1,84 @@
+import time
+import threading
+from urllib.parse import urlparse
+from modules.image_downloader import ImageDownloader
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+        self.headers = {'Content-Type': 'image/jpeg'}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        yield self.body
+
+    def close(self):
+        pass
+
+class FakeImageHosts:
+    """Serves each URL after `delays[url]` seconds, tracking concurrent downloads per host"""
+
+    def __init__(self, delays=None, default_delay=0):
+        self.delays = delays or {}
+        self.default_delay = default_delay
+        self.active = {}
+        self.most_active = {}
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        host = urlparse(url).netloc
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.most_active[host] = max(self.most_active.get(host, 0), self.active[host])
+        time.sleep(self.delays.get(url, self.default_delay))
+        with self.lock:
+            self.active[host] -= 1
+        return FakeResponse(url.encode())
+
+def downloader(http, **options):
+    image_downloader = ImageDownloader(timeout=5, **options)
+    image_downloader.http = http
+    return image_downloader
+
+def test_yields_downloads_in_the_order_they_finish():
+    urls = ['https://a.example/slow.jpg', 'https://b.example/fast.jpg', 'https://c.example/medium.jpg']
+    http = FakeImageHosts({urls[0]: 0.3, urls[1]: 0.0, urls[2]: 0.1})
+    results = list(downloader(http, max_workers=3).download_all(urls))
+    assert [result['index'] for result in results] == [1, 2, 0]
+    assert results[0]['content'] == urls[1].encode()
+
+def test_limits_concurrent_downloads_per_host():
+    urls = [f"https://a.example/{number}.jpg" for number in range(6)] + ['https://b.example/0.jpg']
+    http = FakeImageHosts(default_delay=0.05)
+    results = list(downloader(http, max_workers=6, per_host=2).download_all(urls))
+    assert len(results) == 7
+    assert http.most_active['a.example'] == 2
+
+def test_stopping_early_closes_the_url_source():
+    state = {'closed': False, 'produced': 0}
+
+    def search():
+        try:
+            while True:
+                state['produced'] += 1
+                yield f"https://a.example/{state['produced']}.jpg"
+                time.sleep(0.01)
+        finally:
+            state['closed'] = True
+
+    results = list(downloader(FakeImageHosts()).download_all(search(), limit=2))
+    assert len(results) == 2
+    # The search was stopped and closed before download_all returned
+    assert state['closed']
+    produced = state['produced']
+    time.sleep(0.05)
+    assert state['produced'] == produced
+
+def test_forgets_idle_hosts_beyond_the_limit():
+    image_downloader = downloader(FakeImageHosts(), max_hosts=2)
+    urls = [f"https://host{number}.example/image.jpg" for number in range(5)]
+    for url in urls:
+        image_downloader.download(url)
+    assert list(image_downloader._host_slots) == ['host3.example', 'host4.example']
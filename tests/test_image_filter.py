@@ -0,0 +1,66 @@
+import io
+import pytest
+from PIL import Image
+from modules.image_filter import ImageFilter, ImageRejected, probe_image_header
+
+def encode(size=(640, 480), **options):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, **options)
+    return buffer.getvalue()
+
+EXIF = b'Exif\x00\x00II*\x00\x08\x00\x00\x00\x00\x00'
+
+@pytest.mark.parametrize('options, image_format, chunk', [
+    ({'format': 'JPEG'}, 'JPEG', None),
+    ({'format': 'JPEG', 'progressive': True}, 'JPEG', None),
+    ({'format': 'PNG'}, 'PNG', None),
+    ({'format': 'GIF'}, 'GIF', None),
+    ({'format': 'WEBP'}, 'WEBP', b'VP8 '),
+    ({'format': 'WEBP', 'lossless': True}, 'WEBP', b'VP8L'),
+    ({'format': 'WEBP', 'exif': EXIF}, 'WEBP', b'VP8X')
+])
+def test_probe_image_header(options, image_format, chunk):
+    data = encode(**options)
+    if chunk:
+        assert data[12:16] == chunk
+    info = probe_image_header(data)
+    assert info['format'] == image_format
+    assert info['size'] == (640, 480)
+
+def test_probe_image_header_exif():
+    assert probe_image_header(encode(format='JPEG', exif=EXIF))['exif']
+    assert not probe_image_header(encode(format='JPEG'))['exif']
+    assert probe_image_header(encode(format='WEBP', exif=EXIF))['exif']
+
+def test_probe_image_header_needs_more_data():
+    data = encode(format='PNG')
+    assert probe_image_header(data[:8]) is None
+    assert probe_image_header(data[:20]) is None
+
+def test_probe_image_header_rejects_other_data():
+    with pytest.raises(ImageRejected):
+        probe_image_header(b'<!DOCTYPE html><html>')
+
+def test_image_filter_rejects_small_and_disallowed_images():
+    image_filter = ImageFilter(min_resolution=(400, 250), allowed_formats=['JPEG', 'PNG'])
+    assert image_filter.check_header(encode(format='JPEG'))['size'] == (640, 480)
+    with pytest.raises(ImageRejected, match='smaller'):
+        image_filter.check_header(encode((300, 200), format='JPEG'))
+    with pytest.raises(ImageRejected, match='not allowed'):
+        image_filter.check_header(encode(format='GIF'))
+
+def test_image_filter_rejects_from_response_headers():
+    image_filter = ImageFilter(max_bytes=1000)
+    image_filter.check_response({'Content-Type': 'image/jpeg', 'Content-Length': '1000'})
+    with pytest.raises(ImageRejected):
+        image_filter.check_response({'Content-Type': 'text/html; charset=utf-8'})
+    with pytest.raises(ImageRejected):
+        image_filter.check_response({'Content-Type': 'image/png', 'Content-Length': '1001'})
+    with pytest.raises(ImageRejected):
+        image_filter.check_size(1001)
+
+def test_image_filter_gives_up_without_header():
+    image_filter = ImageFilter(probe_bytes=16)
+    assert image_filter.check_header(b'\xff\xd8\xff\xe0\x00\x10JFIF') is None
+    with pytest.raises(ImageRejected):
+        image_filter.check_header(b'\xff\xd8' + b'\xff\xe0\x00\x10' + bytes(14) + b'\xff\xe0\x00\x10')
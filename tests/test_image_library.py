@@ -0,0 +1,51 @@
+import os
+from modules.image_library import LocalImageLibrary, get_image_library, tokenize
+
+def touch(path, content=b'image'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def library(tmp_path, **options):
+    return LocalImageLibrary(root=str(tmp_path / 'library'), index_path=str(tmp_path / 'index.json'), **options)
+
+def test_tokenize_drops_stopwords_and_splits_words():
+    assert tokenize('The Ather-450X of Bangalore') == ['ather', '450x', 'bangalore']
+    assert tokenize('electricScooter_review') == ['electric', 'scooter', 'review']
+
+def test_tokenize_folds_simple_plurals():
+    assert tokenize('scooters batteries') == ['scooter', 'batterie']
+    # Short words and double-s endings are left alone
+    assert tokenize('bus glass') == ['bus', 'glass']
+
+def test_search_matches_directories_filenames_and_sidecar_tags(tmp_path):
+    root = tmp_path / 'library'
+    touch(root / 'scooters' / 'ather-grid.jpg')
+    touch(root / 'scooters' / 'ola-red.jpg')
+    (root / 'scooters' / 'ola-red.tags').write_text('charging station', encoding='utf-8')
+    touch(root / 'cars' / 'nexon.png')
+    images = library(tmp_path, min_matches=1)
+    assert images.search('ather scooter') == [str(root / 'scooters' / 'ather-grid.jpg'),
+                                              str(root / 'scooters' / 'ola-red.jpg')]
+    assert images.search('charging stations') == [str(root / 'scooters' / 'ola-red.jpg')]
+    assert images.search('the of') == []
+
+def test_index_is_saved_and_reloaded(tmp_path):
+    root = tmp_path / 'library'
+    touch(root / 'scooters' / 'ather-grid.jpg')
+    first = library(tmp_path)
+    reloaded = library(tmp_path)
+    assert reloaded.files == first.files
+    assert reloaded.index == {'scooter': {os.path.join('scooters', 'ather-grid.jpg')},
+                              'ather': {os.path.join('scooters', 'ather-grid.jpg')},
+                              'grid': {os.path.join('scooters', 'ather-grid.jpg')}}
+    # Removed files leave the index on the next refresh
+    os.remove(root / 'scooters' / 'ather-grid.jpg')
+    reloaded.refresh()
+    assert reloaded.files == {} and reloaded.index == {}
+    assert library(tmp_path).files == {}
+
+def test_runs_share_one_library_per_directory(tmp_path):
+    root, index_path = str(tmp_path / 'library'), str(tmp_path / 'index.json')
+    assert get_image_library(root, index_path) is get_image_library(root, index_path)
+    assert get_image_library(str(tmp_path / 'other'), index_path) is not get_image_library(root, index_path)
@@ -0,0 +1,57 @@
+import io
+from PIL import Image
+from modules.image_buffer import ImageBuffer
+from modules.image_normalizer import ImageNormalizer, normalize_data
+
+def encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+def camera_jpeg(size=(2000, 1000)):
+    exif = Image.Exif()
+    exif[0x010F] = 'CameraMaker'
+    return encode(Image.new('RGB', size, 'red'), 'JPEG', comment=b'hello', exif=exif.tobytes())
+
+def test_normalize_data_resizes_and_strips_metadata():
+    for output_format, image_format in (('jpeg', 'JPEG'), ('webp', 'WEBP')):
+        data, size, thumbnail = normalize_data(camera_jpeg(), max_width=1600, output_format=output_format,
+                                               thumbnail_edge=32)
+        assert size == (1600, 800)
+        assert thumbnail.size == (32, 32)
+        assert b'hello' not in data and b'CameraMaker' not in data
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.format == image_format
+            assert image.size == (1600, 800)
+            assert not image.getexif()
+
+def test_normalize_data_applies_exif_orientation():
+    exif = Image.Exif()
+    # Rotated 90 degrees when displayed
+    exif[0x0112] = 6
+    data = encode(Image.new('RGB', (300, 200), 'red'), 'JPEG', exif=exif.tobytes())
+    assert normalize_data(data, max_width=1600, output_format='jpeg')[1] == (200, 300)
+
+def test_normalize_data_converts_modes():
+    transparent = encode(Image.new('RGBA', (100, 50), (255, 0, 0, 128)), 'PNG')
+    with Image.open(io.BytesIO(normalize_data(transparent, output_format='webp')[0])) as image:
+        assert image.mode == 'RGBA'
+    with Image.open(io.BytesIO(normalize_data(transparent, output_format='jpeg')[0])) as image:
+        assert image.mode == 'RGB'
+
+def test_normalizer_runs_in_worker_processes():
+    normalizer = ImageNormalizer(max_width=1600, output_format='webp', max_workers=1)
+    try:
+        image = ImageBuffer(camera_jpeg(), 'image/jpeg', 'photo.jpeg')
+        result, size, _ = normalizer.result(normalizer.submit(image), image)
+    finally:
+        normalizer.shutdown()
+    assert result.filename == 'photo.webp' and result.mime_type == 'image/webp'
+    assert size == (1600, 800)
+
+def test_needs_conversion():
+    normalizer = ImageNormalizer(max_width=1600, output_format='webp')
+    assert not normalizer.needs_conversion({'format': 'WEBP', 'size': (1200, 800), 'exif': False})
+    assert normalizer.needs_conversion({'format': 'WEBP', 'size': (1200, 800), 'exif': True})
+    assert normalizer.needs_conversion({'format': 'WEBP', 'size': (2000, 800), 'exif': False})
+    assert normalizer.needs_conversion({'format': 'JPEG', 'size': (1200, 800), 'exif': False})
@@ -0,0 +1,40 @@
+import numpy as np
+from PIL import Image
+from modules.image_scorer import ImageScorer
+
+EDGE = 32
+
+def thumbnail(seed=None, colour=(128, 128, 128)):
+    """A noisy, colourful thumbnail for a seed, or a flat grey one"""
+    if seed is None:
+        return Image.new('RGB', (EDGE, EDGE), colour)
+    pixels = np.random.default_rng(seed).integers(0, 256, (EDGE, EDGE, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+def scorer(**weights):
+    return ImageScorer(target_size=(1200, 675), thumbnail_size=EDGE, weights=weights)
+
+def test_rank_by_resolution_and_aspect():
+    thumbnails = {
+        'small': ((300, 169), thumbnail()),
+        'exact': ((1200, 675), thumbnail()),
+        'square': ((1200, 1200), thumbnail())
+    }
+    ranked = scorer(resolution=1.0, aspect=1.0).rank(['small', 'square', 'exact'], thumbnails=thumbnails)
+    assert ranked == ['exact', 'square', 'small']
+
+def test_rank_by_sharpness_and_colour():
+    thumbnails = {
+        'flat': ((1200, 675), thumbnail()),
+        'detailed': ((1200, 675), thumbnail(seed=1))
+    }
+    assert scorer(sharpness=1.0).rank(['flat', 'detailed'], thumbnails=thumbnails) == ['detailed', 'flat']
+    assert scorer(colourfulness=1.0).rank(['flat', 'detailed'], thumbnails=thumbnails) == ['detailed', 'flat']
+
+def test_rank_loads_images_without_thumbnails(tmp_path):
+    path = str(tmp_path / 'exact.png')
+    Image.new('RGB', (1200, 675), 'red').save(path)
+    thumbnails = {'small': ((300, 169), thumbnail(colour=(255, 0, 0)))}
+    ranked = scorer(resolution=1.0).rank(['small', path, str(tmp_path / 'missing.png')], thumbnails=thumbnails)
+    # Images that can't be read are left out
+    assert ranked == [path, 'small']
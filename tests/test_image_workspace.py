@@ -0,0 +1,67 @@
+import os
+import time
+import shutil
+from modules.image_workspace import ImageWorkspace
+
+def write(directory, name, size=100):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(bytes(size))
+    return path
+
+def test_evicts_least_recently_used_unpinned_files(tmp_path):
+    workspace = ImageWorkspace(root=str(tmp_path), max_bytes=250)
+    search_dir = workspace.create_dir(workspace.create_run(), 'coffee')
+    old, used, pinned = (write(search_dir, name) for name in ('old.jpg', 'used.jpg', 'pinned.jpg'))
+    workspace.add(old, pin=False)
+    workspace.add(used, pin=False)
+    workspace.add(pinned)
+    workspace.touch(used)
+    # Over budget: the pinned file is skipped and the least recently used goes
+    assert not os.path.exists(old)
+    assert os.path.exists(used) and os.path.exists(pinned)
+    assert workspace.total_bytes == 200
+
+    new = write(search_dir, 'new.jpg')
+    workspace.add(new)
+    assert not os.path.exists(used)
+    workspace.release([pinned, new])
+    assert workspace.total_bytes == 200
+
+def test_eviction_removes_empty_search_directories(tmp_path):
+    workspace = ImageWorkspace(root=str(tmp_path), max_bytes=150)
+    run_dir = workspace.create_run()
+    first_dir = workspace.create_dir(run_dir, 'first')
+    workspace.add(write(first_dir, 'a.jpg'), pin=False)
+    workspace.add(write(workspace.create_dir(run_dir, 'second'), 'b.jpg'), pin=False)
+    assert not os.path.exists(first_dir)
+    assert os.path.isdir(run_dir)
+
+def test_eviction_survives_directories_removed_elsewhere(tmp_path):
+    workspace = ImageWorkspace(root=str(tmp_path), max_bytes=150)
+    run_dir = workspace.create_run()
+    gone_dir = workspace.create_dir(run_dir, 'gone')
+    workspace.add(write(gone_dir, 'a.jpg'), pin=False)
+    shutil.rmtree(gone_dir)
+    kept = write(workspace.create_dir(run_dir, 'kept'), 'b.jpg')
+    workspace.add(kept, pin=False)
+    assert os.path.exists(kept) and workspace.total_bytes == 100
+
+def test_remove_run(tmp_path):
+    workspace = ImageWorkspace(root=str(tmp_path), max_bytes=1000)
+    run_dir = workspace.create_run()
+    workspace.add(write(run_dir, 'a.jpg'))
+    workspace.remove_run(run_dir)
+    assert not os.path.exists(run_dir)
+    assert workspace.total_bytes == 0 and not workspace.pinned
+
+def test_purge_stale_keeps_files_and_hidden_directories(tmp_path):
+    stale = tmp_path / 'run-old'
+    stale.mkdir()
+    (tmp_path / '.cache').mkdir()
+    (tmp_path / '.gitkeep').write_text('')
+    long_ago = time.time() - 10 * 24 * 3600
+    for path in (stale, tmp_path / '.cache', tmp_path / '.gitkeep'):
+        os.utime(path, (long_ago, long_ago))
+    ImageWorkspace(root=str(tmp_path), stale_after=3600)
+    assert sorted(os.listdir(tmp_path)) == ['.cache', '.gitkeep']
@@ -0,0 +1,108 @@
+import time
+import pytest
+from modules.job_tracker import JobProgress, JobTracker
+
+SITES = ['https://one.example', 'https://two.example']
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'time', clock)
+    return clock
+
+def run_post(job, clock, title, timings=(2, 4, 1)):
+    """Take a post through its work stages and send it to both sites"""
+    job.start_post(title)
+    for stage, seconds in zip(('images', 'content', 'publish'), timings):
+        job.enter_stage(title, stage)
+        clock.advance(seconds)
+    job.post_sent(title, SITES, {})
+
+def test_job_and_post_states(clock):
+    job = JobProgress('job', {'rows': '1-3'})
+    assert job.summary()['state'] == 'queued'
+    job.start()
+    run_post(job, clock, 'Published')
+    assert job.counts['queued'] == 1
+    for url in SITES:
+        job.record_result(url, 'Published', 7, None)
+    job.start_post('Skipped')
+    job.skip_post('Skipped', 'Already on every site')
+    job.start_post('Unfinished')
+    job.finish('completed')
+    summary = job.summary()
+    assert summary['state'] == 'completed' and summary['posts'] == 3
+    # Posts the job left unfinished count as failed
+    assert summary['counts'] == {'running': 0, 'queued': 0, 'published': 1, 'failed': 1, 'skipped': 1}
+    assert job.posts['Unfinished']['error'] == "The job ended before the post was published"
+    assert job.posts['Published']['sites'] == {url: {'post_id': 7, 'error': None} for url in SITES}
+
+def test_per_site_outcomes(clock):
+    job = JobProgress()
+    job.start()
+    job.start_post('Some sites')
+    job.post_sent('Some sites', SITES, {SITES[1]: 'HTTP 500'})
+    # Still waiting in the first site's batch
+    assert job.posts['Some sites']['state'] == 'queued'
+    job.record_result(SITES[0], 'Some sites', 12, None)
+    post = job.posts['Some sites']
+    assert post['state'] == 'failed' and post['error'] == "Publishing failed on some sites"
+    assert post['sites'] == {SITES[0]: {'post_id': 12, 'error': None}, SITES[1]: {'post_id': None, 'error': 'HTTP 500'}}
+    job.start_post('No sites')
+    job.post_sent('No sites', SITES, {url: 'HTTP 401' for url in SITES})
+    assert job.posts['No sites']['error'] == "Publishing failed on every site"
+
+def test_stage_timings_and_eta(clock):
+    job = JobProgress()
+    job.start()
+    run_post(job, clock, 'First')
+    assert job.posts['First']['stage_timings'] == {'images': 2, 'content': 4, 'publish': 1}
+    job.start_post('Second')
+    job.enter_stage('Second', 'images')
+    clock.advance(0.5)
+    summary = job.summary()
+    assert summary['stage_timings']['content'] == {'posts': 1, 'total': 4, 'average': 4}
+    # What is left of the images stage, then the content and publish stages
+    assert summary['eta_seconds'] == 1.5 + 4 + 1
+    assert summary['current'] == [{'title': 'Second', 'stage': 'images'}]
+
+def test_eta_is_unknown_until_every_stage_was_timed(clock):
+    job = JobProgress()
+    job.start()
+    job.start_post('First')
+    job.enter_stage('First', 'images')
+    clock.advance(1)
+    assert job.summary()['eta_seconds'] is None
+
+def test_post_list_filters_by_state(clock):
+    job = JobProgress()
+    job.start()
+    run_post(job, clock, 'Queued')
+    job.start_post('Skipped')
+    job.skip_post('Skipped', 'Already on every site')
+    assert [post['title'] for post in job.post_list()] == ['Queued', 'Skipped']
+    skipped = job.post_list(state='skipped')
+    assert [post['title'] for post in skipped] == ['Skipped'] and skipped[0]['error'] == 'Already on every site'
+    assert job.post_list(state='published') == []
+    # Copies, not the tracker's own records
+    job.post_list()[0]['sites'].clear()
+    assert job.posts['Queued']['sites']
+
+def test_tracker_keeps_the_last_finished_jobs(clock):
+    tracker = JobTracker(history_size=2)
+    for number in range(4):
+        tracker.create_job(f"job{number}").finish('completed')
+    running = tracker.create_job('running')
+    assert list(tracker.jobs) == ['job2', 'job3', 'running']
+    assert tracker.get('running') is running
+    assert [summary['id'] for summary in tracker.list_jobs()] == ['running', 'job3', 'job2']
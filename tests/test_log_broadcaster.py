@@ -0,0 +1,82 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.log_broadcaster import (
+    LogBroadcaster,
+    JobLogHandler,
+    set_log_context,
+    get_log_context,
+    submit_with_context
+)
+
+def event(message):
+    return {'time': 0, 'level': 'INFO', 'message': message}
+
+def messages(events):
+    return [event['message'] for event in events]
+
+def test_ring_buffer_keeps_the_latest_events():
+    broadcaster = LogBroadcaster(buffer_size=3)
+    job_id = broadcaster.create_job()
+    for number in range(5):
+        broadcaster.publish(job_id, event(f"line {number}"))
+    broadcaster.finish(job_id, 'completed')
+    events = list(broadcaster.subscribe(job_id))
+    assert messages(events) == ['line 3', 'line 4', 'Job completed']
+    assert [event['id'] for event in events] == [4, 5, 6]
+    assert events[-1]['status'] == 'completed'
+
+def test_replays_events_after_last_event_id():
+    broadcaster = LogBroadcaster()
+    job_id = broadcaster.create_job()
+    for number in range(3):
+        broadcaster.publish(job_id, event(f"line {number}"))
+    broadcaster.finish(job_id, 'failed')
+    assert messages(broadcaster.subscribe(job_id, last_id=2)) == ['line 2', 'Job failed']
+
+def test_heartbeat_while_idle_and_end_after_finish():
+    broadcaster = LogBroadcaster()
+    job_id = broadcaster.create_job()
+    stream = broadcaster.subscribe(job_id, heartbeat=0.01)
+    assert next(stream) is None
+    broadcaster.publish(job_id, event('working'))
+    assert next(stream)['message'] == 'working'
+    threading.Timer(0.05, broadcaster.finish, (job_id, 'completed')).start()
+    assert [event for event in stream if event] and broadcaster.get(job_id).finished
+
+def test_unknown_job_has_no_events():
+    broadcaster = LogBroadcaster()
+    broadcaster.publish('missing', event('lost'))
+    assert list(broadcaster.subscribe('missing')) == []
+
+def test_keeps_the_last_finished_jobs():
+    broadcaster = LogBroadcaster(max_jobs=1)
+    first, second = broadcaster.create_job(), broadcaster.create_job()
+    broadcaster.finish(first, 'completed')
+    broadcaster.finish(second, 'completed')
+    running = broadcaster.create_job()
+    assert broadcaster.get(first) is None
+    assert broadcaster.get(second) and broadcaster.get(running)
+
+def test_handler_publishes_only_records_of_a_job():
+    broadcaster = LogBroadcaster()
+    job_id = broadcaster.create_job()
+    logger = logging.getLogger('test_log_broadcaster')
+    handler = JobLogHandler(broadcaster)
+    logger.addHandler(handler)
+    try:
+        set_log_context(job=None, post=None, stage=None)
+        logger.warning('GET /jobs 200')
+        set_log_context(job=job_id, post='Coffee', stage='images')
+        logger.warning('Searching')
+        # Worker threads log under the job that submitted the work
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            submit_with_context(executor, logger.warning, 'Downloading').result()
+            assert executor.submit(get_log_context).result()['job'] is None
+    finally:
+        set_log_context(job=None, post=None, stage=None)
+        logger.removeHandler(handler)
+    broadcaster.finish(job_id, 'completed')
+    events = list(broadcaster.subscribe(job_id))
+    assert messages(events) == ['Searching', 'Downloading', 'Job completed']
+    assert events[0]['post'] == 'Coffee' and events[0]['stage'] == 'images'
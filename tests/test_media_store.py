@@ -0,0 +1,68 @@
+from modules.media_store import MediaStore
+from modules.image_buffer import ImageBuffer
+from modules.site_inventory import SiteInventory
+from modules.wordpress_integration import WordPressIntegration
+
+SITE = 'https://blog.example'
+
+def store(tmp_path, **options):
+    return MediaStore(index_path=str(tmp_path / 'store.json'), **options)
+
+def test_record_and_get_media(tmp_path):
+    media = store(tmp_path)
+    media.record_media('abc', SITE, {'id': 7, 'url': f"{SITE}/a.webp", 'modified_gmt': '2026-01-01T00:00:00'})
+    assert media.get_media('abc', SITE) == {'id': 7, 'url': f"{SITE}/a.webp"}
+    assert media.get_media('abc', 'https://other.example') is None
+    assert media.get_media('def', SITE) is None
+    media.forget_media('abc', SITE)
+    assert media.get_media('abc', SITE) is None
+
+def test_index_is_saved_on_flush(tmp_path):
+    media = store(tmp_path, save_interval=3600)
+    media.record_media('abc', SITE, {'id': 7, 'url': 'a'}, path='a.webp')
+    assert not (tmp_path / 'store.json').exists()
+    media.flush()
+    assert store(tmp_path).get_media('abc', SITE) == {'id': 7, 'url': 'a'}
+
+def test_keeps_most_recently_uploaded_entries(tmp_path):
+    media = store(tmp_path, max_entries=2)
+    for image_hash in ('a', 'b', 'c'):
+        media.record_media(image_hash, SITE, {'id': 1, 'url': image_hash})
+    # Uploading an image again makes it the most recent
+    media.record_media('b', SITE, {'id': 1, 'url': 'b'})
+    media.record_media('d', SITE, {'id': 1, 'url': 'd'})
+    assert list(media.entries) == ['b', 'd']
+
+def upload_site(tmp_path, site_media):
+    """A site integration with an inventory of `site_media`, recording the images it posts"""
+    wordpress = WordPressIntegration(SITE, 'user', 'password', media_store=store(tmp_path))
+    inventory = SiteInventory(wordpress)
+    for media in site_media:
+        inventory.add_media(media)
+    wordpress.inventory = inventory
+    posted = []
+
+    def post_media(image_hash, filename, mime_type, open_stream):
+        posted.append(filename)
+        return {'id': 99, 'url': f"{SITE}/wp-content/uploads/new.webp"}
+
+    wordpress._post_media = post_media
+    return wordpress, posted
+
+def test_upload_reuses_stored_media_still_on_the_site(tmp_path):
+    image = ImageBuffer(b'image', 'image/webp', 'photo.webp')
+    wordpress, posted = upload_site(tmp_path, [{'id': 7, 'source_url': f"{SITE}/wp-content/uploads/a.webp"}])
+    image_hash = wordpress.media_store.hash_bytes(image.data)
+    wordpress.media_store.record_media(image_hash, SITE, {'id': 7, 'url': f"{SITE}/wp-content/uploads/a.webp"})
+    assert wordpress.upload_media(image)['id'] == 7
+    assert posted == []
+
+def test_upload_replaces_stored_media_deleted_from_the_site(tmp_path):
+    image = ImageBuffer(b'image', 'image/webp', 'photo.webp')
+    wordpress, posted = upload_site(tmp_path, [])
+    image_hash = wordpress.media_store.hash_bytes(image.data)
+    wordpress.media_store.record_media(image_hash, SITE, {'id': 7, 'url': f"{SITE}/wp-content/uploads/a.webp"})
+    assert wordpress.upload_media(image)['id'] == 99
+    assert posted == ['photo.webp']
+    assert wordpress.media_store.get_media(image_hash, SITE)['id'] == 99
+    assert wordpress.inventory.has_media(99)
@@ -0,0 +1,119 @@
+import time
+import pytest
+import requests
+from modules.image_buffer import ImageBuffer
+from modules.media_store import MediaStore
+from modules.wordpress_integration import WordPressIntegration, WORDPRESS_UPLOAD_RETRIES
+
+SITE = 'https://blog.example'
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+class FakeMediaSite:
+    """A WordPress media endpoint; each upload attempt plays the next outcome.
+
+    An outcome is an HTTP status, 'lost' for an upload whose attachment is
+    created but whose response never arrives, or an exception to raise
+    without creating anything.
+    """
+
+    retry_statuses = {500, 502, 503, 504}
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.media = []
+        self.uploads = 0
+        self.media_queries = []
+
+    def retry_delay(self, attempt, response=None):
+        return 0
+
+    def post(self, url, params=None, data=None, headers=None, **kwargs):
+        assert url == f"{SITE}/wp-json/wp/v2/media"
+        self.uploads += 1
+        data.read()
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == 'lost' or outcome < 300:
+            filename = headers['Content-Disposition'].split('filename="')[1].rstrip('"')
+            media = {'id': 100 + len(self.media), 'source_url': f"{SITE}/wp-content/uploads/{filename}",
+                     'modified_gmt': f"2026-10-19T10:00:0{len(self.media)}"}
+            self.media.append(media)
+            if outcome == 'lost':
+                raise requests.ConnectionError('Connection reset')
+            return FakeResponse(outcome, {field: media[field] for field in params['_fields'].split(',')})
+        return FakeResponse(outcome, {'code': 'error'})
+
+    def get(self, url, params=None, **kwargs):
+        if url == f"{SITE}/wp-json/wp/v2/posts":
+            return FakeResponse(200, [], {'X-WP-TotalPages': '1'})
+        assert url == f"{SITE}/wp-json/wp/v2/media"
+        self.media_queries.append(dict(params))
+        media = self.media
+        if params.get('search'):
+            media = [item for item in media if params['search'] in item['source_url']]
+        if params.get('modified_after'):
+            media = [item for item in media if f"{item['modified_gmt']}Z" > params['modified_after']]
+        return FakeResponse(200, media, {'X-WP-TotalPages': '1'})
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+def site(tmp_path, outcomes):
+    wordpress = WordPressIntegration(SITE, 'user', 'password',
+                                     media_store=MediaStore(index_path=str(tmp_path / 'store.json')))
+    wordpress.http = FakeMediaSite(outcomes)
+    return wordpress
+
+def image(data=b'image bytes'):
+    return ImageBuffer(data, 'image/webp', 'photo.webp')
+
+def test_lost_response_finds_the_created_attachment(tmp_path):
+    wordpress = site(tmp_path, ['lost'])
+    media = wordpress.upload_media(image())
+    assert wordpress.http.uploads == 1
+    assert media['id'] == 100 and len(wordpress.http.media) == 1
+    tag = wordpress.media_store.hash_bytes(b'image bytes')[:12]
+    assert media['url'].endswith(f"photo-{tag}.webp")
+
+def test_server_error_is_retried(tmp_path):
+    wordpress = site(tmp_path, [503, 201])
+    assert wordpress.upload_media(image())['id'] == 100
+    assert wordpress.http.uploads == 2
+
+def test_timeout_on_every_attempt_raises(tmp_path):
+    wordpress = site(tmp_path, [requests.Timeout('slow')] * (WORDPRESS_UPLOAD_RETRIES + 1))
+    with pytest.raises(requests.Timeout):
+        wordpress.upload_media(image())
+    assert wordpress.http.uploads == WORDPRESS_UPLOAD_RETRIES + 1
+
+def test_client_error_is_not_retried(tmp_path):
+    wordpress = site(tmp_path, [413])
+    with pytest.raises(requests.HTTPError):
+        wordpress.upload_media(image())
+    assert wordpress.http.uploads == 1
+
+def test_uploads_move_the_inventory_refresh_point(tmp_path):
+    wordpress = site(tmp_path, [201, 'lost'])
+    # The site has no media yet
+    wordpress.load_inventory()
+    first = wordpress.upload_media(image(b'first'))
+    assert wordpress.inventory.modified['media'] == first['modified_gmt']
+    # The second upload's response is lost; the refresh that finds it only
+    # asks for media changed since the first upload
+    second = wordpress.upload_media(image(b'second'))
+    assert second['id'] == 101
+    assert wordpress.http.media_queries[-1]['modified_after'] == f"{first['modified_gmt']}Z"
@@ -0,0 +1,147 @@
+import logging
+import requests
+from modules.image_buffer import ImageBuffer
+from modules.job_tracker import JobProgress
+from modules.media_store import MediaStore
+from modules.pipeline import FanoutPublisher, process_row
+
+SITES = ['https://one.example', 'https://two.example']
+
+class FakeSource:
+    def __init__(self, edited=False):
+        self.edited = edited
+        self.processed = []
+
+    def is_edited(self, post):
+        return self.edited
+
+    def mark_processed(self, post):
+        self.processed.append(post['title'])
+
+class PublishedEverywhere:
+    def sites_without(self, title):
+        return []
+
+def test_edits_to_published_rows_are_logged(caplog):
+    job = JobProgress()
+    source = FakeSource(edited=True)
+    with caplog.at_level(logging.INFO, logger='modules.pipeline'):
+        process_row({'title': 'Coffee', 'keywords': 'beans'}, source, None, None, PublishedEverywhere(), job=job)
+    assert source.processed == ['Coffee']
+    assert "edits to published rows are not applied" in caplog.text
+    assert job.posts['Coffee']['state'] == 'skipped'
+    assert job.posts['Coffee']['error'] == "Edited after publishing; edits are not applied"
+
+def test_unedited_published_rows_are_skipped():
+    job = JobProgress()
+    process_row({'title': 'Coffee', 'keywords': 'beans'}, FakeSource(), None, None, PublishedEverywhere(), job=job)
+    assert job.posts['Coffee']['error'] == "Already on every site"
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+class FakeSite:
+    """A WordPress site's media and batch endpoints, refusing uploads or posts when told to"""
+
+    retry_statuses = {500, 502, 503, 504}
+
+    def __init__(self, url, refuse_uploads=False, refuse_posts=False):
+        self.url = url
+        self.refuse_uploads = refuse_uploads
+        self.refuse_posts = refuse_posts
+        self.posts = []
+
+    def get(self, url, **kwargs):
+        assert url == f"{self.url}/wp-json/"
+        return FakeResponse(200, {'routes': {}})
+
+    def post(self, url, json=None, data=None, **kwargs):
+        if url == f"{self.url}/wp-json/wp/v2/media":
+            data.read()
+            if self.refuse_uploads:
+                return FakeResponse(413, {'code': 'rest_upload_file_too_big'})
+            return FakeResponse(201, {'id': 7, 'source_url': f"{self.url}/photo.webp", 'modified_gmt': None})
+        assert url == f"{self.url}/wp-json/batch/v1"
+        return FakeResponse(207, {'responses': [self._create(request['body']) for request in json['requests']]})
+
+    def request(self, method, url, json=None, **kwargs):
+        assert (method, url) == ('POST', f"{self.url}/wp-json/wp/v2/posts")
+        response = self._create(json)
+        return FakeResponse(response['status'], response['body'])
+
+    def _create(self, body):
+        if self.refuse_posts:
+            return {'status': 500, 'body': {'code': 'db_error', 'message': 'Could not insert post'}}
+        self.posts.append(body['title'])
+        return {'status': 201, 'body': {'id': len(self.posts), **body}}
+
+class FakeImageHandler:
+    def __init__(self):
+        self.recorded = {}
+
+    def search_and_download_images(self, **kwargs):
+        return [ImageBuffer(b'photo', 'image/webp', 'photo.webp')]
+
+    def rank_images(self, images):
+        return images
+
+    def published_image_records(self, images):
+        return [(0x1234, None) for _ in images]
+
+    def record_published_images(self, records, site):
+        self.recorded[site] = records
+
+class FakeLLM:
+    def generate_content(self, **kwargs):
+        return "## Brewing\n\nGrind the beans."
+
+def fanout(tmp_path, image_handler, job, **failures):
+    publisher = FanoutPublisher([{'url': url, 'username': 'user', 'password': 'secret'} for url in SITES],
+                                image_handler, on_result=job.record_result)
+    media_store = MediaStore(index_path=str(tmp_path / 'store.json'))
+    for site in publisher.sites:
+        site.wordpress.http = FakeSite(site.url, **failures.get(site.url, {}))
+        site.wordpress.media_store = media_store
+    return publisher
+
+def publish(tmp_path, **failures):
+    image_handler, source, job = FakeImageHandler(), FakeSource(), JobProgress()
+    publisher = fanout(tmp_path, image_handler, job, **failures)
+    try:
+        process_row({'title': 'Coffee', 'keywords': 'beans'}, source, FakeLLM(), image_handler, publisher, job=job)
+        publisher.flush()
+        failed_titles = publisher.failed_titles()
+    finally:
+        publisher.close()
+    return publisher, image_handler, source, job, failed_titles
+
+def test_upload_failing_on_one_site_leaves_the_others(tmp_path):
+    publisher, image_handler, source, job, _ = publish(tmp_path, **{SITES[1]: {'refuse_uploads': True}})
+    one, two = (site.wordpress.http for site in publisher.sites)
+    assert one.posts == ['Coffee'] and two.posts == []
+    assert list(image_handler.recorded) == [SITES[0]]
+    # The row is read again next run, for the site that doesn't have it
+    assert source.processed == []
+    assert job.posts['Coffee']['sites'][SITES[0]]['post_id'] == 1
+    assert "No images could be uploaded" in job.posts['Coffee']['sites'][SITES[1]]['error']
+
+def test_post_failing_on_one_site_keeps_the_row(tmp_path):
+    publisher, image_handler, source, job, failed_titles = publish(tmp_path, **{SITES[0]: {'refuse_posts': True}})
+    one, two = (site.wordpress.http for site in publisher.sites)
+    assert one.posts == [] and two.posts == ['Coffee']
+    assert list(image_handler.recorded) == [SITES[1]]
+    assert image_handler.recorded[SITES[1]] == [(0x1234, None)]
+    # The failed title makes save_state forget the row, so it is retried
+    assert failed_titles == {'Coffee'}
+    assert job.posts['Coffee']['state'] == 'failed'
+    assert job.posts['Coffee']['error'] == "Publishing failed on some sites"
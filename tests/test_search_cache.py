@@ -0,0 +1,39 @@
+import time
+from modules.search_cache import SearchCache, normalize_query
+
+def test_normalize_query():
+    assert normalize_query('Brewing Coffee') == normalize_query('coffee brewing')
+
+def test_get_and_put(tmp_path):
+    cache = SearchCache(path=str(tmp_path / 'cache.json'), ttl=60, negative_ttl=60)
+    assert cache.get('google', 'coffee', 3) is None
+    cache.put('google', 'coffee', ['a', 'b', 'c', 'd'], 4)
+    assert cache.get('google', 'Coffee', 3) == ['a', 'b', 'c']
+    assert cache.get('google', 'coffee', 5) is None
+    assert cache.get('bing', 'coffee', 3) is None
+    # A search that found fewer results than asked for found all there are
+    cache.put('google', 'tea', ['a'], 4)
+    assert cache.get('google', 'tea', 10) == ['a']
+    # Entries are read back from disk
+    assert SearchCache(path=str(tmp_path / 'cache.json')).get('google', 'coffee', 4) == ['a', 'b', 'c', 'd']
+
+def test_empty_results_expire_after_negative_ttl(tmp_path, monkeypatch):
+    cache = SearchCache(path=str(tmp_path / 'cache.json'), ttl=3600, negative_ttl=60)
+    cache.put('google', 'coffee', [], 5)
+    assert cache.get('google', 'coffee', 5) == []
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert cache.get('google', 'coffee', 5) is None
+
+def test_search_stopped_early_serves_up_to_the_images_produced(tmp_path):
+    cache = SearchCache(path=str(tmp_path / 'cache.json'), ttl=60, negative_ttl=60)
+    cache.put('google', 'coffee', ['a', 'b', 'c'], 10, num_images=2)
+    assert cache.get('google', 'coffee', 10, num_images=2) == ['a', 'b', 'c']
+    assert cache.get('google', 'coffee', 10, num_images=3) is None
+    assert cache.get('google', 'coffee', 10) is None
+
+def test_invalidate(tmp_path):
+    cache = SearchCache(path=str(tmp_path / 'cache.json'), ttl=60, negative_ttl=60)
+    cache.put('google', 'coffee', ['a'], 1)
+    cache.invalidate('google', 'coffee')
+    assert cache.get('google', 'coffee', 1) is None
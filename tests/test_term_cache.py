@@ -0,0 +1,92 @@
+import requests
+from modules.batch_publisher import BatchPublisher
+from modules.media_store import MediaStore
+from modules.wordpress_integration import WordPressIntegration
+
+SITE = 'https://blog.example'
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+class FakeTermSite:
+    """A WordPress site with batch support, its categories and tags, and the posts created on it"""
+
+    def __init__(self, terms=None, refuse_terms=False):
+        self.terms = terms or {'categories': [], 'tags': []}
+        self.refuse_terms = refuse_terms
+        self.posts = []
+        self.batches = []
+        self.next_id = 100
+
+    def get(self, url, params=None, **kwargs):
+        if url == f"{SITE}/wp-json/":
+            return FakeResponse(200, {'routes': {'/batch/v1': {'endpoints': [{'args': {'requests': {'maxItems': 25}}}]}}})
+        taxonomy = url.rsplit('/', 1)[1]
+        return FakeResponse(200, list(self.terms[taxonomy]), {'X-WP-TotalPages': '1'})
+
+    def post(self, url, json=None, **kwargs):
+        assert url == f"{SITE}/wp-json/batch/v1"
+        self.batches.append([(request['path'], request['body']) for request in json['requests']])
+        return FakeResponse(207, {'responses': [self._create(request) for request in json['requests']]})
+
+    def _create(self, request):
+        self.next_id += 1
+        taxonomy = request['path'].rsplit('/', 1)[1]
+        if taxonomy == 'posts':
+            post = dict(request['body'], id=self.next_id)
+            self.posts.append(post)
+            return {'status': 201, 'body': post}
+        if self.refuse_terms:
+            return {'status': 500, 'body': {'code': 'db_error', 'message': 'Could not insert term'}}
+        term = {'id': self.next_id, 'name': request['body']['name'], 'slug': request['body']['name'].lower()}
+        self.terms[taxonomy].append(term)
+        return {'status': 201, 'body': term}
+
+    def term_requests(self):
+        return [(path, body['name']) for batch in self.batches for path, body in batch if 'name' in body]
+
+def publisher(tmp_path, site):
+    wordpress = WordPressIntegration(SITE, 'user', 'password',
+                                     media_store=MediaStore(index_path=str(tmp_path / 'store.json')))
+    wordpress.http = site
+    return BatchPublisher(wordpress)
+
+def test_missing_terms_are_created_once_per_batch(tmp_path):
+    site = FakeTermSite({'categories': [{'id': 1, 'name': 'Drinks', 'slug': 'drinks'}], 'tags': []})
+    posts = publisher(tmp_path, site)
+    posts.add_post('Espresso', 'Strong', categories=['Drinks', 'Coffee'], tags=['Beans'])
+    posts.add_post('Latte', 'Milky', categories=['coffee'], tags=['Beans', 'Milk'])
+    assert [error for _, _, error in posts.flush()] == [None, None]
+    # One batch creates the missing terms, then one creates the posts
+    assert sorted(site.term_requests()) == [('/wp/v2/categories', 'Coffee'), ('/wp/v2/tags', 'Beans'),
+                                            ('/wp/v2/tags', 'Milk')]
+    assert len(site.batches) == 2
+    terms = {term['name']: term['id'] for taxonomy in site.terms.values() for term in taxonomy}
+    espresso, latte = site.posts
+    assert espresso['categories'] == [1, terms['Coffee']] and espresso['tags'] == [terms['Beans']]
+    assert latte['categories'] == [terms['Coffee']] and latte['tags'] == [terms['Beans'], terms['Milk']]
+
+    # Terms created earlier are resolved locally
+    posts.add_post('Mocha', 'Chocolate', categories=['Coffee'], tags=['Milk'])
+    posts.flush()
+    assert len(site.term_requests()) == 3
+    assert site.posts[-1]['categories'] == [terms['Coffee']]
+
+def test_post_is_published_without_terms_that_could_not_be_created(tmp_path):
+    site = FakeTermSite(refuse_terms=True)
+    posts = publisher(tmp_path, site)
+    posts.add_post('Espresso', 'Strong', categories=['Coffee'], tags=['Beans'])
+    assert [error for _, _, error in posts.flush()] == [None]
+    assert site.term_requests() == [('/wp/v2/categories', 'Coffee'), ('/wp/v2/tags', 'Beans')]
+    assert site.posts[0]['title'] == 'Espresso'
+    assert 'categories' not in site.posts[0] and 'tags' not in site.posts[0]
@@ -0,0 +1,80 @@
+import time
+import random
+import pytest
+import main
+
+class FakeFanout:
+    def __init__(self):
+        self.calls = []
+
+    def prepare(self):
+        self.calls.append('prepare')
+
+    def flush(self):
+        self.calls.append('flush')
+
+    def failed_titles(self):
+        return {'Failed post'}
+
+class FakeSource:
+    spreadsheet_id = 'sheet'
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.saved = None
+
+    def stream_blog_data(self):
+        return iter(self.rows)
+
+    def save_state(self, failed_titles=()):
+        self.saved = failed_titles
+
+def test_interrupted_pass_publishes_queued_posts_and_saves_state(monkeypatch):
+    processed = []
+
+    def process_row(post, *args):
+        if post['title'] == 'Second':
+            raise KeyboardInterrupt
+        processed.append(post['title'])
+
+    monkeypatch.setattr(main, 'process_row', process_row)
+    fanout = FakeFanout()
+    source = FakeSource([{'title': 'First'}, {'title': 'Second'}, {'title': 'Third'}])
+    with pytest.raises(KeyboardInterrupt):
+        main.publish_pass(source, None, None, fanout)
+    assert processed == ['First']
+    assert fanout.calls == ['prepare', 'flush']
+    assert source.saved == {'Failed post'}
+
+def test_watch_backs_off_after_failed_polls(monkeypatch):
+    outcomes = [ValueError('sheet unavailable'), ValueError('sheet unavailable'), ValueError('sheet unavailable'),
+                None, KeyboardInterrupt()]
+
+    def publish_pass(*args):
+        outcome = outcomes.pop(0)
+        if outcome:
+            raise outcome
+
+    delays = []
+    monkeypatch.setattr(main, 'publish_pass', publish_pass)
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    # The top of the jitter range
+    monkeypatch.setattr(random, 'uniform', lambda low, high: high)
+    with pytest.raises(KeyboardInterrupt):
+        main.watch_sheet(FakeSource([]), None, None, None, interval=10, max_backoff=30)
+    # Doubling per failure up to the cap, then back to the interval once a poll succeeds
+    assert delays == [20, 30, 30, 10]
+
+def test_watch_backoff_is_jittered(monkeypatch):
+    outcomes = [ValueError('sheet unavailable'), KeyboardInterrupt()]
+
+    def publish_pass(*args):
+        raise outcomes.pop(0)
+
+    delays = []
+    monkeypatch.setattr(main, 'publish_pass', publish_pass)
+    monkeypatch.setattr(time, 'sleep', delays.append)
+    monkeypatch.setattr(random, 'uniform', lambda low, high: low)
+    with pytest.raises(KeyboardInterrupt):
+        main.watch_sheet(FakeSource([]), None, None, None, interval=10, max_backoff=300)
+    assert delays == [10]
@@ -1,33 +1,30 @@
 import os
 import sys
 import logging
+import json
 import threading
-import queue
 import requests
 from flask import Flask, render_template, request, jsonify, Response, stream_with_context
-from config.config import LOG_FILE, LOG_LEVEL
+from config.config import LOG_FILE, LOG_LEVEL, WORDPRESS_SITES_FILE, LOG_HEARTBEAT_INTERVAL
 
 # Import the main functionality
 from modules.google_sheets import GoogleSheetsManager
-from modules.content_processor import ContentProcessor
-from modules.wordpress_integration import WordPressIntegration
 from modules.llm_integration import LLMIntegration
 from modules.image_handler import ImageHandler
+from modules.http_client import get_http_client
+from modules.pipeline import FanoutPublisher, load_sites, process_row
+from modules.image_search import PROVIDERS as IMAGE_SOURCES
+from modules.log_broadcaster import LogBroadcaster, JobLogHandler, set_log_context
+from modules.job_tracker import JobTracker, JobProgress
 
 # Create Flask app
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
-# Queue for storing log messages
-log_queue = queue.Queue()
+# Log events of each automation job, streamed to the browsers watching it
+log_broadcaster = LogBroadcaster()
 
-# Custom log handler to capture logs for the web interface
-class QueueHandler(logging.Handler):
-    def __init__(self, log_queue):
-        super().__init__()
-        self.log_queue = log_queue
-
-    def emit(self, record):
-        self.log_queue.put(self.format(record))
+# Progress of each automation job, served as JSON by /jobs
+job_tracker = JobTracker()
 
 # Setup logging
 def setup_logging():
@@ -44,32 +41,38 @@ def setup_logging():
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
 
-    # Setup queue handler for web interface
-    queue_handler = QueueHandler(log_queue)
-    queue_handler.setFormatter(formatter)
+    # Setup job log handler for web interface
+    job_handler = JobLogHandler(log_broadcaster)
 
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(LOG_LEVEL)
     root_logger.addHandler(file_handler)
     root_logger.addHandler(stream_handler)
-    root_logger.addHandler(queue_handler)
+    root_logger.addHandler(job_handler)
 
 # Initialize logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
 # Function to run the blog automation process
-def run_blog_automation(spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images=3, article_length=1000):
+def run_blog_automation(spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images=3, article_length=1000, image_sources=None, extra_sites=None, job=None):
     # Ensure numeric parameters are integers
     num_images = int(num_images)
     article_length = int(article_length)
+    # Progress of each post, reported by /jobs when the run is a tracked job
+    job = job or JobProgress()
+
     try:
         logger.info(f"Starting blog publishing process with custom parameters:")
         logger.info(f"  - Google Sheet ID: {spreadsheet_id}")
         logger.info(f"  - WordPress URL: {wordpress_url}")
         logger.info(f"  - Number of Images: {num_images}")
         logger.info(f"  - Article Length: {article_length} words")
+        if image_sources:
+            logger.info(f"  - Image Sources: {', '.join(image_sources)}")
+        if extra_sites:
+            logger.info(f"  - Syndicated to: {', '.join(site['url'] for site in extra_sites)}")
 
         # Override config values with user input
         from config import config
@@ -82,153 +85,77 @@ def run_blog_automation(spreadsheet_id, wordpress_url, wordpress_username, wordp
         # Initialize components
         sheets_manager = GoogleSheetsManager(spreadsheet_id=spreadsheet_id)
 
-        # Initialize WordPress integration with user credentials
-        wordpress = WordPressIntegration(
-            wordpress_url=wordpress_url,
-            wordpress_username=wordpress_username,
-            wordpress_password=wordpress_password
-        )
-
-        # Pass WordPress integration to ContentProcessor
-        content_processor = ContentProcessor(wordpress_integration=wordpress)
-
         llm = LLMIntegration()
-        image_handler = ImageHandler()
+        image_handler = ImageHandler(providers=image_sources)
+
+        # Publish to the site entered in the form, and to the sister sites
+        # if syndication was requested
+        sites = [{'url': wordpress_url, 'username': wordpress_username, 'password': wordpress_password}]
+        fanout = FanoutPublisher(sites + list(extra_sites or []), image_handler, on_result=job.record_result)
+        sheets_manager.set_targets(site.url for site in fanout.sites)
 
-        # Get blog data from Google Sheets
         try:
-            blog_data = sheets_manager.get_blog_data()
-            if not blog_data:
-                logger.warning("No blog data found in Google Sheets")
-                return
-        except ValueError as e:
-            logger.error(f"Google Sheets error: {str(e)}")
-            raise
-        except requests.exceptions.HTTPError as e:
-            if "404" in str(e):
-                logger.error(f"Google Sheet not found or not accessible: {spreadsheet_id}")
-                raise ValueError(f"Google Sheet not found or not accessible. Please check the Sheet ID and make sure it's publicly accessible: {spreadsheet_id}")
-            else:
-                logger.error(f"HTTP error accessing Google Sheet: {str(e)}")
-                raise
+            # Load what each site already has, so reruns don't duplicate posts
+            # or media, and its categories and tags
+            fanout.prepare()
 
-        # Process each blog post
-        for post in blog_data:
+            # Stream blog data from Google Sheets
             try:
-                # Clean and format the post data
-                post_data = clean_sheet_data(post)
-                logger.info(f"Processing post: {post_data}")
-
-                # Skip if already published
-                if post_data['status'].lower() == 'published ✅':
-                    logger.info(f"Skipping already published post: {post_data['title']}")
-                    continue
-
-                # Skip if title is empty
-                if not post_data['title']:
-                    logger.warning("Skipping post with empty title")
-                    continue
-
-                # Search and download images
-                logger.info(f"Searching for images for: {post_data['title']}")
-                images = image_handler.search_and_download_images(
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords'],
-                    num_images=int(num_images)
-                )
-
-                if not images:
-                    logger.warning(f"No images found for post: {post_data['title']}")
-                    continue
-
-                # Select featured image
-                featured_image = image_handler.select_featured_image(images)
-                if not featured_image:
-                    logger.warning(f"Could not select featured image for post: {post_data['title']}")
-                    continue
-
-                # Remove featured image from content images
-                content_images = [img for img in images if img != featured_image]
-
-                # Generate content using LLM
-                logger.info(f"Generating content for: {post_data['title']}")
-                logger.info(f"Topic: {post_data['topic']}")
-                logger.info(f"Keywords: {post_data['keywords']}")
-                logger.info(f"Context: {post_data['context']}")
-                logger.info(f"Target article length: {article_length} words")
-
-                markdown_content = llm.generate_content(
-                    title=post_data['title'],
-                    topic=post_data['topic'],
-                    keywords=post_data['keywords'],
-                    context=post_data['context'],
-                    word_count=article_length
-                )
-                logger.info("Generated content using LLM")
-
-                # Convert markdown to HTML
-                html_content = content_processor.convert_markdown_to_html(markdown_content)
-                logger.info("Converted markdown to HTML")
-
-                # Add required elements if specified
-                if post_data['must_have_elements']:
-                    required_elements = [elem.strip() for elem in post_data['must_have_elements'].split(',')]
-                    logger.info(f"Adding required elements: {required_elements}")
-                    html_content = content_processor.add_required_elements(html_content, required_elements)
-
-                # Insert images into content (excluding featured image)
-                logger.info("Inserting images into content")
-                html_content = content_processor.insert_images(html_content, content_images)
-
-                # Insert AdSense
-                html_content = content_processor.insert_adsense(html_content)
-                logger.info("Added AdSense to content")
-
-                # Publish to WordPress with featured image
-                logger.info(f"Publishing post: {post_data['title']}")
-                post_id = wordpress.publish_post(
-                    title=post_data['title'],
-                    content=html_content,
-                    featured_image_path=featured_image
-                )
-
-                # Log success
-                logger.info(f"Successfully published post: {post_data['title']} (ID: {post_id})")
-
-            except Exception as e:
-                logger.error(f"Error processing post {post_data.get('title', 'Unknown')}: {str(e)}")
-                continue
-
+                blog_data = sheets_manager.stream_blog_data()
+            except ValueError as e:
+                logger.error(f"Google Sheets error: {str(e)}")
+                raise
+            except requests.exceptions.HTTPError as e:
+                if "404" in str(e):
+                    logger.error(f"Google Sheet not found or not accessible: {spreadsheet_id}")
+                    raise ValueError(f"Google Sheet not found or not accessible. Please check the Sheet ID and make sure it's publicly accessible: {spreadsheet_id}")
+                else:
+                    logger.error(f"HTTP error accessing Google Sheet: {str(e)}")
+                    raise
+
+            # Process each blog post as soon as its row arrives
+            row_count = 0
+            try:
+                for post in blog_data:
+                    row_count += 1
+                    process_row(post, sheets_manager, llm, image_handler, fanout, job=job,
+                                num_images=num_images, article_length=article_length)
+            finally:
+                # Publish the posts still queued, then remember the rows done so
+                # the next run only processes rows added or edited since. Also
+                # done when the run fails partway, so generated posts aren't lost
+                fanout.flush()
+                sheets_manager.save_state(failed_titles=fanout.failed_titles())
+
+            if not row_count:
+                logger.warning("No new or changed blog data found in Google Sheets")
+        finally:
+            fanout.close()
+            image_handler.cleanup()
+            get_http_client().log_stats()
         logger.info("Blog publishing process completed")
 
     except Exception as e:
         logger.error(f"Fatal error in blog automation process: {str(e)}")
         raise
 
-def clean_sheet_data(post):
-    """Clean and format data from Google Sheets"""
-    # Get images and clean them
-    images = post.get('images', '')
-    if images:
-        # Split by comma and clean each URL/path
-        image_list = [img.strip() for img in images.split(',') if img.strip()]
-    else:
-        image_list = []
-
-    return {
-        'title': post.get('title', '').strip(),
-        'topic': post.get('topic name', '').strip(),
-        'keywords': post.get('keywords', '').strip().strip('"'),
-        'context': post.get('context', '').strip().strip('"'),
-        'status': post.get('status', '').strip().strip('"'),
-        'must_have_elements': post.get('must have elements', '').strip().strip('"'),
-        'images': image_list
-    }
+def run_job(job_id, *args):
+    """Run the blog automation as a job, tagging its log events with the job ID and tracking its progress"""
+    set_log_context(job=job_id, post=None, stage=None)
+    job = job_tracker.get(job_id)
+    job.start()
+    try:
+        run_blog_automation(*args, job=job)
+        job.finish('completed')
+        log_broadcaster.finish(job_id, 'completed')
+    except Exception as e:
+        job.finish('failed', str(e))
+        log_broadcaster.finish(job_id, 'failed')
 
 # Routes
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', sites_file=WORDPRESS_SITES_FILE)
 
 @app.route('/generate', methods=['POST'])
 def generate():
@@ -240,6 +167,8 @@ def generate():
         wordpress_password = request.form.get('wordpress_password', '').strip()
         num_images = int(request.form.get('num_images', '3'))
         article_length = int(request.form.get('article_length', '1000'))
+        image_sources = [name.strip() for name in request.form.get('image_sources', '').split(',') if name.strip()]
+        syndicate = request.form.get('syndicate') == 'on'
 
         # Validate required fields
         missing_fields = []
@@ -257,6 +186,12 @@ def generate():
             logger.error(error_message)
             return jsonify({'status': 'error', 'message': error_message})
 
+        unknown_sources = [name for name in image_sources if name not in IMAGE_SOURCES]
+        if unknown_sources:
+            error_message = f"Unknown image sources: {', '.join(unknown_sources)}"
+            logger.error(error_message)
+            return jsonify({'status': 'error', 'message': error_message})
+
         # Validate Google Sheet ID format
         if not spreadsheet_id or len(spreadsheet_id) < 10:
             error_message = "Invalid Google Sheet ID. Please enter a valid ID from your Google Sheets URL."
@@ -269,16 +204,36 @@ def generate():
             logger.error(error_message)
             return jsonify({'status': 'error', 'message': error_message})
 
+        # Sister sites come from the sites file, with their own credentials
+        extra_sites = []
+        if syndicate:
+            if not WORDPRESS_SITES_FILE:
+                error_message = "Syndication needs WORDPRESS_SITES_FILE to list the sister sites"
+                logger.error(error_message)
+                return jsonify({'status': 'error', 'message': error_message})
+            extra_sites = [site for site in load_sites(WORDPRESS_SITES_FILE)
+                           if site['url'].rstrip('/') != wordpress_url.rstrip('/')]
+
         # Start the blog automation process in a separate thread
+        job_id = log_broadcaster.create_job()
+        job_tracker.create_job(job_id, {
+            'spreadsheet_id': spreadsheet_id,
+            'wordpress_url': wordpress_url,
+            'sites': [wordpress_url] + [site['url'] for site in extra_sites],
+            'num_images': num_images,
+            'article_length': article_length,
+            'image_sources': image_sources
+        })
         thread = threading.Thread(
-            target=run_blog_automation,
-            args=(spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images, article_length)
+            target=run_job,
+            args=(job_id, spreadsheet_id, wordpress_url, wordpress_username, wordpress_password, num_images,
+                  article_length, image_sources, extra_sites)
         )
         thread.daemon = True
         thread.start()
 
-        logger.info(f"Started blog automation process with Sheet ID: {spreadsheet_id}, WordPress URL: {wordpress_url}")
-        return jsonify({'status': 'success', 'message': 'Blog automation process started'})
+        logger.info(f"Started blog automation job {job_id} with Sheet ID: {spreadsheet_id}, WordPress URL: {wordpress_url}")
+        return jsonify({'status': 'success', 'message': 'Blog automation process started', 'job_id': job_id})
 
     except ValueError as e:
         error_message = str(e)
@@ -291,17 +246,25 @@ def generate():
 
 @app.route('/logs')
 def logs():
+    """Stream a job's log events (the latest job's by default) as server-sent events.
+
+    Events are JSON with the job, post, stage and level. A reconnecting
+    browser sends Last-Event-ID and is replayed the events it missed. The
+    stream ends after the job's final event.
+    """
+    channel = log_broadcaster.get(request.args.get('job') or None)
+    if channel is None:
+        return jsonify({'status': 'error', 'message': 'No such job'}), 404
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('after') or '0'
+    last_id = int(last_id) if last_id.isdigit() else 0
+
     def generate():
-        while True:
-            try:
-                # Get log message from queue (non-blocking)
-                log_message = log_queue.get(block=False)
-                yield f"data: {log_message}\n\n"
-            except queue.Empty:
-                # If queue is empty, yield a heartbeat to keep connection alive
-                yield f"data: heartbeat\n\n"
-                import time
-                time.sleep(0.5)
+        for event in log_broadcaster.subscribe(channel.job_id, last_id, heartbeat=LOG_HEARTBEAT_INTERVAL):
+            if event is None:
+                # A comment keeps the connection alive without a message
+                yield ": heartbeat\n\n"
+            else:
+                yield f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
 
     response = Response(stream_with_context(generate()), mimetype='text/event-stream')
     # Add headers to prevent caching
@@ -309,6 +272,27 @@ def logs():
     response.headers['X-Accel-Buffering'] = 'no'
     return response
 
+@app.route('/jobs')
+def jobs():
+    """Summaries of the recent jobs, most recent first"""
+    return jsonify({'status': 'success', 'jobs': job_tracker.list_jobs()})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """A job's state, post counts, current stage of each running post, stage timings and ETA"""
+    job = job_tracker.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'No such job'}), 404
+    return jsonify({'status': 'success', 'job': job.summary()})
+
+@app.route('/jobs/<job_id>/posts')
+def job_posts(job_id):
+    """Each post of a job with its state, stage, timings and post ID per site; ?state= filters them"""
+    job = job_tracker.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'No such job'}), 404
+    return jsonify({'status': 'success', 'posts': job.post_list(request.args.get('state') or None)})
+
 @app.after_request
 def add_header(response):
     """Add headers to both force latest IE rendering engine or Chrome Frame,